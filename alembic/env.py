@@ -9,6 +9,7 @@ from alembic import context
 
 from app.core.config import config as config_app
 from app.db.database import Base, url_object
+from app.db.partitioning import is_partition_name
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -30,6 +31,13 @@ config.set_main_option('sqlalchemy.url', url)
 target_metadata = Base.metadata
 
 
+def include_object(object_, name, type_, reflected, compare_to):
+    # partitions are created by the migrations and app.tools.maintain_partitions, they have no models
+    if type_ == "table" and reflected and compare_to is None and is_partition_name(name):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -52,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -61,7 +70,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -94,6 +103,12 @@ def run_migrations_online() -> None:
 from app.db.models.user import User
 from app.db.models.comment import Comment
 from app.db.models.post import Post
+from app.db.models.moderation_verdict import ModerationVerdict
+from app.db.models.auto_reply_job import AutoReplyJob
+from app.db.models.user_daily_activity import UserDailyActivity
+from app.db.models.follow import Follow
+from app.db.models.timeline_entry import TimelineEntry
+from app.db.models.deletion_job import DeletionJob
 
 alembic_config = config.get_section(config.config_ini_section)
 
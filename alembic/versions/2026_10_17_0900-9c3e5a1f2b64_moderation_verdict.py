@@ -0,0 +1,42 @@
+"""moderation verdict cache table
+
+Revision ID: 9c3e5a1f2b64
+Revises: 4b1f0c2d9a7e
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3e5a1f2b64"
+down_revision: Union[str, None] = "4b1f0c2d9a7e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "moderation_verdict",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("is_passed", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash"),
+    )
+    op.create_index(
+        op.f("ix_moderation_verdict_created_at"),
+        "moderation_verdict",
+        ["created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_moderation_verdict_created_at"),
+        table_name="moderation_verdict",
+    )
+    op.drop_table("moderation_verdict")
@@ -0,0 +1,45 @@
+"""pending moderation state for posts and comments
+
+Revision ID: d2a87f4e1c05
+Revises: 9c3e5a1f2b64
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a87f4e1c05"
+down_revision: Union[str, None] = "9c3e5a1f2b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ("post", "comment"):
+        op.add_column(
+            table,
+            sa.Column(
+                "is_pending",
+                sa.Boolean(),
+                server_default=sa.false(),
+                nullable=False,
+            ),
+        )
+        op.alter_column(table, "is_pending", server_default=None)
+        op.create_index(
+            f"ix_{table}_pending",
+            table,
+            ["id"],
+            unique=False,
+            postgresql_where=sa.text("is_pending"),
+        )
+
+
+def downgrade() -> None:
+    for table in ("comment", "post"):
+        op.drop_index(f"ix_{table}_pending", table_name=table)
+        op.drop_column(table, "is_pending")
@@ -0,0 +1,59 @@
+"""auto-reply job queue
+
+Revision ID: 5e0b7d3c8a91
+Revises: d2a87f4e1c05
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e0b7d3c8a91"
+down_revision: Union[str, None] = "d2a87f4e1c05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auto_reply_job",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("comment_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["comment_id"], ["comment.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_auto_reply_job_comment_id"),
+        "auto_reply_job",
+        ["comment_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_auto_reply_job_runnable",
+        "auto_reply_job",
+        ["run_after"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_auto_reply_job_runnable", table_name="auto_reply_job"
+    )
+    op.drop_index(
+        op.f("ix_auto_reply_job_comment_id"), table_name="auto_reply_job"
+    )
+    op.drop_table("auto_reply_job")
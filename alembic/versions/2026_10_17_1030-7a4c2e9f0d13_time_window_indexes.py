@@ -0,0 +1,50 @@
+"""composite indexes for post and comment time-window queries
+
+Revision ID: 7a4c2e9f0d13
+Revises: 5e0b7d3c8a91
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a4c2e9f0d13"
+down_revision: Union[str, None] = "5e0b7d3c8a91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_post_owner_id_is_blocked_created_at", "post", ["owner_id", "is_blocked", "created_at"]),
+    ("ix_post_owner_id_created_at", "post", ["owner_id", "created_at"]),
+    ("ix_comment_post_id_is_blocked_created_at", "comment", ["post_id", "is_blocked", "created_at"]),
+    ("ix_comment_owner_id_created_at", "comment", ["owner_id", "created_at"]),
+    ("ix_comment_comment_id_reply_to", "comment", ["comment_id_reply_to"]),
+)
+
+
+def upgrade() -> None:
+    # built concurrently so large tables stay writable, which can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
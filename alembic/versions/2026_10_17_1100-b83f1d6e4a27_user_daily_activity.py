@@ -0,0 +1,89 @@
+"""user daily activity rollup
+
+Revision ID: b83f1d6e4a27
+Revises: 7a4c2e9f0d13
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b83f1d6e4a27"
+down_revision: Union[str, None] = "7a4c2e9f0d13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = (
+    "posts_published",
+    "posts_blocked",
+    "posts_pending",
+    "comments_sent_published",
+    "comments_sent_blocked",
+    "comments_sent_pending",
+    "comments_received_published",
+    "comments_received_blocked",
+    "comments_received_pending",
+)
+
+
+def status_counter(table: str, prefix: str) -> str:
+    return (
+        f"CASE WHEN {table}.is_blocked THEN '{prefix}_blocked' WHEN {table}.is_pending THEN '{prefix}_pending' "
+        f"ELSE '{prefix}_published' END"
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_daily_activity",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        *(
+            sa.Column(
+                counter, sa.Integer(), server_default=sa.text("0"), nullable=False
+            )
+            for counter in COUNTERS
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day"),
+    )
+
+    # the counters of existing rows, the same recount as ActivityManager.rebuild,
+    # `python -m app.tools.rebuild_activity` repairs them later on
+    counters = ",\n".join(f"count(*) FILTER (WHERE counter = '{counter}') AS {counter}" for counter in COUNTERS)
+    op.execute(
+        f"""
+        INSERT INTO user_daily_activity (user_id, day, {", ".join(COUNTERS)})
+        SELECT user_id, day, {counters}
+        FROM (
+            SELECT post.owner_id AS user_id, post.created_at::date AS day,
+                {status_counter("post", "posts")} AS counter
+            FROM post
+            UNION ALL
+            SELECT comment.owner_id, comment.created_at::date, {status_counter("comment", "comments_sent")}
+            FROM comment
+            UNION ALL
+            SELECT received.user_id, received.day, received.counter
+            FROM (
+                -- union: a reply to the post owner's own comment is received once
+                SELECT comment.id, post.owner_id AS user_id, comment.created_at::date AS day,
+                    {status_counter("comment", "comments_received")} AS counter
+                FROM comment JOIN post ON comment.post_id = post.id
+                WHERE post.owner_id != comment.owner_id
+                UNION
+                SELECT comment.id, parent.owner_id, comment.created_at::date,
+                    {status_counter("comment", "comments_received")}
+                FROM comment JOIN comment AS parent ON comment.comment_id_reply_to = parent.id
+            ) AS received
+        ) AS contributions
+        GROUP BY user_id, day
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_daily_activity")
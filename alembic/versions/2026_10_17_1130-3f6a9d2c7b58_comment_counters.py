@@ -0,0 +1,52 @@
+"""post comment_count and comment reply_count
+
+Revision ID: 3f6a9d2c7b58
+Revises: b83f1d6e4a27
+Create Date: 2026-10-17 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f6a9d2c7b58"
+down_revision: Union[str, None] = "b83f1d6e4a27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("post", sa.Column("comment_count", sa.Integer(), server_default=sa.text("0"), nullable=False))
+    op.add_column("comment", sa.Column("reply_count", sa.Integer(), server_default=sa.text("0"), nullable=False))
+
+    # counters of existing rows, `python -m app.tools.reconcile_counters` repairs them later on
+    op.execute(
+        """
+        UPDATE post SET comment_count = counted.count
+        FROM (
+            SELECT post_id, count(*) AS count FROM comment
+            WHERE is_blocked IS false AND is_pending IS false
+            GROUP BY post_id
+        ) AS counted
+        WHERE post.id = counted.post_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE comment SET reply_count = counted.count
+        FROM (
+            SELECT comment_id_reply_to, count(*) AS count FROM comment
+            WHERE comment_id_reply_to IS NOT NULL AND is_blocked IS false AND is_pending IS false
+            GROUP BY comment_id_reply_to
+        ) AS counted
+        WHERE comment.id = counted.comment_id_reply_to
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("comment", "reply_count")
+    op.drop_column("post", "comment_count")
@@ -0,0 +1,124 @@
+"""monthly partitions of user_daily_activity, BRIN indexes on post and comment created_at
+
+Revision ID: c1d5e8a3f720
+Revises: 3f6a9d2c7b58
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c1d5e8a3f720"
+down_revision: Union[str, None] = "3f6a9d2c7b58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "user_daily_activity"
+# months created ahead of today, later months are added by `python -m app.tools.maintain_partitions`
+MONTHS_AHEAD = 3
+
+COUNTERS = (
+    "posts_published",
+    "posts_blocked",
+    "posts_pending",
+    "comments_sent_published",
+    "comments_sent_blocked",
+    "comments_sent_pending",
+    "comments_received_published",
+    "comments_received_blocked",
+    "comments_received_pending",
+)
+
+BRIN_INDEXES = (
+    ("ix_post_created_at_brin", "post"),
+    ("ix_comment_created_at_brin", "comment"),
+)
+
+
+def create_activity_table(name: str, **kwargs) -> None:
+    op.create_table(
+        name,
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        *(
+            sa.Column(
+                counter, sa.Integer(), server_default=sa.text("0"), nullable=False
+            )
+            for counter in COUNTERS
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day", name=f"{name}_pkey"),
+        **kwargs
+    )
+
+
+def upgrade() -> None:
+    # post and comment stay plain tables: a partitioned table can't be referenced by the comment and
+    # auto_reply_job foreign keys on `id` alone, their time range scans get BRIN indexes instead
+    with op.get_context().autocommit_block():
+        for name, table in BRIN_INDEXES:
+            op.create_index(
+                name,
+                table,
+                ["created_at"],
+                unique=False,
+                postgresql_using="brin",
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+    # partitions are named like app.db.partitioning.MonthlyPartitions
+    op.rename_table(TABLE, f"{TABLE}_unpartitioned")
+    op.execute(f"ALTER TABLE {TABLE}_unpartitioned RENAME CONSTRAINT {TABLE}_pkey TO {TABLE}_unpartitioned_pkey")
+    create_activity_table(TABLE, postgresql_partition_by="RANGE (day)")
+    op.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+    # the months of the existing rows and the coming ones, listed by the database so `--sql` works too
+    op.execute(f"""
+        DO $$
+        DECLARE
+            partition_month date;
+        BEGIN
+            FOR partition_month IN
+                SELECT DISTINCT date_trunc('month', day)::date FROM {TABLE}_unpartitioned
+                UNION
+                SELECT generate_series(
+                    date_trunc('month', current_date),
+                    date_trunc('month', current_date) + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {TABLE} FOR VALUES FROM (%L) TO (%L)',
+                    '{TABLE}_p' || to_char(partition_month, 'YYYY_MM'),
+                    partition_month,
+                    (partition_month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$
+    """)
+
+    op.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned")
+    op.drop_table(f"{TABLE}_unpartitioned")
+
+
+def downgrade() -> None:
+    op.rename_table(TABLE, f"{TABLE}_partitioned")
+    op.execute(f"ALTER TABLE {TABLE}_partitioned RENAME CONSTRAINT {TABLE}_pkey TO {TABLE}_partitioned_pkey")
+    create_activity_table(TABLE)
+    op.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_partitioned")
+    # drops the attached partitions with it, detached ones are left to the operator
+    op.drop_table(f"{TABLE}_partitioned")
+
+    with op.get_context().autocommit_block():
+        for name, table in reversed(BRIN_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
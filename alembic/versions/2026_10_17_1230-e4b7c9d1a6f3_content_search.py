@@ -0,0 +1,61 @@
+"""generated tsvector columns and GIN indexes for post and comment search
+
+Revision ID: e4b7c9d1a6f3
+Revises: c1d5e8a3f720
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b7c9d1a6f3"
+down_revision: Union[str, None] = "c1d5e8a3f720"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("post", "comment")
+
+
+def upgrade() -> None:
+    # a stored generated column rewrites the table, the tables are locked until it is done
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "search_vector",
+                postgresql.TSVECTOR(),
+                sa.Computed("to_tsvector('english', content)", persisted=True),
+                nullable=False,
+            )
+        )
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_search_vector",
+                table,
+                ["search_vector"],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(
+                f"ix_{table}_search_vector",
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+    for table in reversed(TABLES):
+        op.drop_column(table, "search_vector")
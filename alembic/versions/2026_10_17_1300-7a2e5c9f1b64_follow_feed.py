@@ -0,0 +1,53 @@
+"""follow graph and home timelines
+
+Revision ID: 7a2e5c9f1b64
+Revises: e4b7c9d1a6f3
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a2e5c9f1b64"
+down_revision: Union[str, None] = "e4b7c9d1a6f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("user", sa.Column("follower_count", sa.Integer(), server_default=sa.text("0"), nullable=False))
+
+    op.create_table(
+        "follow",
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("followee_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["follower_id"], ["user.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["followee_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("follower_id", "followee_id"),
+    )
+    op.create_index("ix_follow_followee_id", "follow", ["followee_id"])
+
+    op.create_table(
+        "timeline_entry",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("post_created_at", sa.DateTime(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["post_id"], ["post.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "post_created_at", "post_id"),
+    )
+    op.create_index("ix_timeline_entry_post_id", "timeline_entry", ["post_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_timeline_entry_post_id", table_name="timeline_entry")
+    op.drop_table("timeline_entry")
+    op.drop_index("ix_follow_followee_id", table_name="follow")
+    op.drop_table("follow")
+    op.drop_column("user", "follower_count")
@@ -0,0 +1,74 @@
+"""on delete cascade foreign keys and deletion job queue
+
+Revision ID: 9d4c2b7e5a18
+Revises: 7a2e5c9f1b64
+Create Date: 2026-10-17 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4c2b7e5a18"
+down_revision: Union[str, None] = "7a2e5c9f1b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table), the constraints have the default postgres names <table>_<column>_fkey
+FOREIGN_KEYS = (
+    ("post", "owner_id", "user"),
+    ("comment", "post_id", "post"),
+    ("comment", "owner_id", "user"),
+    ("comment", "comment_id_reply_to", "comment"),
+)
+
+
+def replace_foreign_keys(ondelete: Union[str, None]) -> None:
+    for table, column, referred_table in FOREIGN_KEYS:
+        name = f"{table}_{column}_fkey"
+        op.drop_constraint(name, table, type_="foreignkey")
+        # not valid: the existing rows aren't scanned while the ACCESS EXCLUSIVE locks of this transaction are held
+        op.create_foreign_key(
+            name, table, referred_table, [column], ["id"], ondelete=ondelete, postgresql_not_valid=True
+        )
+
+    # the migration transaction is committed first, each VALIDATE then runs in a transaction of its own
+    # and only takes a SHARE UPDATE EXCLUSIVE lock, which doesn't block writes during the scan
+    with op.get_context().autocommit_block():
+        for table, column, _ in FOREIGN_KEYS:
+            op.execute(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT {table}_{column}_fkey')
+
+
+def upgrade() -> None:
+    replace_foreign_keys("CASCADE")
+
+    op.create_table(
+        "deletion_job",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_deletion_job_runnable",
+        "deletion_job",
+        ["run_after"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_deletion_job_runnable", table_name="deletion_job")
+    op.drop_table("deletion_job")
+
+    replace_foreign_keys(None)
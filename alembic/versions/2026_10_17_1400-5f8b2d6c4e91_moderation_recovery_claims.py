@@ -0,0 +1,29 @@
+"""moderation recovery claims on pending posts and comments
+
+Revision ID: 5f8b2d6c4e91
+Revises: 9d4c2b7e5a18
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f8b2d6c4e91"
+down_revision: Union[str, None] = "9d4c2b7e5a18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # nullable without a default: no table rewrite
+    for table in ("post", "comment"):
+        op.add_column(table, sa.Column("moderation_claimed_until", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ("comment", "post"):
+        op.drop_column(table, "moderation_claimed_until")
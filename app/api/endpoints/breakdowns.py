@@ -1,11 +1,12 @@
 from datetime import date
 from starlette import status as st
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.auth import current_active_user
-from app.api.schemas import user_schemas, post_schemas
+from app.api.schemas import user_schemas, breakdown_schemas
+from app.core.config import config
 from app.db.database import get_async_session
 from app.db.managers.comment_manager import CommentManager
 from app.db.managers.post_manager import PostManager
@@ -17,37 +18,46 @@ breakdown = APIRouter(
 
 
 @breakdown.get(
-    "/comments-daily-breakdown/user/me/", status_code=200,
-    description="Get comments breakdown by user"
+    "/comments-daily-breakdown/user/me/", status_code=200, response_model=breakdown_schemas.CommentsBreakdown,
+    description="Get comments breakdown by user: counts of sent and received comments per day and status"
 )
 async def get_comments_daily_breakdown(
         date_from: date = date.min, date_to: date = date.today(),
+        sample_size: int = Query(
+            default=0, ge=0, le=config.BREAKDOWN_MAX_SAMPLE_SIZE,
+            description="number of newest comment ids to return per bucket"
+        ),
         db: AsyncSession = Depends(get_async_session),
         user: user_schemas.UserRead = Depends(current_active_user)
 ):
     comment_manager = CommentManager(db)
-    db_comments = await comment_manager.get_many(date_from=date_from, date_to=date_to, user_id=user.id)
-    if db_comments:
-        status_by_comments = comment_manager.format_comments_by_user(comments=db_comments, user_id=user.id)
-        res = {
-            status: comment_manager.filter_by_blocked(db_comments)
-            for status, db_comments in status_by_comments.items()
-        }
+    res = await comment_manager.get_daily_breakdown(
+        date_from=date_from, date_to=date_to, user_id=user.id, sample_size=sample_size
+    )
+    if res:
         return res
     else:
         raise HTTPException(status_code=st.HTTP_204_NO_CONTENT)
 
 
 @breakdown.get(
-    "/posts-daily-breakdown/user/me/", status_code=200,
-    description="Get posts breakdown by user"
+    "/posts-daily-breakdown/user/me/", status_code=200, response_model=breakdown_schemas.PostsBreakdown,
+    description="Get posts breakdown by user: counts of posts per day and status"
 )
 async def get_posts_daily_breakdown(
         date_from: date = date.min, date_to: date = date.today(),
+        sample_size: int = Query(
+            default=0, ge=0, le=config.BREAKDOWN_MAX_SAMPLE_SIZE,
+            description="number of newest post ids to return per bucket"
+        ),
         db: AsyncSession = Depends(get_async_session),
         user: user_schemas.UserRead = Depends(current_active_user)
 ):
     post_manager = PostManager(db)
-    db_posts = await post_manager.get_many(date_from, date_to, user_id=user.id)
-    return post_manager.filter_by_blocked(db_posts)
-
+    res = await post_manager.get_daily_breakdown(
+        date_from, date_to, user_id=user.id, sample_size=sample_size
+    )
+    if res:
+        return res
+    else:
+        raise HTTPException(status_code=st.HTTP_204_NO_CONTENT)
@@ -1,16 +1,19 @@
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Query, Depends, HTTPException, Path
+from fastapi import APIRouter, Query, Depends, HTTPException, Path, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from app.auth.auth import current_active_user
-from app.api.schemas import comment_schemas, user_schemas
-from app.api.validation_tools import post_validation, check_is_blocked, post_by_user_validation, \
-    user_existing_validation, comment_existing_validation, validate_start_date, check_is_blocked_post_by_id, \
-    check_access
+from app.api.pagination import Keyset, decode_cursor, page_limit, paginate
+from app.api.schemas import comment_schemas, user_schemas, batch_schemas
+from app.core.config import config
+from app.api.validation_tools import check_is_blocked, validate_start_date, check_access, check_is_pending, \
+    resolve_path
 from app.db.database import get_async_session
 from app.db.managers.comment_manager import CommentManager
+from app.db.managers.deletion_manager import DeletionManager
 
 
 comments_router = APIRouter(
@@ -32,18 +35,13 @@ async def create_comment(
         user: user_schemas.UserRead = Depends(current_active_user),
         db: AsyncSession = Depends(get_async_session)
 ):
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
-    await check_is_blocked_post_by_id(db, post_id)
-    if comment_id is not None:
-        await comment_existing_validation(db, comment_id)
+    await resolve_path(db, user_id, post_id, comment_id=comment_id, viewer_id=user.id)
 
     comment_controller = CommentManager(db=db)
     comment = await comment_controller.create(
         entity_create=comment, owner_id=user.id, comment_id_reply_to=comment_id, post_id=post_id)
 
-    check_is_blocked(comment)
+    check_is_blocked(comment, user.id)
 
     return comment_schemas.CommentRead(
         id=comment.id,
@@ -51,62 +49,96 @@ async def create_comment(
         content=comment.content,
         owner_id=comment.owner_id,
         is_blocked=comment.is_blocked,
+        is_pending=comment.is_pending,
         updated_at=comment.updated_at,
         comment_id_reply_to=comment.comment_id_reply_to,
+        reply_count=comment.reply_count,
     )
 
 
+@comments_router.post(
+    "/users/{user_id}/posts/{post_id}/comments:batch",
+    response_model=list[batch_schemas.BatchItemResult],
+    status_code=status.HTTP_201_CREATED,
+    description="Create up to BULK_MAX_ITEMS comments under the post with one insert, "
+                "the result of every item is reported in order"
+)
+async def create_comments_batch(
+        post_id: int,
+        user_id: int,
+        batch: batch_schemas.CommentBatch,
+        user: user_schemas.UserRead = Depends(current_active_user),
+        db: AsyncSession = Depends(get_async_session)
+):
+    await resolve_path(db, user_id, post_id, viewer_id=user.id)
+
+    comment_manager = CommentManager(db=db)
+    results = await comment_manager.create_many(batch.items, owner_id=user.id, post_id=post_id)
+    return [batch_schemas.BatchItemResult(index=index, **result) for index, result in enumerate(results)]
+
+
 @comments_router.get(
     "/users/{user_id}/posts/{post_id}/comments/{comment_id}",
-    description="getting comment and all replies", response_model=comment_schemas.CommentDB,
+    description="getting comment and all replies, nested", response_model=comment_schemas.CommentThread,
 )
 async def get_comment(
         user_id: int,
         post_id: int,
         comment_id: int | None = Path(description="comment_id to which comment we want to read"),
+        max_depth: int = Query(
+            default=config.THREAD_MAX_DEPTH, ge=0, le=config.THREAD_MAX_DEPTH,
+            description="levels of replies to return, 0 for the comment only"
+        ),
+        max_nodes: int = Query(
+            default=config.THREAD_MAX_NODES, ge=0, le=config.THREAD_MAX_NODES,
+            description="number of replies to return, breadth first, the comment itself is not counted"
+        ),
         user: user_schemas.UserRead = Depends(current_active_user),
         db: AsyncSession = Depends(get_async_session),
 ):
 
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
-    await comment_existing_validation(db, comment_id)
+    resolved = await resolve_path(db, user_id, post_id, comment_id=comment_id)
 
-    comment_controller = CommentManager(db=db)
-    comment = await comment_controller.get_one(comment_id)
-    return comment
+    check_is_pending(resolved.comment, user.id)
+
+    comment_manager = CommentManager(db=db)
+    return await comment_manager.get_thread(comment_id, viewer_id=user.id, max_depth=max_depth, max_nodes=max_nodes)
 
 
 @comments_router.get(
     "/users/{user_id}/posts/{post_id}/comments/",
     response_model=list[comment_schemas.CommentRead],
-    description="getting all comments for current post"
+    description="getting all comments for current post, oldest first. "
+                "The cursor of the next page is returned in the X-Next-Cursor header"
 )
 async def get_published_comments_by_post(
         user_id: int,
         post_id: int,
+        response: Response,
         user: user_schemas.UserRead = Depends(current_active_user),
         start_date: datetime = Depends(validate_start_date),
         end_date: datetime = datetime.now(),
+        limit: int = Depends(page_limit),
+        after: Optional[Keyset] = Depends(decode_cursor),
         db: AsyncSession = Depends(get_async_session)
 ):
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
+    await resolve_path(db, user_id, post_id)
 
     comment_controller = CommentManager(db=db)
     comments = await comment_controller.get_many_by_entity_owner_id(
-        entity_owner_id=post_id, from_=start_date, till_=end_date)
+        entity_owner_id=post_id, from_=start_date, till_=end_date, viewer_id=user.id,
+        limit=limit + 1, after=after)
     if comments:
         return [comment_schemas.CommentRead(
             id=comment.id,
             post_id=comment.post_id,
             owner_id=comment.owner_id,
             comment_id_reply_to=comment.comment_id_reply_to,
+            reply_count=comment.reply_count,
             updated_at=comment.updated_at,
-            content=comment.content
-        ) for comment in comments]
+            content=comment.content,
+            is_pending=comment.is_pending
+        ) for comment in paginate(response, comments, limit)]
     else:
         raise HTTPException(
             status_code=status.HTTP_204_NO_CONTENT
@@ -124,24 +156,24 @@ async def update_comment(
         user: user_schemas.UserRead = Depends(current_active_user),
         db: AsyncSession = Depends(get_async_session)
 ):
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
-    await comment_existing_validation(db, comment_id)
+    resolved = await resolve_path(db, user_id, post_id, comment_id=comment_id)
 
     comment_manager = CommentManager(db=db)
     await check_access(
         await comment_manager.check_access_to_content(
             current_user=user, post_owner_user_id=user_id,
-            comment_id=comment_id, access_lvl="update"
+            comment_id=comment_id, comment=resolved.comment, access_lvl="update"
         )
     )
 
-    await comment_manager.update(comment_id, comment_update)
-    comment = await comment_manager.get_one(comment_id)
-    check_is_blocked(comment)
-
-    await comment_manager.create_auto_reply(post_id, user.id, comment_id, comment_update)
+    comment = await comment_manager.update(comment_id, comment_update, comment=resolved.comment)
+    if comment is None:
+        # deleted since resolve_path read it
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Comment does not exist"
+        )
+    check_is_blocked(comment, user.id)
 
     return comment_schemas.CommentRead(
         id=comment.id,
@@ -149,8 +181,10 @@ async def update_comment(
         content=comment.content,
         owner_id=comment.owner_id,
         is_blocked=comment.is_blocked,
+        is_pending=comment.is_pending,
         updated_at=comment.updated_at,
-        comment_id_reply_to=comment.comment_id_reply_to
+        comment_id_reply_to=comment.comment_id_reply_to,
+        reply_count=comment.reply_count
     )
 
 
@@ -162,20 +196,19 @@ async def del_comment(
         user: user_schemas.UserRead = Depends(current_active_user),
         db: AsyncSession = Depends(get_async_session)
 ):
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
-    await comment_existing_validation(db, comment_id)
+    resolved = await resolve_path(db, user_id, post_id, comment_id=comment_id)
 
     comment_manager = CommentManager(db=db)
     await check_access(
         await comment_manager.check_access_to_content(
             current_user=user, post_owner_user_id=user_id,
-            comment_id=comment_id, access_lvl="delete"
+            comment_id=comment_id, comment=resolved.comment, access_lvl="delete"
         )
     )
 
-    await comment_manager.delete(comment_id)
+    # a comment with many replies is deleted in the background
+    if not await DeletionManager(db=db).delete("comment", comment_id):
+        return {"msg": f"Comment with id {comment_id} is being deleted"}
     return {"msg": f"Comment with id {comment_id} deleted successfully"}
 
 
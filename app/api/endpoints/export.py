@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+from app.api.schemas import user_schemas
+from app.api.validation_tools import validate_start_date
+from app.auth.auth import current_active_user
+from app.db.database import async_session_maker, replica_session_maker, reads_from_replica
+from app.db.managers.export_manager import ExportManager
+
+export_router = APIRouter(
+    tags=["export"]
+)
+
+
+@export_router.get(
+    "/users/{user_id}/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    description="Streaming all posts, comments and replies of the user as NDJSON, oldest first, "
+                "one {\"type\": \"post\" | \"comment\", ...} object per line"
+)
+async def export_user(
+        user_id: int,
+        request: Request,
+        user: user_schemas.UserRead = Depends(current_active_user),
+        start_date: datetime = Depends(validate_start_date),
+        end_date: Optional[datetime] = None,
+):
+    if user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only export your own content"
+        )
+
+    session_maker = replica_session_maker if reads_from_replica(request) else async_session_maker
+
+    async def lines():
+        # the request's session is closed before a streaming response is sent, the export opens its own
+        async with session_maker() as async_session:
+            async for chunk in ExportManager(async_session).stream(user.id, from_=start_date, till_=end_date):
+                yield chunk
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.pagination import Keyset, decode_cursor, page_limit, paginate
+from app.api.schemas import post_schemas, user_schemas
+from app.api.validation_tools import user_existing_validation
+from app.auth.auth import current_active_user
+from app.db.database import get_async_session
+from app.db.managers.feed_manager import FeedManager
+
+feed_router = APIRouter(
+    tags=["feed"]
+)
+
+
+@feed_router.post(
+    "/users/{user_id}/follow",
+    status_code=status.HTTP_204_NO_CONTENT,
+    description="Following a user, their latest posts are added to the feed"
+)
+async def follow_user(
+        user_id: int,
+        user: user_schemas.UserRead = Depends(current_active_user),
+        db: AsyncSession = Depends(get_async_session),
+):
+    if user_id == user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You cannot follow yourself"
+        )
+    await user_existing_validation(db, user_id)
+
+    feed_manager = FeedManager(db=db)
+    await feed_manager.follow(follower_id=user.id, followee_id=user_id)
+
+
+@feed_router.delete(
+    "/users/{user_id}/follow",
+    status_code=status.HTTP_204_NO_CONTENT,
+    description="Unfollowing a user, their posts are removed from the feed"
+)
+async def unfollow_user(
+        user_id: int,
+        user: user_schemas.UserRead = Depends(current_active_user),
+        db: AsyncSession = Depends(get_async_session),
+):
+    feed_manager = FeedManager(db=db)
+    if not await feed_manager.unfollow(follower_id=user.id, followee_id=user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You do not follow this user"
+        )
+
+
+@feed_router.get(
+    "/feed",
+    response_model=list[post_schemas.PostFeed],
+    status_code=status.HTTP_200_OK,
+    description="Getting the published posts of the followed users, newest first. "
+                "The cursor of the next page is returned in the X-Next-Cursor header"
+)
+async def get_feed(
+        response: Response,
+        user: user_schemas.UserRead = Depends(current_active_user),
+        limit: int = Depends(page_limit),
+        after: Optional[Keyset] = Depends(decode_cursor),
+        db: AsyncSession = Depends(get_async_session),
+):
+    feed_manager = FeedManager(db=db)
+    posts = await feed_manager.get_feed(user_id=user.id, limit=limit + 1, after=after)
+    if not posts:
+        raise HTTPException(status_code=status.HTTP_204_NO_CONTENT, detail="No posts found.")
+    return paginate(response, posts, limit)
@@ -1,15 +1,19 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.api.schemas import post_schemas, user_schemas
+from app.api.pagination import Keyset, decode_cursor, page_limit, paginate
+from app.api.schemas import post_schemas, user_schemas, batch_schemas
 from app.api.validation_tools import validate_start_date, user_existing_validation, post_validation, \
-    post_by_user_validation, check_is_blocked, check_access
+    check_is_blocked, check_access, check_is_pending, resolve_path
 from app.db.database import get_async_session
 from app.auth.auth import current_active_user
-from app.db.managers.post_manager import PostManager
+from app.db.managers.deletion_manager import DeletionManager
+from app.db.managers.post_manager import PostManager, PostLoad
 
 users_router = APIRouter(
     tags=["posts"]
@@ -25,29 +29,34 @@ users_router = APIRouter(
     "/users/{user_id}/posts/",
     response_model=list[post_schemas.PostDB],
     status_code=status.HTTP_200_OK,
-    description="Getting posts excluding blocked posts"
+    description="Getting posts excluding blocked posts, newest first. "
+                "The cursor of the next page is returned in the X-Next-Cursor header"
 )
 async def get_posts(
         user_id: int,
+        response: Response,
         user: user_schemas.UserRead = Depends(current_active_user),
         start_date: datetime = Depends(validate_start_date),
         end_date: datetime = datetime.now(),
+        limit: int = Depends(page_limit),
+        after: Optional[Keyset] = Depends(decode_cursor),
         db: AsyncSession = Depends(get_async_session),
 ):
     await user_existing_validation(db, user_id)
 
     post_manager = PostManager(db=db)
     posts = await post_manager.get_many_by_entity_owner_id(
-        from_=start_date, till_=end_date, entity_owner_id=user_id
+        from_=start_date, till_=end_date, entity_owner_id=user_id, viewer_id=user.id,
+        limit=limit + 1, after=after
     )
     if not posts:
         raise HTTPException(status_code=status.HTTP_204_NO_CONTENT, detail="No posts found.")
-    return posts
+    return paginate(response, posts, limit)
 
 
 @users_router.get(
     "/users/{user_id}/posts/{post_id}", status_code=status.HTTP_200_OK,
-    description="Getting a specific published post by id with all comments"
+    description="Getting a specific published post by id with the comments count and the first page of comments"
 )
 async def get_post(
         post_id: int,
@@ -56,24 +65,24 @@ async def get_post(
         db: AsyncSession = Depends(get_async_session)
 ):
 
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
-
-    post_manager = PostManager(db=db)
-    post_db = await post_manager.get_one(id_=post_id)
+    resolved = await resolve_path(db, user_id, post_id)
 
-    if post_db.is_blocked and post_db.owner_id != user.id:
+    if resolved.post.is_blocked and resolved.post.owner_id != user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access to this post is blocked",
             headers={"X-Error": "PostBlocked"}
         )
-    elif not post_db.is_blocked and post_db.owner_id != user.id:
-        return post_schemas.PostPublic(
-            id=post_id, created_at=post_db.created_at, updated_at=post_db.updated_at, content=post_db.content)
+    check_is_pending(resolved.post, user.id)
+
+    # the post row resolve_path loaded is reused, only its comments are queried
+    post_db = resolved.post
+    await PostManager(db=db)._load_first_comments([post_db], user.id)
+
+    if post_db.owner_id != user.id:
+        return post_schemas.PostPublic.model_validate(post_db, from_attributes=True)
     else:
-        return post_db
+        return post_schemas.PostDB.model_validate(post_db, from_attributes=True)
 
 
 @users_router.post("/users/{user_id}/posts/", response_model=post_schemas.PostDB, status_code=status.HTTP_201_CREATED)
@@ -87,12 +96,30 @@ async def create_post(
     await check_access(
         await post_manager.check_access_to_content(current_user=user, post_owner_user_id=user_id)
     )
-    post_id = await post_manager.create(entity_create=post_create, owner_id=user.id)
-    post = await post_manager.get_one(post_id)
-    check_is_blocked(post)
+    post = await post_manager.create(entity_create=post_create, owner_id=user.id)
+    check_is_blocked(post, user.id)
     return post
 
 
+@users_router.post(
+    "/users/{user_id}/posts:batch", response_model=list[batch_schemas.BatchItemResult],
+    status_code=status.HTTP_201_CREATED,
+    description="Create up to BULK_MAX_ITEMS posts with one insert, the result of every item is reported in order"
+)
+async def create_posts_batch(
+        user_id: int,
+        batch: batch_schemas.PostBatch,
+        user: user_schemas.UserRead = Depends(current_active_user),
+        db: AsyncSession = Depends(get_async_session)
+):
+    post_manager = PostManager(db=db)
+    await check_access(
+        await post_manager.check_access_to_content(current_user=user, post_owner_user_id=user_id)
+    )
+    results = await post_manager.create_many(batch.items, owner_id=user.id)
+    return [batch_schemas.BatchItemResult(index=index, **result) for index, result in enumerate(results)]
+
+
 @users_router.put(
     "/users/{user_id}/posts/{post_id}", response_model=post_schemas.PostDB, status_code=status.HTTP_202_ACCEPTED
 )
@@ -111,9 +138,14 @@ async def update_post(
         )
     )
 
-    await post_manager.update(post_id, post_update)
-    post_db = await post_manager.get_one(post_id)
-    check_is_blocked(post_db)
+    post_db = await post_manager.update(post_id, post_update, load=PostLoad.FIRST_COMMENTS, viewer_id=user.id)
+    if post_db is None:
+        # deleted since post_validation read it
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post does not exist"
+        )
+    check_is_blocked(post_db, user.id)
     return post_db
 
 
@@ -124,9 +156,7 @@ async def del_post(
         user: user_schemas.UserRead = Depends(current_active_user),
         db: AsyncSession = Depends(get_async_session)
 ):
-    await post_validation(db, post_id)
-    await user_existing_validation(db, user_id)
-    await post_by_user_validation(db, post_id, user_id)
+    await resolve_path(db, user_id, post_id)
 
     post_manager = PostManager(db=db)
 
@@ -136,7 +166,9 @@ async def del_post(
         )
     )
 
-    await post_manager.delete(post_id)
+    # a post with many comments is deleted in the background
+    if not await DeletionManager(db=db).delete("post", post_id):
+        return {"message": f"Post with id {post_id} is being deleted."}
 
     return {"message": f"Post with id {post_id} has been deleted successfully."}
 
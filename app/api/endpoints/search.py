@@ -0,0 +1,42 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.api.pagination import SearchKeyset, decode_search_cursor, encode_search_cursor, page_limit, paginate
+from app.api.schemas import search_schemas, user_schemas
+from app.auth.auth import current_active_user
+from app.db.database import get_async_session
+from app.db.managers.search_manager import SearchManager, SEARCH_TYPES
+
+search_router = APIRouter(
+    tags=["search"]
+)
+
+
+@search_router.get(
+    "/search",
+    response_model=list[search_schemas.SearchResult],
+    status_code=status.HTTP_200_OK,
+    description="Full-text search over posts and comments visible for the user, best ranked first. "
+                "The cursor of the next page is returned in the X-Next-Cursor header"
+)
+async def search(
+        response: Response,
+        q: str = Query(min_length=1, max_length=200, description="words, \"quoted phrases\", or, -excluded"),
+        type_: Optional[Literal["post", "comment"]] = Query(default=None, alias="type"),
+        user: user_schemas.UserRead = Depends(current_active_user),
+        limit: int = Depends(page_limit),
+        after: Optional[SearchKeyset] = Depends(decode_search_cursor),
+        db: AsyncSession = Depends(get_async_session),
+):
+    search_manager = SearchManager(db=db)
+    results = await search_manager.search(
+        q, viewer_id=user.id, types=(type_,) if type_ else tuple(SEARCH_TYPES), limit=limit + 1, after=after
+    )
+    if not results:
+        raise HTTPException(status_code=status.HTTP_204_NO_CONTENT, detail="Nothing found.")
+    return paginate(
+        response, results, limit, cursor_of=lambda last: encode_search_cursor(last.rank, last.type, last.id)
+    )
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+from app.auth.auth import current_superuser
+from app.api.schemas import user_schemas
+from app.db.entity_cache import entity_cache
+from app.google_api_ai.client import get_client
+from app.google_api_ai.prefilter import prefilter
+from app.google_api_ai.verdict_cache import verdict_cache
+
+stats_router = APIRouter(
+    prefix="/api/stats",
+    tags=["stats"]
+)
+
+
+@stats_router.get("/moderation", status_code=200, description="Moderation prefilter, verdict cache and model client counters")
+async def get_moderation_stats(
+        user: user_schemas.UserRead = Depends(current_superuser)
+):
+    return {
+        "prefilter": prefilter.stats(),
+        "verdict_cache": verdict_cache.stats(),
+        "model_client": get_client().stats(),
+    }
+
+
+@stats_router.get("/entity-cache", status_code=200, description="Post and comment cache counters per entity type")
+async def get_entity_cache_stats(
+        user: user_schemas.UserRead = Depends(current_superuser)
+):
+    return entity_cache.stats()
@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Query, Response
+from starlette import status
+
+from app.core.config import config
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Keyset = tuple[datetime, int]
+# search results: rank, type, id
+SearchKeyset = tuple[float, str, int]
+
+
+def _encode(values: list) -> str:
+    payload = json.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def _decode(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise _invalid_cursor()
+
+
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    return _encode([created_at.isoformat(), id_])
+
+
+def decode_cursor(cursor: Optional[str] = Query(default=None, description="next page cursor")) -> Optional[Keyset]:
+    if cursor is None:
+        return None
+    try:
+        created_at, id_ = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(id_)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def encode_search_cursor(rank: float, type_: str, id_: int) -> str:
+    return _encode([rank, type_, id_])
+
+
+def decode_search_cursor(
+        cursor: Optional[str] = Query(default=None, description="next page cursor")
+) -> Optional[SearchKeyset]:
+    if cursor is None:
+        return None
+    try:
+        rank, type_, id_ = _decode(cursor)
+        return float(rank), str(type_), int(id_)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def page_limit(
+        limit: int = Query(default=config.PAGE_DEFAULT_LIMIT, ge=1, le=config.PAGE_MAX_LIMIT)
+) -> int:
+    return limit
+
+
+def paginate(response: Response, entities: list, limit: int, cursor_of: Optional[Callable] = None) -> list:
+    '''
+    entities are fetched with limit + 1 rows, the extra row only tells that there is a next page;
+    its cursor, `cursor_of` the last entity of the page, is returned in the X-Next-Cursor header
+    '''
+    page = entities[:limit]
+    if len(entities) > limit:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = (
+            encode_cursor(last.created_at, last.id) if cursor_of is None else cursor_of(last)
+        )
+    return page
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.api.schemas.comment_schemas import CommentCreate
+from app.api.schemas.post_schemas import PostCreate
+from app.core.config import config
+
+
+class PostBatch(BaseModel):
+    items: list[PostCreate] = Field(min_length=1, max_length=config.BULK_MAX_ITEMS)
+
+
+class CommentBatchItem(CommentCreate):
+    comment_id_reply_to: Optional[int] = None
+
+
+class CommentBatch(BaseModel):
+    items: list[CommentBatchItem] = Field(min_length=1, max_length=config.BULK_MAX_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    # published, blocked, pending or failed
+    status: str
+    detail: Optional[str] = None
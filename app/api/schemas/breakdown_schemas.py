@@ -0,0 +1,34 @@
+from datetime import date
+
+from pydantic import BaseModel, Field
+
+
+class BreakdownBucket(BaseModel):
+    count: int = 0
+    ids: list[int] = Field(default_factory=list)
+
+
+class StatusBreakdown(BaseModel):
+    published: BreakdownBucket = Field(default_factory=BreakdownBucket)
+    blocked: BreakdownBucket = Field(default_factory=BreakdownBucket)
+    pending: BreakdownBucket = Field(default_factory=BreakdownBucket)
+
+
+class DailyPostsBreakdown(StatusBreakdown):
+    day: date
+
+
+class PostsBreakdown(StatusBreakdown):
+    days: list[DailyPostsBreakdown] = Field(default_factory=list)
+
+
+class DailyCommentsBreakdown(BaseModel):
+    day: date
+    sent: StatusBreakdown = Field(default_factory=StatusBreakdown)
+    received: StatusBreakdown = Field(default_factory=StatusBreakdown)
+
+
+class CommentsBreakdown(BaseModel):
+    sent: StatusBreakdown = Field(default_factory=StatusBreakdown)
+    received: StatusBreakdown = Field(default_factory=StatusBreakdown)
+    days: list[DailyCommentsBreakdown] = Field(default_factory=list)
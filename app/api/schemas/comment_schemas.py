@@ -11,14 +11,25 @@ class CommentBase(BaseModel):
 class CommentDB(CommentBase):
     id: int
     is_blocked: bool
+    is_pending: bool = False
     created_at: datetime
     post_id: int
     owner_id: int
+    # published direct replies
+    reply_count: int = 0
 
     class Config:
         from_attributes = True
 
 
+class CommentThread(CommentDB):
+    comment_id_reply_to: Optional[int] = None
+    depth: int = 0
+    # replies exist beyond max_depth or max_nodes
+    has_more_replies: bool = False
+    replies: list["CommentThread"] = []
+
+
 class CommentCreate(CommentBase):
     pass
 
@@ -32,3 +43,6 @@ class CommentRead(CommentUpdate):
     post_id: int
     owner_id: int
     comment_id_reply_to: Optional[int]
+    is_pending: bool = False
+    # published direct replies
+    reply_count: int = 0
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class ExportedPost(BaseModel):
+    type: Literal["post"] = "post"
+    id: int
+    content: str
+    is_blocked: bool
+    is_pending: bool = False
+    auto_reply: bool
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ExportedComment(BaseModel):
+    type: Literal["comment"] = "comment"
+    id: int
+    post_id: int
+    # set on replies
+    comment_id_reply_to: Optional[int] = None
+    content: str
+    is_blocked: bool
+    is_pending: bool = False
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
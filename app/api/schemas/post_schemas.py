@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 
@@ -13,7 +14,12 @@ class PostPublic(PostBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    # the first POST_COMMENTS_PAGE_SIZE visible comments, the rest are paginated by the comments endpoint
     comments: list["CommentRead"]
+    # comments the viewer can see, their own pending ones included; only set when the post is read on its own
+    visible_comment_count: Optional[int] = None
+    # published comments, the same for every viewer
+    comment_count: int = 0
 
 
 class PostCreate(PostBase):
@@ -28,6 +34,7 @@ class PostDB(PostPrivate):
     id: int
     content: str = "Hi!"
     is_blocked: bool
+    is_pending: bool = False
     auto_reply: bool
     owner_id: int
     created_at: datetime
@@ -37,5 +44,17 @@ class PostDB(PostPrivate):
         from_attributes = True
 
 
+class PostFeed(PostBase):
+    id: int
+    owner_id: int
+    created_at: datetime
+    updated_at: datetime
+    # published comments
+    comment_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+
 class PostUpdate(PostCreate):
     pass
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+    type: Literal["post", "comment"]
+    id: int
+    # the post itself or the post of the comment
+    post_id: int
+    owner_id: int
+    content: str
+    is_pending: bool = False
+    created_at: datetime
+    rank: float
+
+    class Config:
+        from_attributes = True
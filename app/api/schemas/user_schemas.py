@@ -4,6 +4,7 @@ from fastapi_users import schemas
 class UserRead(schemas.BaseUser[int]):
     fullname: str
     nickname: str
+    follower_count: int = 0
 
 
 class UserCreate(schemas.BaseUserCreate):
@@ -1,11 +1,13 @@
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
 from fastapi import HTTPException
-from sqlalchemy import select, exists, and_
+from sqlalchemy import select, exists, and_, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.db.managers.post_manager import PostManager
+from app.db.managers.post_manager import PostManager, PostLoad
 from app.db.models.comment import Comment
 from app.db.models.post import Post
 from app.db.models.user import User
@@ -73,7 +75,7 @@ async def comment_existing_validation(db: AsyncSession, comment_id: int):
         )
 
 
-def check_is_blocked(base):
+def check_is_blocked(base, user_id: int | None = None):
     if base.is_blocked:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -81,12 +83,77 @@ def check_is_blocked(base):
                    f"You can unlock it by updating the content via id {base.id}",
             headers={"content-id": str(base.id)}
         )
+    check_is_pending(base, user_id)
 
 
-async def check_is_blocked_post_by_id(db: AsyncSession, id_: int):
+def check_is_pending(base, user_id: int | None = None):
+    if base.is_pending and base.owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Content is awaiting moderation",
+            headers={"content-id": str(base.id)}
+        )
+
+
+async def check_is_blocked_post_by_id(db: AsyncSession, id_: int, user_id: int | None = None):
     pm = PostManager(db)
-    post = await pm.get_one(id_)
-    check_is_blocked(post)
+    post = await pm.get_one(id_, load=PostLoad.HEADER)
+    check_is_blocked(post, user_id)
+
+
+@dataclass
+class ResolvedPath:
+    post: Post
+    comment: Optional[Comment] = None
+
+
+async def resolve_path(
+        db: AsyncSession, user_id: int, post_id: int, comment_id: int | None = None, viewer_id: int | None = None
+) -> ResolvedPath:
+    '''
+    Validates the user, post and comment ids of a url with one query instead of
+    post_validation, user_existing_validation, post_by_user_validation and comment_existing_validation,
+    raising the same errors in the same order. With viewer_id the post is also checked like
+    check_is_blocked_post_by_id. The loaded rows are returned for reuse by the handler.
+    '''
+    anchor = select(literal(1).label("anchor")).subquery()
+    query = select(
+        Post,
+        exists().where(and_(User.id == user_id)).label("user_exists")
+    ).select_from(anchor).outerjoin(Post, Post.id == post_id)
+
+    if comment_id is not None:
+        query = query.add_columns(Comment).outerjoin(Comment, Comment.id == comment_id)
+
+    result = await db.execute(query)
+    row = result.one()
+    post, user_exists = row[0], row[1]
+    comment = row[2] if comment_id is not None else None
+
+    if post is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post does not exist"
+        )
+    if not user_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User does not exist"
+        )
+    if post.owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post does not exist for the given user"
+        )
+    if viewer_id is not None:
+        check_is_blocked(post, viewer_id)
+    if comment_id is not None and comment is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Comment does not exist"
+        )
+
+    return ResolvedPath(post=post, comment=comment)
 
 
 async def check_access(access_allowed: bool):
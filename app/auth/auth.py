@@ -23,3 +23,4 @@ fastapi_users = FastAPIUsers[User, int](get_user_manager, [auth_backend])
 
 current_active_user = fastapi_users.current_user(active=True)
 
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
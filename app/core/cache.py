@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUTTLCache:
+    """Bounded in-process cache: least recently used entries are evicted first, stale entries expire."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Runs one coroutine per key at a time; concurrent callers with the same key await the same result.
+    The coroutine runs in its own task, a cancelled caller doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Returns (result, shared) where shared is True if the result came from another caller's call."""
+        future = self._in_flight.get(key)
+        shared = future is not None
+        if not shared:
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(future), shared
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if not future.cancelled():
+            # mark retrieved so a failure whose callers were all cancelled is not reported as "never retrieved"
+            future.exception()
+
+
+class HitCounter:
+    def __init__(self, *names: str):
+        self._counts: dict[str, int] = {name: 0 for name in names}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self._counts[name] = self._counts.get(name, 0) + value
+
+    def snapshot(self) -> dict[str, int]:
+        return dict(self._counts)
+
+    def ratio(self, *names: str) -> float:
+        """Share of all counted events that fall under the given names."""
+        total = sum(self._counts.values())
+        if not total:
+            return 0.0
+        return sum(self._counts.get(name, 0) for name in names) / total
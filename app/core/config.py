@@ -19,12 +19,103 @@ class Settings(BaseSettings):
     DB_NAME: str = os.environ.get("DB_NAME", "kinda_threads")
     DB_TEST_NAME: str = os.environ.get("DB_TEST_NAME", "test_kinda_threads")
 
+    DB_POOL_SIZE: int = os.environ.get("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW: int = os.environ.get("DB_MAX_OVERFLOW", 10)
+    # seconds, -1 keeps connections forever
+    DB_POOL_RECYCLE: int = os.environ.get("DB_POOL_RECYCLE", -1)
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", False)
+    DB_STATEMENT_CACHE_SIZE: int = os.environ.get("DB_STATEMENT_CACHE_SIZE", 100)
+    # PgBouncer in transaction pooling mode: no prepared statements are reused across transactions
+    DB_PGBOUNCER: bool = os.environ.get("DB_PGBOUNCER", False)
+    # read replica for GET requests, the primary is used if empty
+    DB_REPLICA_HOST: str = os.environ.get("DB_REPLICA_HOST", "")
+    DB_REPLICA_PORT: int = os.environ.get("DB_REPLICA_PORT", 5434)
+    DB_READ_YOUR_WRITES_SECONDS: int = os.environ.get("DB_READ_YOUR_WRITES_SECONDS", 5)
+
+    PAGE_DEFAULT_LIMIT: int = os.environ.get("PAGE_DEFAULT_LIMIT", 50)
+    PAGE_MAX_LIMIT: int = os.environ.get("PAGE_MAX_LIMIT", 500)
+    BREAKDOWN_MAX_SAMPLE_SIZE: int = os.environ.get("BREAKDOWN_MAX_SAMPLE_SIZE", 100)
+    BREAKDOWN_USE_ROLLUP: bool = os.environ.get("BREAKDOWN_USE_ROLLUP", True)
+    THREAD_MAX_DEPTH: int = os.environ.get("THREAD_MAX_DEPTH", 50)
+    THREAD_MAX_NODES: int = os.environ.get("THREAD_MAX_NODES", 1000)
+    POST_COMMENTS_PAGE_SIZE: int = os.environ.get("POST_COMMENTS_PAGE_SIZE", 20)
+    # newest matches per type ranked by /search
+    SEARCH_MAX_CANDIDATES: int = os.environ.get("SEARCH_MAX_CANDIDATES", 1000)
+
+    # rows fetched per round trip by the server-side cursor of /users/{user_id}/export
+    EXPORT_YIELD_PER: int = os.environ.get("EXPORT_YIELD_PER", 1000)
+
+    BULK_MAX_ITEMS: int = os.environ.get("BULK_MAX_ITEMS", 500)
+    BULK_MODERATION_CONCURRENCY: int = os.environ.get("BULK_MODERATION_CONCURRENCY", 16)
+
+    # 0 disables the post and comment cache of BaseManager.get_one
+    ENTITY_CACHE_SIZE: int = os.environ.get("ENTITY_CACHE_SIZE", 10000)
+    ENTITY_CACHE_TTL: int = os.environ.get("ENTITY_CACHE_TTL", 10)
+
+    # posts of authors with more followers aren't fanned out to timelines, they are merged in when feeds are read
+    FEED_FANOUT_MAX_FOLLOWERS: int = os.environ.get("FEED_FANOUT_MAX_FOLLOWERS", 10000)
+    # entries kept per timeline by app.tools.trim_timelines
+    FEED_TIMELINE_SIZE: int = os.environ.get("FEED_TIMELINE_SIZE", 500)
+    # latest posts of a followed author copied to the follower's timeline
+    FEED_BACKFILL_SIZE: int = os.environ.get("FEED_BACKFILL_SIZE", 20)
+
+    # months of partitions created ahead by app.tools.maintain_partitions, older partitions are detached
+    # after PARTITION_RETENTION_MONTHS, 0 keeps them all
+    PARTITION_MONTHS_AHEAD: int = os.environ.get("PARTITION_MONTHS_AHEAD", 3)
+    PARTITION_RETENTION_MONTHS: int = os.environ.get("PARTITION_RETENTION_MONTHS", 0)
+
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "")
     JWT_SECRET: str = os.environ.get("JWT_SECRET", "")
 
     API_KEY: str = os.environ.get("AI_API_KEY")
     GENERATIVE_MODEL_NAME: str = os.environ.get("GENERATIVE_MODEL_NAME")
 
+    MODERATION_CACHE_SIZE: int = os.environ.get("MODERATION_CACHE_SIZE", 10000)
+    MODERATION_CACHE_TTL: int = os.environ.get("MODERATION_CACHE_TTL", 3600)
+    MODERATION_VERDICT_MAX_AGE_DAYS: int = os.environ.get("MODERATION_VERDICT_MAX_AGE_DAYS", 30)
+
+    # "sync" moderates before storing, "deferred" stores content as pending and moderates in background workers
+    MODERATION_MODE: str = os.environ.get("MODERATION_MODE", "sync")
+    MODERATION_WORKERS: int = os.environ.get("MODERATION_WORKERS", 4)
+
+    # moderation requests are classified in batches of up to MODERATION_BATCH_SIZE items, 1 disables batching
+    MODERATION_BATCH_SIZE: int = os.environ.get("MODERATION_BATCH_SIZE", 1)
+    MODERATION_BATCH_WINDOW_MS: int = os.environ.get("MODERATION_BATCH_WINDOW_MS", 50)
+    # local lexicon and heuristics resolve obvious content before it reaches the model
+    MODERATION_PREFILTER_ENABLED: bool = os.environ.get("MODERATION_PREFILTER_ENABLED", True)
+    MODERATION_LEXICON_PATH: str = os.environ.get("MODERATION_LEXICON_PATH", "")
+    MODERATION_PREFILTER_ALLOW_MAX_LENGTH: int = os.environ.get("MODERATION_PREFILTER_ALLOW_MAX_LENGTH", 0)
+    MODERATION_RETRY_DELAY: int = os.environ.get("MODERATION_RETRY_DELAY", 30)
+    # pending rows left by a previous run are claimed by the starting app processes, one page at a time,
+    # and leased for MODERATION_RECOVERY_LEASE_SECONDS so that each row is resubmitted by one process only
+    MODERATION_RECOVERY_PAGE_SIZE: int = os.environ.get("MODERATION_RECOVERY_PAGE_SIZE", 100)
+    MODERATION_RECOVERY_LEASE_SECONDS: int = os.environ.get("MODERATION_RECOVERY_LEASE_SECONDS", 600)
+    # verdict when the model is unavailable: "open" lets content through, "closed" blocks it
+    MODERATION_FAILURE_POLICY: str = os.environ.get("MODERATION_FAILURE_POLICY", "closed")
+
+    # "inline" generates auto-replies during the request, "queue" stores jobs for `python -m app.workers`
+    AUTO_REPLY_MODE: str = os.environ.get("AUTO_REPLY_MODE", "inline")
+    AUTO_REPLY_MAX_ATTEMPTS: int = os.environ.get("AUTO_REPLY_MAX_ATTEMPTS", 5)
+    AUTO_REPLY_BACKOFF_SECONDS: int = os.environ.get("AUTO_REPLY_BACKOFF_SECONDS", 10)
+    AUTO_REPLY_LEASE_SECONDS: int = os.environ.get("AUTO_REPLY_LEASE_SECONDS", 120)
+    AUTO_REPLY_WORKER_BATCH_SIZE: int = os.environ.get("AUTO_REPLY_WORKER_BATCH_SIZE", 10)
+    AUTO_REPLY_WORKER_POLL_SECONDS: float = os.environ.get("AUTO_REPLY_WORKER_POLL_SECONDS", 1)
+
+    # deletes cascading to more rows are queued and run by the deletion worker, DELETION_CHUNK_SIZE comments
+    # per transaction
+    DELETION_INLINE_MAX_ROWS: int = os.environ.get("DELETION_INLINE_MAX_ROWS", 1000)
+    DELETION_CHUNK_SIZE: int = os.environ.get("DELETION_CHUNK_SIZE", 500)
+    DELETION_MAX_ATTEMPTS: int = os.environ.get("DELETION_MAX_ATTEMPTS", 5)
+    DELETION_BACKOFF_SECONDS: int = os.environ.get("DELETION_BACKOFF_SECONDS", 10)
+    DELETION_LEASE_SECONDS: int = os.environ.get("DELETION_LEASE_SECONDS", 120)
+    DELETION_WORKER_BATCH_SIZE: int = os.environ.get("DELETION_WORKER_BATCH_SIZE", 2)
+    DELETION_WORKER_POLL_SECONDS: float = os.environ.get("DELETION_WORKER_POLL_SECONDS", 1)
+
+    AI_MAX_CONCURRENCY: int = os.environ.get("AI_MAX_CONCURRENCY", 16)
+    AI_TIMEOUT_SECONDS: float = os.environ.get("AI_TIMEOUT_SECONDS", 10)
+    AI_BREAKER_FAILURE_THRESHOLD: int = os.environ.get("AI_BREAKER_FAILURE_THRESHOLD", 5)
+    AI_BREAKER_RESET_SECONDS: int = os.environ.get("AI_BREAKER_RESET_SECONDS", 30)
+
     class Config:
         env_file = ".env"
 
@@ -1,30 +1,76 @@
 import os
 from typing import AsyncGenerator
+from uuid import uuid4
 
+from fastapi import Request
 from sqlalchemy import URL
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import  DeclarativeMeta, declarative_base
 
 from app.core.config import config
 
-url_object = URL.create(
-    "postgresql+asyncpg",
-    username=config.DB_USERNAME,
-    password=config.DB_PASSWORD,
-    host=config.DB_HOST,
-    port=config.DB_PORT,
-    database=config.DB_NAME
-)
+# set on responses to writes, GET requests carrying it read from the primary until it expires
+READ_PRIMARY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
 
-engine = create_async_engine(url_object)
+
+def build_url(host: str, port: int) -> URL:
+    return URL.create(
+        "postgresql+asyncpg",
+        username=config.DB_USERNAME,
+        password=config.DB_PASSWORD,
+        host=host,
+        port=port,
+        database=config.DB_NAME
+    )
+
+
+def build_engine(url: URL) -> AsyncEngine:
+    if config.DB_PGBOUNCER:
+        # statements prepared on one server connection don't exist on the next one pgbouncer hands out
+        statement_cache_size = 0
+        connect_args = {"prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"}
+    else:
+        statement_cache_size = config.DB_STATEMENT_CACHE_SIZE
+        connect_args = {}
+
+    return create_async_engine(
+        url.update_query_dict({"prepared_statement_cache_size": str(statement_cache_size)}),
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": statement_cache_size, **connect_args},
+    )
+
+
+url_object = build_url(config.DB_HOST, config.DB_PORT)
+
+engine = build_engine(url_object)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+if config.DB_REPLICA_HOST:
+    replica_engine = build_engine(build_url(config.DB_REPLICA_HOST, config.DB_REPLICA_PORT))
+    replica_session_maker = async_sessionmaker(replica_engine, expire_on_commit=False)
+else:
+    replica_session_maker = None
+
 Base: DeclarativeMeta = declarative_base()
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
-        yield session
+def reads_from_replica(request: Request) -> bool:
+    return (
+        replica_session_maker is not None
+        and request.method in SAFE_METHODS
+        and READ_PRIMARY_COOKIE not in request.cookies
+    )
 
 
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    ''' the request's unit of work, committed when the handler returns '''
+    # imported here: the unit of work invalidates the entity cache, which imports this module
+    from app.db.unit_of_work import unit_of_work
 
+    session_maker = replica_session_maker if reads_from_replica(request) else async_session_maker
+    async with unit_of_work(session_maker) as session:
+        yield session
@@ -0,0 +1,153 @@
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Optional, Type
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import LRUTTLCache, SingleFlight, HitCounter
+from app.core.config import config
+from app.db.database import Base
+
+
+class CacheBackend(ABC):
+    """
+    Storage of version-stamped entries. An entry is only served while its stamp equals the current
+    version of its key, so a value loaded before an invalidation but stored after it is never returned.
+    A shared backend (e.g. Redis, with INCR for versions) lets every app process see each other's invalidations.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[tuple[int, Any]]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, version: int, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    async def version(self, key: str) -> int:
+        pass
+
+    @abstractmethod
+    async def invalidate(self, key: str) -> None:
+        ''' drops the entry and moves the key to a new version '''
+        pass
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-process stand-in for a shared backend: invalidations are seen by this process only,
+    entries of other processes stay stale for up to `ttl` seconds.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._entries = LRUTTLCache(max_size=max_size, ttl=ttl)
+        # versions outlive the entries they stamp, a forgotten version reads as 0
+        self._versions = LRUTTLCache(max_size=max_size * 4, ttl=ttl * 2)
+        self._next_version = itertools.count(1)
+
+    async def get(self, key: str) -> Optional[tuple[int, Any]]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, version: int, value: Any) -> None:
+        self._entries.set(key, (version, value))
+
+    async def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    async def invalidate(self, key: str) -> None:
+        # globally unique, an evicted and re-created version can't match an old stamp
+        self._versions.set(key, next(self._next_version))
+        self._entries.delete(key)
+
+
+class EntityCache:
+    """
+    Read-through cache of post and comment rows used by BaseManager.get_one.
+    Column values are cached, every hit builds a new detached instance, so cached rows are never shared
+    between sessions. Relationships of cached instances are not loaded.
+    Concurrent misses of the same row share one query.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self._single_flight = SingleFlight()
+        self._counters: dict[str, HitCounter] = {}
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(model_class: Type[Base], id_: int) -> str:
+        return f"{model_class.__tablename__}:{id_}"
+
+    def _counter(self, model_class: Type[Base]) -> HitCounter:
+        name = model_class.__tablename__
+        if name not in self._counters:
+            self._counters[name] = HitCounter("hits", "coalesced", "misses")
+        return self._counters[name]
+
+    async def get_or_load(
+            self, model_class: Type[Base], id_: int, load: Callable[[], Awaitable[Optional[Base]]]
+    ) -> Optional[Base]:
+        if not self.is_enabled:
+            return await load()
+
+        key = self.make_key(model_class, id_)
+        counter = self._counter(model_class)
+
+        version = await self.backend.version(key)
+        entry = await self.backend.get(key)
+        if entry is not None and entry[0] == version:
+            counter.incr("hits")
+            return self._to_instance(model_class, entry[1])
+
+        async def load_and_store() -> Optional[dict]:
+            entity = await load()
+            if entity is None:
+                return None
+            values = self._to_values(entity)
+            await self.backend.set(key, version, values)
+            return values
+
+        values, shared = await self._single_flight.do(key, load_and_store)
+        counter.incr("coalesced" if shared else "misses")
+        return None if values is None else self._to_instance(model_class, values)
+
+    async def invalidate(self, model_class: Type[Base], *ids: int) -> None:
+        ''' called after the transaction which changed or deleted the rows is committed '''
+        if not self.is_enabled:
+            return
+        for id_ in ids:
+            await self.backend.invalidate(self.make_key(model_class, id_))
+
+    @staticmethod
+    def _to_values(entity: Base) -> dict:
+        table_columns = entity.__table__.c
+        # deferred columns which weren't loaded stay unloaded on the cached instances too
+        unloaded = inspect(entity).unloaded
+        return {
+            attr.key: getattr(entity, attr.key)
+            for attr in inspect(type(entity)).column_attrs
+            if attr.key in table_columns and attr.key not in unloaded
+        }
+
+    @staticmethod
+    def _to_instance(model_class: Type[Base], values: dict) -> Base:
+        entity = model_class(**values)
+        make_transient_to_detached(entity)
+        return entity
+
+    def stats(self) -> dict:
+        return {
+            name: {**counter.snapshot(), "hit_ratio": counter.ratio("hits", "coalesced")}
+            for name, counter in self._counters.items()
+        }
+
+
+entity_cache = EntityCache(
+    backend=LocalCacheBackend(max_size=config.ENTITY_CACHE_SIZE, ttl=config.ENTITY_CACHE_TTL)
+    if config.ENTITY_CACHE_SIZE > 0 else None
+)
@@ -0,0 +1,178 @@
+from collections import Counter
+from datetime import date
+from typing import NamedTuple, Optional, Type
+
+from sqlalchemy import Select, select, and_, or_, case, cast, func, delete, text, union, union_all, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.db.database import Base
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.models.user_daily_activity import (
+    UserDailyActivity, COUNTERS, SENT_COUNTERS, RECEIVED_COUNTERS
+)
+
+# (user_id, day, counter) -> number of rows counted in it
+ActivitySnapshot = Counter[tuple[int, date, str]]
+
+
+class DailyCount(NamedTuple):
+    ''' shaped like the rows of the managers' GROUP BY day, status breakdown queries '''
+    day: date
+    status: str
+    count: int
+    sent: bool = False
+    received: bool = False
+
+
+class ActivityManager:
+    """
+    Keeps the `user_daily_activity` rollup in step with posts and comments.
+    Writers take a snapshot of the counters the changed rows are counted in before and after the change
+    and apply the difference as `counter = counter + delta` upserts in the same transaction.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _status_counter(model_class: Type[Base], prefix: str):
+        return case(
+            (model_class.is_blocked, f"{prefix}_blocked"),
+            (model_class.is_pending, f"{prefix}_pending"),
+            else_=f"{prefix}_published"
+        ).label("counter")
+
+    @classmethod
+    def contributions(cls, model_class: Type[Base], ids: Optional[list[int]] = None) -> list[Select]:
+        ''' (user_id, day, counter) per counter a post or comment is counted in, of every row if ids is None '''
+        day = cast(model_class.created_at, Date).label("day")
+        id_filter = [] if ids is None else [model_class.id.in_(ids)]
+
+        if model_class is Post:
+            return [
+                select(Post.owner_id.label("user_id"), day, cls._status_counter(Post, "posts")).where(*id_filter)
+            ]
+
+        # the same semantics as CommentManager.get_daily_breakdown, union keeps a comment received once per user
+        received_counter = cls._status_counter(Comment, "comments_received")
+        parent = aliased(Comment)
+        received = union(
+            select(Comment.id, Post.owner_id.label("user_id"), day, received_counter).join(
+                Post, Comment.post_id == Post.id
+            ).where(
+                and_(Post.owner_id != Comment.owner_id, *id_filter)
+            ),
+            select(Comment.id, parent.owner_id.label("user_id"), day, received_counter).join(
+                parent, Comment.comment_id_reply_to == parent.id
+            ).where(*id_filter),
+        ).subquery()
+
+        return [
+            select(Comment.owner_id.label("user_id"), day, cls._status_counter(Comment, "comments_sent")).where(
+                *id_filter
+            ),
+            select(received.c.user_id, received.c.day, received.c.counter),
+        ]
+
+    async def snapshot(self, model_class: Type[Base], ids: list[int], lock: bool = False) -> ActivitySnapshot:
+        if not ids:
+            return Counter()
+
+        if lock:
+            # concurrent writers of the same rows must not both apply a delta against the same old state
+            await self.db.execute(select(model_class.id).where(model_class.id.in_(ids)).with_for_update())
+
+        contributions = union_all(*self.contributions(model_class, ids)).subquery()
+        result = await self.db.execute(
+            select(
+                contributions.c.user_id, contributions.c.day, contributions.c.counter, func.count()
+            ).group_by(contributions.c.user_id, contributions.c.day, contributions.c.counter)
+        )
+        return Counter({(user_id, day, counter): count for user_id, day, counter, count in result.all()})
+
+    async def apply_change(self, before: ActivitySnapshot, after: ActivitySnapshot) -> None:
+        deltas = Counter(after)
+        deltas.subtract(before)
+
+        rows: dict[tuple[int, date], dict[str, int]] = {}
+        for (user_id, day, counter), delta in deltas.items():
+            if delta:
+                rows.setdefault((user_id, day), dict.fromkeys(COUNTERS, 0))[counter] += delta
+        if not rows:
+            return
+
+        # sorted, so concurrent writers lock the rollup rows in the same order
+        statement = insert(UserDailyActivity).values(
+            [{"user_id": user_id, "day": day, **counters} for (user_id, day), counters in sorted(rows.items())]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserDailyActivity.user_id, UserDailyActivity.day],
+            set_={
+                counter: getattr(UserDailyActivity, counter) + getattr(statement.excluded, counter)
+                for counter in COUNTERS
+            }
+        )
+        await self.db.execute(statement)
+
+    async def apply_status_change(self, model_class: Type[Base], id_: int, old_status: str, new_status: str) -> None:
+        ''' a row whose status changed counts in the same counters as before under the new status, one snapshot does '''
+        if old_status == new_status:
+            return
+
+        after = await self.snapshot(model_class, [id_])
+        before = Counter({
+            (user_id, day, f"{counter.rsplit('_', 1)[0]}_{old_status}"): count
+            for (user_id, day, counter), count in after.items()
+        })
+        await self.apply_change(before, after)
+
+    async def get_daily_counts(
+            self, user_id: int, date_from: date, date_to: date, counters: tuple[str, ...]
+    ) -> list[DailyCount]:
+        query = select(UserDailyActivity).where(
+            and_(
+                UserDailyActivity.user_id == user_id,
+                UserDailyActivity.day >= date_from,
+                UserDailyActivity.day <= date_to,
+                or_(*(getattr(UserDailyActivity, counter) != 0 for counter in counters))
+            )
+        ).order_by(UserDailyActivity.day)
+
+        result = await self.db.execute(query)
+        activities = result.scalars().all()
+
+        return [
+            DailyCount(
+                day=activity.day,
+                status=counter.rsplit("_", 1)[1],
+                count=getattr(activity, counter),
+                sent=counter in SENT_COUNTERS,
+                received=counter in RECEIVED_COUNTERS,
+            )
+            for activity in activities
+            for counter in counters
+            if getattr(activity, counter)
+        ]
+
+    async def rebuild(self) -> int:
+        ''' recount the whole rollup from the post and comment tables, returns the number of (user, day) rows '''
+        # writers wait until the rebuilt counters are committed and then apply their deltas on top of them
+        await self.db.execute(text(f"LOCK TABLE {UserDailyActivity.__tablename__} IN EXCLUSIVE MODE"))
+        await self.db.execute(delete(UserDailyActivity))
+
+        contributions = union_all(
+            *self.contributions(Post), *self.contributions(Comment)
+        ).subquery()
+        query = select(
+            contributions.c.user_id,
+            contributions.c.day,
+            *(func.count().filter(contributions.c.counter == counter).label(counter) for counter in COUNTERS)
+        ).group_by(contributions.c.user_id, contributions.c.day)
+
+        result = await self.db.execute(
+            insert(UserDailyActivity).from_select(["user_id", "day", *COUNTERS], query)
+        )
+        return result.rowcount
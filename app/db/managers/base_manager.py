@@ -1,14 +1,22 @@
+import asyncio
 from abc import ABC, abstractmethod
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, date, time, timedelta
 from typing import TypeVar, Generic, Type, Optional
 
 from pydantic import BaseModel
-from sqlalchemy import select, and_, update, Select
+from sqlalchemy import select, and_, or_, update, insert, delete, Select, case, cast, func, Date
+from sqlalchemy.dialects.postgresql import array_agg, aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.schemas import user_schemas
-from app.db.database import Base
-from app.google_api_ai.controller import Controller
+from app.core.config import config
+from app.db.database import Base, async_session_maker
+from app.db.entity_cache import entity_cache
+from app.db.managers.activity_manager import ActivityManager
+from app.db.unit_of_work import after_commit, is_written, mark_written, release_connection
+from app.google_api_ai.controller import get_controller
+from app.google_api_ai.moderation_workers import moderation_pool
 
 EntityType = TypeVar('EntityType', bound=BaseModel)
 ModelType = TypeVar('ModelType', bound=Base)
@@ -17,40 +25,136 @@ ModelType = TypeVar('ModelType', bound=Base)
 class BaseManager(ABC, Generic[EntityType, ModelType]):
     def __init__(self, db: AsyncSession):
         self.db = db
-        self._c = Controller()
+        self._c = get_controller()
 
     @property
     @abstractmethod
     def model_class(self) -> Type[ModelType]:
         pass
 
-    async def create(self, entity_create: EntityType, owner_id: int, **kwargs) -> int:
-        is_passed_validation = await self._c.check_for_inappropriate_content(entity_create.content)
+    @property
+    def is_moderation_deferred(self) -> bool:
+        return config.MODERATION_MODE == "deferred"
+
+    async def _moderation_state(self, content: str) -> dict[str, bool]:
+        if self.is_moderation_deferred:
+            return {"is_blocked": False, "is_pending": True}
+
+        # the request's connection isn't held during the model call, unless the request already wrote something
+        await release_connection(self.db)
+        is_passed_validation = await self._c.check_for_inappropriate_content(content)
+        return {"is_blocked": not is_passed_validation, "is_pending": False}
+
+    async def create(
+            self, entity_create: EntityType, owner_id: int, moderation_state: Optional[dict[str, bool]] = None,
+            **kwargs
+    ) -> ModelType:
+        '''
+        the stored row comes back from INSERT ... RETURNING, callers don't need to read it again;
+        `moderation_state` is the result of a moderation the caller already ran
+        '''
+        if moderation_state is None:
+            moderation_state = await self._moderation_state(entity_create.content)
 
-        entity_instance = self.model_class(
+        statement = insert(self.model_class).values(
             **entity_create.model_dump(),
             owner_id=owner_id,
-            is_blocked=not is_passed_validation,
+            **moderation_state,
             **kwargs
+        ).returning(self.model_class)
+
+        result = await self.db.execute(statement)
+        entity_instance = result.scalar_one()
+        mark_written(self.db, self.model_class, entity_instance.id)
+        activity = ActivityManager(self.db)
+        await activity.apply_change(
+            Counter(), await activity.snapshot(self.model_class, [entity_instance.id])
+        )
+        await self._on_created(self.db, entity_instance)
+
+        if entity_instance.is_pending:
+            self._submit_after_commit([entity_instance.id])
+        return entity_instance
+
+    def _submit_after_commit(self, ids: list[int]) -> None:
+        ''' the moderation workers read the pending rows in their own sessions, once they are committed '''
+        async def submit() -> None:
+            for id_ in ids:
+                moderation_pool.submit(self.model_class, id_)
+
+        after_commit(self.db, submit)
+
+    async def _on_created(self, async_session: AsyncSession, entity_instance: ModelType) -> None:
+        ''' hook for work which must be committed in the same transaction as the new entity '''
+        pass
+
+    async def create_many(self, entities_create: list[EntityType], owner_id: int, **kwargs) -> list[dict]:
+        '''
+        Moderates the items concurrently, at most BULK_MODERATION_CONCURRENCY at a time, and inserts them with
+        a multi-row INSERT ... RETURNING in one transaction. Returns {id, status, detail} per item, in order.
+        '''
+        semaphore = asyncio.Semaphore(config.BULK_MODERATION_CONCURRENCY)
+
+        async def moderate(entity_create: EntityType) -> dict[str, bool]:
+            async with semaphore:
+                return await self._moderation_state(entity_create.content)
+
+        # released once here, the concurrent moderations below must not end the transaction each
+        await release_connection(self.db)
+        moderation_states = await asyncio.gather(
+            *(moderate(entity_create) for entity_create in entities_create), return_exceptions=True
         )
 
-        try:
-            async with self.db as async_session:
-                self.db.add(entity_instance)
-                await async_session.flush()
-                await async_session.refresh(entity_instance)
-                await async_session.commit()
-        except Exception:
-            await self.db.rollback()
-            raise
-        return entity_instance.id
+        results: list[dict] = []
+        rows: list[dict] = []
+        row_indexes: list[int] = []
+        for index, (entity_create, moderation_state) in enumerate(zip(entities_create, moderation_states)):
+            if isinstance(moderation_state, Exception):
+                results.append({"status": "failed", "detail": f"Moderation failed: {moderation_state}"})
+                continue
+            results.append({"status": self._status(**moderation_state)})
+            rows.append({**entity_create.model_dump(), "owner_id": owner_id, **moderation_state, **kwargs})
+            row_indexes.append(index)
+
+        if rows:
+            result = await self.db.execute(
+                # sort_by_parameter_order: rows come back in the order they were given
+                insert(self.model_class).returning(self.model_class, sort_by_parameter_order=True),
+                rows
+            )
+            entities = list(result.scalars())
+            ids = [entity.id for entity in entities]
+            mark_written(self.db, self.model_class, *ids)
+            activity = ActivityManager(self.db)
+            await activity.apply_change(Counter(), await activity.snapshot(self.model_class, ids))
+            await self._on_created_many(self.db, entities)
+
+            for index, id_ in zip(row_indexes, ids):
+                results[index]["id"] = id_
+            self._submit_after_commit([id_ for row, id_ in zip(rows, ids) if row["is_pending"]])
+        return results
+
+    async def _on_created_many(self, async_session: AsyncSession, entities: list[ModelType]) -> None:
+        ''' _on_created of create_many '''
+        pass
+
+    @staticmethod
+    def _published(entities: list[ModelType]) -> list[ModelType]:
+        return [entity for entity in entities if not entity.is_blocked and not entity.is_pending]
+
+    @staticmethod
+    def _status(is_blocked: bool, is_pending: bool) -> str:
+        if is_blocked:
+            return "blocked"
+        if is_pending:
+            return "pending"
+        return "published"
 
     async def _get_many_by_query(
             self, query: Select
     ) -> list[ModelType] | None:
-        async with self.db as async_session:
-            result = await async_session.execute(query)
-            entities = result.scalars().all()
+        result = await self.db.execute(query)
+        entities = result.scalars().all()
 
         if not entities:
             return
@@ -58,15 +162,65 @@ class BaseManager(ABC, Generic[EntityType, ModelType]):
 
     @abstractmethod
     async def get_many_by_entity_owner_id(
-            self, entity_owner_id: int, from_: datetime, till_: datetime, visible_blocked: bool = False
+            self, entity_owner_id: int, from_: datetime, till_: datetime, visible_blocked: bool = False,
+            viewer_id: Optional[int] = None, limit: Optional[int] = None, after: Optional[tuple[datetime, int]] = None
     ) -> list[ModelType] | None:
         pass
 
     @abstractmethod
-    async def get_many(self, date_from: datetime.date, date_to: datetime.date, user_id: int) -> list[ModelType]:
+    async def get_daily_breakdown(
+            self, date_from: date, date_to: date, user_id: int, sample_size: int = 0
+    ) -> dict | None:
         pass
 
+    @staticmethod
+    def _is_visible(entity, viewer_id: Optional[int]):
+        ''' not blocked, pending posts and comments are visible for their owner only '''
+        return and_(entity.is_blocked.is_(False), or_(entity.is_pending.is_(False), entity.owner_id == viewer_id))
+
+    def _created_between(self, date_from: date, date_to: date, column=None) -> list:
+        ''' [date_from 00:00, date_to + 1 day 00:00) on created_at, unlike func.date() it can use an index '''
+        column = self.model_class.created_at if column is None else column
+        filters = [column >= datetime.combine(date_from, time.min)]
+        if date_to < date.max:
+            filters.append(column < datetime.combine(date_to + timedelta(days=1), time.min))
+        return filters
+
+    def _breakdown_columns(self, sample_size: int) -> list:
+        ''' day, status, count and optionally the newest `sample_size` ids of a GROUP BY day, status query '''
+        columns = [
+            cast(self.model_class.created_at, Date).label("day"),
+            case(
+                (self.model_class.is_blocked, "blocked"),
+                (self.model_class.is_pending, "pending"),
+                else_="published"
+            ).label("status"),
+            func.count().label("count"),
+        ]
+        if sample_size:
+            columns.append(
+                array_agg(
+                    aggregate_order_by(self.model_class.id, self.model_class.id.desc())
+                )[1:sample_size].label("ids")
+            )
+        return columns
+
+    @staticmethod
+    def _empty_status_breakdown() -> dict[str, dict]:
+        return {status: {"count": 0, "ids": []} for status in ("published", "blocked", "pending")}
+
+    @staticmethod
+    def _add_to_bucket(bucket: dict, count: int, ids: list[int] | None, sample_size: int) -> None:
+        ''' keeps the newest `sample_size` ids whatever order the days are added in '''
+        bucket["count"] += count
+        if sample_size and ids:
+            bucket["ids"] = sorted(bucket["ids"] + ids, reverse=True)[:sample_size]
+
     async def get_one(self, id_: int, query: Optional[Select] = None) -> ModelType:
+        '''
+        rows loaded with the default query come from the entity cache, detached from the session,
+        except rows written by this unit of work, the cache doesn't have their uncommitted state
+        '''
         if query is None:
             # set default
             query = select(self.model_class).where(
@@ -74,59 +228,116 @@ class BaseManager(ABC, Generic[EntityType, ModelType]):
                             self.model_class.id == id_,
                         )
                     )
+            if not is_written(self.db, self.model_class, id_):
+                return await entity_cache.get_or_load(self.model_class, id_, lambda: self._load_detached(query))
+
+        return await self._get_one_by_query(query)
+
+    async def _load_detached(self, query: Select) -> ModelType:
+        '''
+        a cache miss is loaded in a session of its own: the load is shared with concurrent misses of the row
+        and keeps running for them if this request is cancelled. It always reads the primary, the cached row is
+        served to every request, a lagging replica would hide a writer's own write behind the new version
+        '''
+        await release_connection(self.db)
+        async with async_session_maker() as async_session:
+            result = await async_session.execute(query)
+            return result.scalars().first()
+
+    async def _get_one_by_query(self, query: Select) -> ModelType:
+        result = await self.db.execute(
+            query
+        )
+        return result.scalars().first()
+
+    async def update(
+            self, id_: int, entity_create: EntityType, moderation_state: Optional[dict[str, bool]] = None
+    ) -> Optional[ModelType]:
+        '''
+        One UPDATE ... RETURNING hands back the updated row together with its status before the update,
+        None if there is no such row.
+        '''
+        if moderation_state is None:
+            moderation_state = await self._moderation_state(entity_create.content)
 
-        async with self.db as async_session:
-            result = await async_session.execute(
-                query
+        # FOR UPDATE: the old status is read from the same row version the update is applied to
+        old = select(self.model_class.id, self.model_class.is_blocked, self.model_class.is_pending).where(
+            self.model_class.id == id_
+        ).with_for_update().cte("old")
+        statement = update(self.model_class).where(
+            and_(
+                self.model_class.id == old.c.id,
             )
-            entity_db = result.scalars().first()
-        return entity_db
+        ).values(
+            **entity_create.model_dump(),
+            **moderation_state,
+            updated_at=datetime.utcnow()
+        ).returning(
+            self.model_class, old.c.is_blocked, old.c.is_pending
+        )
+
+        result = await self.db.execute(statement)
+        row = result.one_or_none()
+        if row is None:
+            return
+        entity, was_blocked, was_pending = row
+        mark_written(self.db, self.model_class, id_)
+        old_status, new_status = self._status(was_blocked, was_pending), self._status(**moderation_state)
+        await ActivityManager(self.db).apply_status_change(self.model_class, id_, old_status, new_status)
+        await self._on_status_changed(self.db, entity, old_status, new_status)
 
-    async def update(self, id_: int, entity_create: EntityType) -> None:
-        is_passed_validation = await self._c.check_for_inappropriate_content(entity_create.content)
+        if moderation_state["is_pending"]:
+            self._submit_after_commit([id_])
+        return entity
 
-        try:
-            async with self.db as async_session:
-                await async_session.execute(
-                    update(self.model_class).where(
-                        and_(
-                            self.model_class.id == id_,
-                        )
-                    ).values(
-                        **entity_create.model_dump(),
-                        is_blocked=not is_passed_validation,
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await async_session.flush()
-                await async_session.commit()
-        except Exception:
-            await async_session.rollback()
-            raise
-
-    async def delete(self, id_: int):
-        try:
-            async with self.db as async_session:
-                entity = await self.get_one(id_)
-                await async_session.delete(entity)
-                await async_session.commit()
-        except Exception:
-            await async_session.rollback()
-            raise
+    async def _on_status_changed(
+            self, async_session: AsyncSession, entity: ModelType, old_status: str, new_status: str
+    ) -> None:
+        ''' hook for work which must be committed in the same transaction as the update of the entity '''
+        pass
 
-    @staticmethod
-    def filter_by_blocked(entities: list[ModelType]) -> dict[str, list[ModelType]]:
-        result = {
-            "published": [],
-            "blocked": []
-        }
-        for entity in entities:
-            if entity.is_blocked:
-                result["blocked"].append(entity)
-            else:
-                result["published"].append(entity)
-
-        return result
+    async def delete(self, id_: int) -> list[int]:
+        ''' removes the row with its cascades, returns the ids of the deleted rows '''
+        return await self.delete_many([id_])
+
+    async def delete_many(self, ids: list[int]) -> list[int]:
+        '''
+        removes the rows with their cascades with one DELETE ... RETURNING per table,
+        returns the ids of the deleted rows of this table
+        '''
+        deleted_ids = await self._deleted_with(self.db, ids)
+        activity = ActivityManager(self.db)
+        activity_before = await activity.snapshot(self.model_class, deleted_ids, lock=True)
+        dependents = await self._delete_dependents(self.db, deleted_ids)
+        result = await self.db.execute(
+            delete(self.model_class).where(
+                self.model_class.id.in_(deleted_ids)
+            ).returning(self.model_class)
+        )
+        deleted = list(result.scalars())
+        deleted_ids = [entity.id for entity in deleted]
+        await activity.apply_change(activity_before, Counter())
+        await self._on_deleted(self.db, deleted)
+
+        mark_written(self.db, self.model_class, *deleted_ids)
+        for model_class, dependent_ids in dependents.items():
+            mark_written(self.db, model_class, *dependent_ids)
+        return deleted_ids
+
+    async def _on_deleted(self, async_session: AsyncSession, entities: list[ModelType]) -> None:
+        ''' hook for work which must be committed in the same transaction as the deletion, gets the deleted rows '''
+        pass
+
+    async def _deleted_with(self, async_session: AsyncSession, ids: list[int]) -> list[int]:
+        ''' ids of the rows of this table removed by deleting `ids`, cascades included '''
+        return list(ids)
+
+    async def _delete_dependents(self, async_session: AsyncSession, ids: list[int]) -> dict[Type[Base], list[int]]:
+        '''
+        deletes the rows of other tables the foreign keys would cascade to, before the rows `ids` are deleted,
+        so the counters derived from them are updated too; returns their ids by model
+        '''
+        return {}
 
     @abstractmethod
     def check_access_to_content(
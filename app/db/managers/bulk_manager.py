@@ -0,0 +1,125 @@
+import csv
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Literal, Optional
+
+from sqlalchemy import Boolean, DateTime, Integer, String, Table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.managers.activity_manager import ActivityManager
+from app.db.managers.counter_manager import CounterManager
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.models.user import User
+
+# foreign key order, parents are loaded before the rows referencing them
+# comment.comment_id_reply_to is checked at the end of its COPY statement, replies may come before their parents
+BULK_TABLES: dict[str, Table] = {model.__tablename__: model.__table__ for model in (User, Post, Comment)}
+# recomputed after an import instead of being copied
+DERIVED_COLUMNS = {"comment_count", "reply_count", "follower_count"}
+
+BulkFormat = Literal["csv", "ndjson"]
+# "keep" takes is_blocked and is_pending from the file
+Moderation = Literal["keep", "skip", "later"]
+
+
+def bulk_columns(table: Table) -> list[str]:
+    return [
+        column.name for column in table.columns
+        if column.computed is None and column.name not in DERIVED_COLUMNS
+    ]
+
+
+def bulk_path(directory: Path, table_name: str, format_: BulkFormat) -> Path:
+    return directory / f"{table_name}.{format_}"
+
+
+class BulkManager:
+    """
+    Moves the user, post and comment tables to and from CSV or NDJSON files with COPY, bypassing the ORM.
+    An import is one transaction: rows are streamed with binary COPY, then the id sequences, the comment counters
+    and the daily activity rollup are brought in line with the loaded rows.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _driver_connection(self):
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection
+
+    async def export_table(self, table_name: str, path: Path, format_: BulkFormat = "csv") -> str:
+        ''' returns the COPY status, "COPY <rows>" '''
+        table = BULK_TABLES[table_name]
+        columns = ", ".join(f'"{name}"' for name in bulk_columns(table))
+        query = f'SELECT {columns} FROM "{table.name}" ORDER BY id'
+        driver_connection = await self._driver_connection()
+
+        if format_ == "csv":
+            return await driver_connection.copy_from_query(query, output=str(path), format="csv", header=True)
+        # a csv whose delimiter and quote never occur in json output is one json object per line, unescaped
+        return await driver_connection.copy_from_query(
+            f"SELECT row_to_json(exported) FROM ({query}) AS exported",
+            output=str(path), format="csv", delimiter="\x02", quote="\x01"
+        )
+
+    async def import_table(
+            self, table_name: str, path: Path, format_: BulkFormat = "csv", moderation: Moderation = "keep"
+    ) -> str:
+        ''' appends the rows of the file, returns the COPY status, "COPY <rows>" '''
+        table = BULK_TABLES[table_name]
+        columns = bulk_columns(table)
+        driver_connection = await self._driver_connection()
+        return await driver_connection.copy_records_to_table(
+            table.name, records=self._records(table, columns, path, format_, moderation), columns=columns
+        )
+
+    async def _records(
+            self, table: Table, columns: list[str], path: Path, format_: BulkFormat, moderation: Moderation
+    ) -> AsyncIterator[tuple]:
+        overrides = {}
+        if "is_pending" in columns and moderation != "keep":
+            # deferred moderation workers pick up pending rows when they start
+            overrides = {"is_blocked": False, "is_pending": True} if moderation == "later" else {"is_pending": False}
+
+        with path.open(newline="", encoding="utf-8") as file:
+            rows = csv.DictReader(file) if format_ == "csv" else self._ndjson_rows(file)
+            for row in rows:
+                row.update(overrides)
+                yield tuple(self._convert(table, name, row.get(name)) for name in columns)
+
+    @staticmethod
+    def _ndjson_rows(file) -> Iterator[dict]:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+    @staticmethod
+    def _convert(table: Table, name: str, value) -> Optional[object]:
+        ''' csv and json values to the python types binary COPY encodes, an empty csv field is NULL '''
+        column_type = table.columns[name].type
+        if not isinstance(value, str) or isinstance(column_type, String):
+            return value
+        if value == "":
+            return None
+        if isinstance(column_type, Integer):
+            return int(value)
+        if isinstance(column_type, Boolean):
+            return value.lower() in ("t", "true", "1")
+        if isinstance(column_type, DateTime):
+            return datetime.fromisoformat(value)
+        return value
+
+    async def finish_import(self, table_names: list[str]) -> None:
+        ''' the state the ORM writes keep up to date, recomputed for the imported rows '''
+        for table_name in table_names:
+            # ids come from the files, the next generated id has to follow them
+            await self.db.execute(
+                text(f"SELECT setval(pg_get_serial_sequence(:table, 'id'), max(id)) FROM \"{table_name}\""),
+                {"table": f'"{table_name}"'}
+            )
+        if {Post.__tablename__, Comment.__tablename__} & set(table_names):
+            await CounterManager(self.db).reconcile()
+            await ActivityManager(self.db).rebuild()
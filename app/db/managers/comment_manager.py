@@ -1,14 +1,22 @@
+import asyncio
 from datetime import datetime
 from typing import Type, Optional
 
-from sqlalchemy import Select, select, and_, func, or_
+from sqlalchemy import Select, select, and_, or_, tuple_, union, func, literal, true, cast, Integer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased
 
 from app.api.schemas import comment_schemas, user_schemas
+from app.core.config import config
+from app.db.managers.activity_manager import ActivityManager
 from app.db.managers.base_manager import BaseManager, ModelType
-from app.db.managers.post_manager import PostManager
+from app.db.managers.counter_manager import CounterManager
+from app.db.models.user_daily_activity import SENT_COUNTERS, RECEIVED_COUNTERS
+from app.db.managers.post_manager import PostManager, PostLoad
+from app.db.models.auto_reply_job import AutoReplyJob
 from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.unit_of_work import after_commit, release_connection, unit_of_work
 
 
 class CommentManager(BaseManager[[comment_schemas.CommentCreate, comment_schemas.CommentUpdate], Comment]):
@@ -30,97 +38,385 @@ class CommentManager(BaseManager[[comment_schemas.CommentCreate, comment_schemas
         comment_id_reply_to = kwargs['comment_id_reply_to']
         post_id = kwargs['post_id']
 
-        comment_id: int = await super().create(
+        moderation_state = await self._moderation_state(entity_create.content)
+        auto_reply = None
+        if not self.is_auto_reply_queued:
+            # a queued auto-reply job is stored together with the comment by _on_created
+            post = await PostManager(self.db).get_one(post_id, load=PostLoad.HEADER)
+            if self._is_auto_replied(post, owner_id, **moderation_state):
+                auto_reply = await self.generate_auto_reply(entity_create.content)
+
+        comment: Comment = await super().create(
             entity_create=entity_create,
             owner_id=owner_id,
+            moderation_state=moderation_state,
             comment_id_reply_to=comment_id_reply_to,
             post_id=post_id
         )
+        if auto_reply is not None:
+            await self.create_reply_from_post_owner(post, comment, *auto_reply)
+        return comment
+
+    async def update(
+            self, id_: int, entity_create: comment_schemas.CommentUpdate, comment: Optional[Comment] = None
+    ) -> Optional[Comment]:
+        ''' `comment` is the row before the update, read by id if not given; the auto-reply comes with the update '''
+        if comment is None:
+            comment = await self.get_one(id_)
+            if comment is None:
+                return
+
+        moderation_state = await self._moderation_state(entity_create.content)
+        post = await PostManager(self.db).get_one(comment.post_id, load=PostLoad.HEADER)
+        auto_reply = None
+        if not self.is_auto_reply_queued and self._is_auto_replied(post, comment.owner_id, **moderation_state):
+            auto_reply = await self.generate_auto_reply(entity_create.content)
+
+        updated = await super().update(id_, entity_create, moderation_state)
+        if updated is not None and self.needs_auto_reply(post, updated):
+            if self.is_auto_reply_queued:
+                await self.enqueue_auto_reply(id_)
+            elif auto_reply is not None:
+                await self.create_reply_from_post_owner(post, updated, *auto_reply)
+        return updated
+
+    @property
+    def is_auto_reply_queued(self) -> bool:
+        return config.AUTO_REPLY_MODE == "queue"
+
+    @staticmethod
+    def needs_auto_reply(post: Post, comment: Comment) -> bool:
+        return CommentManager._is_auto_replied(post, comment.owner_id, comment.is_blocked, comment.is_pending)
+
+    @staticmethod
+    def _is_auto_replied(post: Post, owner_id: int, is_blocked: bool, is_pending: bool) -> bool:
+        # pending comments get their auto-reply from the moderation workers once published
+        return post.auto_reply and owner_id != post.owner_id and not is_blocked and not is_pending
+
+    async def generate_auto_reply(self, content: str) -> Optional[tuple[str, dict[str, bool]]]:
+        '''
+        the auto-reply content with its moderation state, None if the model has nothing to say;
+        called before the transaction writes anything, so no connection or row lock is held during the model calls
+        '''
+        await release_connection(self.db)
+        auto_reply_content = await self._c.generate_auto_reply(content)
+        if not auto_reply_content:
+            print("No content to reply to")
+            return
+        return auto_reply_content, await self._moderation_state(auto_reply_content)
+
+    async def _on_created(self, async_session: AsyncSession, entity_instance: Comment) -> None:
+        await CounterManager(async_session).apply(self._published([entity_instance]), 1)
+        if not self.is_auto_reply_queued:
+            return
+
+        post = await async_session.get(Post, entity_instance.post_id)
+        if self.needs_auto_reply(post, entity_instance):
+            async_session.add(AutoReplyJob(comment_id=entity_instance.id))
+
+    async def create_many(
+            self, entities_create: list[comment_schemas.CommentCreate], owner_id: int, **kwargs
+    ) -> list[dict]:
+        ''' items may reply to comments of the same post, auto-replies are created like for single comments '''
+        post_id = kwargs['post_id']
+
+        reply_to_ids = {
+            entity_create.comment_id_reply_to for entity_create in entities_create
+            if entity_create.comment_id_reply_to is not None
+        }
+        existing_ids = set()
+        if reply_to_ids:
+            result = await self.db.execute(
+                select(Comment.id).where(and_(Comment.id.in_(reply_to_ids), Comment.post_id == post_id))
+            )
+            existing_ids = set(result.scalars())
+
+        is_valid = [
+            entity_create.comment_id_reply_to is None or entity_create.comment_id_reply_to in existing_ids
+            for entity_create in entities_create
+        ]
+        created = iter(await super().create_many(
+            [entity_create for entity_create, valid in zip(entities_create, is_valid) if valid],
+            owner_id, post_id=post_id
+        ))
+        results = [
+            next(created) if valid else {"status": "failed", "detail": "Comment does not exist"}
+            for valid in is_valid
+        ]
+
+        if not self.is_auto_reply_queued:
+            # the sessions of the auto-replies see the batch once it is committed
+            async def create_auto_replies() -> None:
+                await self._create_auto_replies(post_id, owner_id, entities_create, results)
+
+            after_commit(self.db, create_auto_replies)
+        return results
+
+    async def _on_created_many(self, async_session: AsyncSession, entities: list[Comment]) -> None:
+        await CounterManager(async_session).apply(self._published(entities), 1)
+        if not self.is_auto_reply_queued:
+            return
+
+        # the items of a batch are all comments of one post
+        post = await async_session.get(Post, entities[0].post_id)
+        async_session.add_all(
+            AutoReplyJob(comment_id=comment.id) for comment in entities
+            if self.needs_auto_reply(post, comment)
+        )
+
+    async def _on_status_changed(
+            self, async_session: AsyncSession, entity: Comment, old_status: str, new_status: str
+    ) -> None:
+        await CounterManager(async_session).apply_status_change(entity, old_status, new_status)
+
+    async def _on_deleted(self, async_session: AsyncSession, entities: list[Comment]) -> None:
+        # the reply counters of parents deleted in the same statement match no row
+        await CounterManager(async_session).apply(self._published(entities), -1)
+
+    @staticmethod
+    async def _create_auto_replies(post_id: int, owner_id: int, entities_create: list, results: list[dict]) -> None:
+        ''' inline auto-replies of published items, concurrently, each in its own unit of work '''
+        semaphore = asyncio.Semaphore(config.BULK_MODERATION_CONCURRENCY)
 
-        return await self.create_auto_reply(post_id, owner_id, comment_id, entity_create)
+        async def create_auto_reply(comment_id: int, entity_create: comment_schemas.CommentCreate) -> None:
+            async with semaphore, unit_of_work() as async_session:
+                await CommentManager(async_session).create_auto_reply(post_id, owner_id, comment_id, entity_create)
 
-    async def create_auto_reply(self, post_id, owner_id: int, comment_id, entity_create) -> Comment:
-        comment: Comment = await self.get_one(comment_id)
+        outcomes = await asyncio.gather(
+            *(
+                create_auto_reply(item["id"], entity_create)
+                for entity_create, item in zip(entities_create, results) if item["status"] == "published"
+            ),
+            return_exceptions=True
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                print(f"Auto-reply failed: {outcome}")
+
+    async def create_auto_reply(
+            self, post_id, owner_id: int, comment_id, entity_create, comment: Optional[Comment] = None
+    ) -> Comment:
+        ''' `comment` is the row just returned by create or update, read by id if not given '''
+        if comment is None:
+            comment = await self.get_one(comment_id)
 
         post_manager = PostManager(self.db)
-        post = await post_manager.get_one(post_id)
+        post = await post_manager.get_one(post_id, load=PostLoad.HEADER)
 
-        if post.auto_reply and owner_id != post.owner_id and not comment.is_blocked:
-            auto_reply_content = await self._c.generate_auto_reply(entity_create.content)
-            if not auto_reply_content:
-                print("No content to reply to")
+        if self.needs_auto_reply(post, comment):
+            if self.is_auto_reply_queued:
+                await self.enqueue_auto_reply(comment.id)
                 return comment
 
-            await super().create(
-                entity_create=comment_schemas.CommentCreate(content=auto_reply_content),
-                post_id=post.id,
-                comment_id_reply_to=comment.id,
-                owner_id=post.owner_id
-            )
+            auto_reply = await self.generate_auto_reply(entity_create.content)
+            if auto_reply is not None:
+                await self.create_reply_from_post_owner(post, comment, *auto_reply)
         return comment
 
-    async def get_one(self, id_: int, query: Optional[Select] = None) -> ModelType:
-        query = select(self.model_class).where(
-            self.model_class.id == id_
+    async def enqueue_auto_reply(self, comment_id: int) -> None:
+        self.db.add(AutoReplyJob(comment_id=comment_id))
+
+    async def create_reply_from_post_owner(
+            self, post: Post, comment: Comment, content: str, moderation_state: Optional[dict[str, bool]] = None
+    ) -> Comment:
+        return await super().create(
+            entity_create=comment_schemas.CommentCreate(content=content),
+            owner_id=post.owner_id,
+            moderation_state=moderation_state,
+            post_id=post.id,
+            comment_id_reply_to=comment.id
         )
-        return await super().get_one(id_, query)
 
     async def get_many_by_entity_owner_id(
-            self,  entity_owner_id: int, from_: datetime, till_: datetime, visible_blocked: bool = False
+            self,  entity_owner_id: int, from_: datetime, till_: datetime, visible_blocked: bool = False,
+            viewer_id: Optional[int] = None, limit: Optional[int] = None, after: Optional[tuple[datetime, int]] = None
     ) -> list[Comment] | None:
         filters = [
             Comment.post_id == entity_owner_id,
             Comment.created_at >= from_,
             Comment.created_at <= till_,
-            Comment.is_blocked == visible_blocked
+            Comment.is_blocked == visible_blocked,
+            # pending comments are visible for their owner only
+            or_(Comment.is_pending.is_(False), Comment.owner_id == viewer_id)
         ]
+        if after is not None:
+            # keyset: continue right after the last (created_at, id) of the previous page
+            filters.append(tuple_(Comment.created_at, Comment.id) > after)
 
         query = select(self.model_class).where(
                 and_(*filters)
-            ).order_by(self.model_class.created_at)
+            ).order_by(self.model_class.created_at, self.model_class.id).limit(limit)
 
         comments = await self._get_many_by_query(query)
         return comments
 
-    async def get_many(
-            self, date_from: datetime.date, date_to: datetime.date, user_id: int
-    ) -> list[Comment]:
+    async def get_thread(
+            self, comment_id: int, viewer_id: Optional[int], max_depth: int, max_nodes: int
+    ) -> dict | None:
+        '''
+        The comment with its visible replies, nested, loaded with one recursive CTE.
+        Replies are taken breadth first, oldest first, up to `max_depth` levels below the comment and `max_nodes` in total,
+        the comment itself is not counted in `max_nodes`.
+        '''
+        # `position` is a lower bound of a reply's place in the breadth first order, the recursion stops expanding
+        # once it reaches max_nodes and takes at most the replies still in budget from each comment,
+        # so the CTE does work proportional to max_nodes instead of the size of the thread
+        thread = select(
+            Comment.id, literal(0).label("depth"), literal(0).label("position")
+        ).where(Comment.id == comment_id).cte("thread", recursive=True)
+        replies = select(Comment.id, Comment.created_at).where(
+            and_(Comment.comment_id_reply_to == thread.c.id, self._is_visible(Comment, viewer_id))
+        ).order_by(Comment.created_at, Comment.id).limit(max_nodes - thread.c.position).lateral("replies")
+        thread = thread.union_all(
+            select(
+                replies.c.id,
+                thread.c.depth + 1,
+                cast(
+                    func.max(thread.c.position).over()
+                    + func.row_number().over(order_by=(replies.c.created_at, replies.c.id)),
+                    Integer
+                )
+            ).select_from(
+                thread.join(replies, true())
+            ).where(
+                and_(thread.c.depth < max_depth, thread.c.position < max_nodes)
+            )
+        )
+
+        reply = aliased(Comment)
+        reply_count = select(func.count()).where(
+            and_(reply.comment_id_reply_to == Comment.id, self._is_visible(reply, viewer_id))
+        ).scalar_subquery()
 
-        filters = [
-            func.date(Comment.created_at) >= date_from,
-            func.date(Comment.created_at) <= date_to,
-            or_(
-                Comment.owner_id == user_id,
-                Comment.post.has(owner_id=user_id),
-                Comment.parent_comment.has(owner_id=user_id)
+        query = select(
+            Comment, thread.c.depth, reply_count.label("reply_count")
+        ).join(
+            thread, Comment.id == thread.c.id
+        ).order_by(thread.c.depth, Comment.created_at, Comment.id).limit(max_nodes + 1)
+
+        result = await self.db.execute(query)
+        rows = result.all()
+
+        if not rows:
+            return
+
+        # breadth first order: a parent is always assembled before its replies
+        nodes: dict[int, dict] = {}
+        missing_replies: dict[int, int] = {}
+        for comment, depth, count in rows:
+            nodes[comment.id] = {
+                "id": comment.id,
+                "content": comment.content,
+                "is_blocked": comment.is_blocked,
+                "is_pending": comment.is_pending,
+                "created_at": comment.created_at,
+                "post_id": comment.post_id,
+                "owner_id": comment.owner_id,
+                "comment_id_reply_to": comment.comment_id_reply_to,
+                "reply_count": comment.reply_count,
+                "depth": depth,
+                "replies": [],
+            }
+            missing_replies[comment.id] = count
+            if depth:
+                nodes[comment.comment_id_reply_to]["replies"].append(nodes[comment.id])
+                missing_replies[comment.comment_id_reply_to] -= 1
+
+        for id_, node in nodes.items():
+            node["has_more_replies"] = missing_replies[id_] > 0
+        return nodes[comment_id]
+
+    async def get_daily_breakdown(
+            self, date_from: datetime.date, date_to: datetime.date, user_id: int, sample_size: int = 0
+    ) -> dict | None:
+        if sample_size or not config.BREAKDOWN_USE_ROLLUP:
+            rows = await self._get_breakdown_rows(date_from, date_to, user_id, sample_size)
+        else:
+            rows = await ActivityManager(self.db).get_daily_counts(
+                user_id, date_from, date_to, SENT_COUNTERS + RECEIVED_COUNTERS
             )
-        ]
 
-        query = select(self.model_class).options(
-            joinedload(Comment.post),
-            joinedload(Comment.parent_comment)
-        ).where(
-                and_(*filters)
-            ).order_by(self.model_class.created_at)
+        if not rows:
+            return
 
-        comments = await self._get_many_by_query(query)
+        breakdown = {
+            "sent": self._empty_status_breakdown(),
+            "received": self._empty_status_breakdown(),
+            "days": []
+        }
+        days = {}
+        for row in rows:
+            ids = row.ids if sample_size else None
+            daily = days.setdefault(row.day, {
+                "day": row.day,
+                "sent": self._empty_status_breakdown(),
+                "received": self._empty_status_breakdown()
+            })
+            for direction in ("sent", "received"):
+                if getattr(row, direction):
+                    self._add_to_bucket(daily[direction][row.status], row.count, ids, sample_size)
+                    self._add_to_bucket(breakdown[direction][row.status], row.count, ids, sample_size)
 
-        return comments
+        breakdown["days"] = list(days.values())
+        return breakdown
+
+    async def _get_breakdown_rows(
+            self, date_from: datetime.date, date_to: datetime.date, user_id: int, sample_size: int
+    ) -> list:
+        created = self._created_between(date_from, date_to)
+        reply_parent = aliased(Comment)
+
+        # one index-friendly branch per way a comment relates to the user instead of an OR across joined tables
+        related_ids = union(
+            select(Comment.id).where(
+                and_(Comment.owner_id == user_id, *created)
+            ),
+            select(Comment.id).join(Post, Comment.post_id == Post.id).where(
+                and_(Post.owner_id == user_id, *created)
+            ),
+            select(Comment.id).join(reply_parent, Comment.comment_id_reply_to == reply_parent.id).where(
+                and_(reply_parent.owner_id == user_id, *created)
+            ),
+        ).subquery()
+
+        parent = aliased(Comment)
+        columns = self._breakdown_columns(sample_size)
+        day, status = columns[0], columns[1]
+        sent = (Comment.owner_id == user_id).label("sent")
+        received = func.coalesce(
+            or_(
+                and_(Post.owner_id == user_id, Comment.owner_id != user_id),
+                parent.owner_id == user_id
+            ),
+            False
+        ).label("received")
+
+        query = select(
+            *columns, sent, received
+        ).select_from(Comment).join(
+            related_ids, related_ids.c.id == Comment.id
+        ).outerjoin(
+            Post, Comment.post_id == Post.id
+        ).outerjoin(
+            parent, Comment.comment_id_reply_to == parent.id
+        ).group_by(day, status, sent, received).order_by(day)
+
+        result = await self.db.execute(query)
+        return list(result.all())
 
     @staticmethod
-    def format_comments_by_user(comments: list[Comment], user_id: int) -> dict[str, list[Comment]]: # dict[str, dict[str, list[Comment]]]:
-        sent_comments = [comment for comment in comments if comment.owner_id == user_id]
-        received_comments = [
-                comment for comment in comments
-                if (
-                       comment.post.owner_id == user_id and comment.owner_id != user_id
-                   ) or comment.parent_comment and comment.parent_comment.owner_id == user_id
-            ]
-
-        return {
-            "sent": sent_comments,
-            "received": received_comments
-        }
+    def thread_ids(ids) -> Select:
+        ''' the comments `ids` and their replies at any depth '''
+        thread = select(Comment.id).where(Comment.id.in_(ids)).cte("thread", recursive=True)
+        thread = thread.union_all(
+            select(Comment.id).where(Comment.comment_id_reply_to == thread.c.id)
+        )
+        return select(thread.c.id)
+
+    async def _deleted_with(self, async_session: AsyncSession, ids: list[int]) -> list[int]:
+        ''' the comments and their replies at any depth, deleted together by one statement '''
+        result = await async_session.execute(self.thread_ids(ids))
+        return list(result.scalars())
 
     async def check_access_to_content(
             self,
@@ -135,7 +431,8 @@ class CommentManager(BaseManager[[comment_schemas.CommentCreate, comment_schemas
         if access_lvl == "delete" and current_user.id == post_owner_user_id:
             return True
 
-        comment = await self.get_one(id_=comment_id)
+        # the comment already loaded by the handler, if any
+        comment = kwargs.get('comment') or await self.get_one(id_=comment_id)
         if comment.owner_id == current_user.id:
             return True
 
@@ -0,0 +1,100 @@
+from collections import Counter
+from typing import Iterable, Type
+
+from sqlalchemy import Integer, select, update, and_, func, column, values, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, InstrumentedAttribute
+
+from app.db.database import Base
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.unit_of_work import mark_written
+
+COUNTED_STATUS = "published"
+
+
+class CounterManager:
+    """
+    Keeps `post.comment_count` and `comment.reply_count`, the numbers of published comments of a post
+    and of published direct replies to a comment, in step with the comment writes, in the same transaction.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def apply(self, comments: Iterable[Comment], delta: int) -> None:
+        ''' adds `delta` to the counters every one of the published `comments` is counted in '''
+        post_deltas: Counter[int] = Counter()
+        reply_deltas: Counter[int] = Counter()
+        for comment in comments:
+            post_deltas[comment.post_id] += delta
+            if comment.comment_id_reply_to is not None:
+                reply_deltas[comment.comment_id_reply_to] += delta
+
+        # always posts before comments, so concurrent writers lock the counter rows in the same order
+        await self._add(Post, Post.comment_count, post_deltas)
+        await self._add(Comment, Comment.reply_count, reply_deltas)
+
+    async def apply_status_change(self, comment: Comment, old_status: str, new_status: str) -> None:
+        if (old_status == COUNTED_STATUS) == (new_status == COUNTED_STATUS):
+            return
+        await self.apply([comment], 1 if new_status == COUNTED_STATUS else -1)
+
+    async def _add(self, model_class: Type[Base], counter: InstrumentedAttribute, deltas: Counter[int]) -> None:
+        rows = sorted((id_, delta) for id_, delta in deltas.items() if delta)
+        if not rows:
+            return
+        # the cached rows carry the counters too, they are dropped when the transaction ends
+        mark_written(self.db, model_class, *(id_ for id_, _ in rows))
+
+        if len(rows) > 1:
+            # the rows of one UPDATE ... FROM are locked in no particular order
+            await self.db.execute(
+                select(model_class.id).where(
+                    model_class.id.in_([id_ for id_, _ in rows])
+                ).order_by(model_class.id).with_for_update()
+            )
+
+        counter_deltas = values(
+            column("id", Integer), column("delta", Integer), name="counter_delta"
+        ).data(rows)
+        await self.db.execute(
+            update(model_class).where(
+                model_class.id == counter_deltas.c.id
+            ).values(
+                {counter: counter + counter_deltas.c.delta}
+            ).execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _is_counted(comment) -> list:
+        return [comment.is_blocked.is_(False), comment.is_pending.is_(False)]
+
+    async def reconcile(self) -> int:
+        ''' recount the counters which drifted from the comment table, returns the number of repaired rows '''
+        # comment writers, and with them their counter deltas, wait until the repaired counters are committed
+        await self.db.execute(text(f"LOCK TABLE {Comment.__tablename__} IN SHARE MODE"))
+
+        comment_count = select(func.count()).where(
+            and_(Comment.post_id == Post.id, *self._is_counted(Comment))
+        ).scalar_subquery()
+        posts = await self.db.execute(
+            update(Post).where(
+                Post.comment_count != comment_count
+            ).values(
+                comment_count=comment_count
+            ).execution_options(synchronize_session=False)
+        )
+
+        reply = aliased(Comment)
+        reply_count = select(func.count()).where(
+            and_(reply.comment_id_reply_to == Comment.id, *self._is_counted(reply))
+        ).scalar_subquery()
+        comments = await self.db.execute(
+            update(Comment).where(
+                Comment.reply_count != reply_count
+            ).values(
+                reply_count=reply_count
+            ).execution_options(synchronize_session=False)
+        )
+        return posts.rowcount + comments.rowcount
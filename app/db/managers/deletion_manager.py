@@ -0,0 +1,101 @@
+from typing import Literal
+
+from sqlalchemy import Select, select, update, delete, func, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.db.managers.comment_manager import CommentManager
+from app.db.managers.post_manager import PostManager
+from app.db.models.comment import Comment
+from app.db.models.deletion_job import DeletionJob
+from app.db.models.follow import Follow
+from app.db.models.post import Post
+from app.db.models.user import User
+
+DeletionKind = Literal["post", "comment", "user"]
+
+
+class DeletionManager:
+    """
+    Deletes posts, comment threads and users. A delete cascading to at most DELETION_INLINE_MAX_ROWS rows
+    runs inline in the caller's transaction, a larger one is queued as a DeletionJob for `python -m app.workers`,
+    which deletes DELETION_CHUNK_SIZE comments per transaction, newest first, and the entity itself last.
+    Replies are newer than the comments they reply to, so a chunk rarely cascades beyond itself.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _comments_of(kind: DeletionKind, id_: int) -> Select:
+        ''' ids of the comments deleted with the entity, the entity itself excluded '''
+        if kind == "post":
+            return select(Comment.id).where(Comment.post_id == id_)
+        if kind == "comment":
+            thread = CommentManager.thread_ids([id_]).subquery()
+            return select(thread.c.id).where(thread.c.id != id_)
+        # the user's comments and every comment under the user's posts
+        return union(
+            select(Comment.id).where(Comment.owner_id == id_),
+            select(Comment.id).join(Post, Comment.post_id == Post.id).where(Post.owner_id == id_),
+        )
+
+    async def _cascade_exceeds(self, kind: DeletionKind, id_: int, max_rows: int) -> bool:
+        # counts no further than max_rows + 1, a recursive thread stops being walked there too
+        rows = self._comments_of(kind, id_).limit(max_rows + 1).subquery()
+        result = await self.db.execute(select(func.count()).select_from(rows))
+        return result.scalar_one() > max_rows
+
+    async def delete(self, kind: DeletionKind, id_: int) -> bool:
+        ''' True if the entity was deleted, False if its deletion was queued '''
+        if kind == "user" or await self._cascade_exceeds(kind, id_, config.DELETION_INLINE_MAX_ROWS):
+            await self.enqueue(kind, id_)
+            return False
+
+        manager = PostManager(self.db) if kind == "post" else CommentManager(self.db)
+        await manager.delete(id_)
+        return True
+
+    async def enqueue(self, kind: DeletionKind, id_: int) -> None:
+        self.db.add(DeletionJob(kind=kind, entity_id=id_))
+
+    async def delete_chunk(self, kind: DeletionKind, id_: int) -> bool:
+        ''' deletes the next chunk of the entity's comments, or the entity once they're gone; True when it is deleted '''
+        comments = self._comments_of(kind, id_).subquery()
+        result = await self.db.execute(
+            select(comments.c.id).order_by(comments.c.id.desc()).limit(config.DELETION_CHUNK_SIZE)
+        )
+        comment_ids = list(result.scalars())
+        if comment_ids:
+            await CommentManager(self.db).delete_many(comment_ids)
+            return False
+
+        if kind == "post":
+            await PostManager(self.db).delete(id_)
+        elif kind == "comment":
+            await CommentManager(self.db).delete(id_)
+        else:
+            return await self._delete_user_chunk(id_)
+        return True
+
+    async def _delete_user_chunk(self, user_id: int) -> bool:
+        result = await self.db.execute(
+            select(Post.id).where(
+                Post.owner_id == user_id
+            ).order_by(Post.id.desc()).limit(config.DELETION_CHUNK_SIZE)
+        )
+        post_ids = list(result.scalars())
+        if post_ids:
+            await PostManager(self.db).delete_many(post_ids)
+            return False
+
+        # the follow rows cascade, the counts of the followed users don't
+        await self.db.execute(
+            update(User).where(
+                User.id.in_(select(Follow.followee_id).where(Follow.follower_id == user_id))
+            ).values(
+                follower_count=User.follower_count - 1
+            ).execution_options(synchronize_session=False)
+        )
+        await self.db.execute(delete(User).where(User.id == user_id))
+        return True
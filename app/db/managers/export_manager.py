@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.schemas import export_schemas
+from app.core.config import config
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+
+# exported in this order, replies are comments with comment_id_reply_to set
+EXPORTED = ((Post, export_schemas.ExportedPost), (Comment, export_schemas.ExportedComment))
+
+
+class ExportManager:
+    """
+    NDJSON export of everything a user wrote, oldest first. Rows are read from a server-side cursor
+    EXPORT_YIELD_PER at a time and serialized a batch at a time, so memory doesn't grow with the number of rows.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def stream(
+            self, owner_id: int, from_: datetime = datetime.min, till_: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        ''' yields chunks of NDJSON lines, one line per post or comment '''
+        for model_class, schema in EXPORTED:
+            filters = [model_class.owner_id == owner_id, model_class.created_at >= from_]
+            if till_ is not None:
+                filters.append(model_class.created_at <= till_)
+            # a range of the (owner_id, created_at) index of each table
+            query = select(model_class).where(
+                and_(*filters)
+            ).order_by(model_class.created_at, model_class.id).execution_options(yield_per=config.EXPORT_YIELD_PER)
+
+            result = await self.db.stream_scalars(query)
+            async for entities in result.partitions():
+                # the session's identity map holds weak references, a sent batch is freed
+                yield "".join(schema.model_validate(entity).model_dump_json() + "\n" for entity in entities)
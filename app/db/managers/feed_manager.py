@@ -0,0 +1,177 @@
+from typing import Optional
+
+from sqlalchemy import (
+    Integer, DateTime, select, update, delete, and_, tuple_, union, values, column, literal, true, func
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.db.models.follow import Follow
+from app.db.models.post import Post
+from app.db.models.timeline_entry import TimelineEntry
+from app.db.models.user import User
+
+
+class FeedManager:
+    """
+    Home timelines of followed accounts. Published posts of authors with at most FEED_FANOUT_MAX_FOLLOWERS
+    followers are copied to the `timeline_entry` rows of every follower in the transaction which publishes them,
+    posts of authors with more followers are merged in when a feed is read.
+    Timelines are trimmed to FEED_TIMELINE_SIZE entries by `python -m app.tools.trim_timelines`.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _fans_out():
+        return User.follower_count <= config.FEED_FANOUT_MAX_FOLLOWERS
+
+    @staticmethod
+    def _is_published(post) -> list:
+        return [post.is_blocked.is_(False), post.is_pending.is_(False)]
+
+    async def follow(self, follower_id: int, followee_id: int) -> bool:
+        ''' False if `follower_id` already follows `followee_id` '''
+        result = await self.db.execute(
+            insert(Follow).values(
+                follower_id=follower_id, followee_id=followee_id
+            ).on_conflict_do_nothing().returning(Follow.followee_id)
+        )
+        if result.first() is None:
+            return False
+
+        await self.db.execute(
+            update(User).where(
+                User.id == followee_id
+            ).values(
+                follower_count=User.follower_count + 1
+            ).execution_options(synchronize_session=False)
+        )
+        # the latest posts, so the timeline doesn't start empty
+        latest = select(
+            literal(follower_id, Integer), Post.created_at, Post.id, Post.owner_id
+        ).join(
+            User, User.id == Post.owner_id
+        ).where(
+            and_(Post.owner_id == followee_id, *self._is_published(Post), self._fans_out())
+        ).order_by(Post.created_at.desc(), Post.id.desc()).limit(config.FEED_BACKFILL_SIZE)
+        await self.db.execute(
+            insert(TimelineEntry).from_select(
+                ["user_id", "post_created_at", "post_id", "author_id"], latest
+            ).on_conflict_do_nothing()
+        )
+        return True
+
+    async def unfollow(self, follower_id: int, followee_id: int) -> bool:
+        ''' False if `follower_id` doesn't follow `followee_id` '''
+        result = await self.db.execute(
+            delete(Follow).where(
+                and_(Follow.follower_id == follower_id, Follow.followee_id == followee_id)
+            ).returning(Follow.followee_id)
+        )
+        if result.first() is None:
+            return False
+
+        await self.db.execute(
+            update(User).where(
+                User.id == followee_id
+            ).values(
+                follower_count=User.follower_count - 1
+            ).execution_options(synchronize_session=False)
+        )
+        await self.db.execute(
+            delete(TimelineEntry).where(
+                and_(TimelineEntry.user_id == follower_id, TimelineEntry.author_id == followee_id)
+            )
+        )
+        return True
+
+    async def fan_out(self, posts: list[Post]) -> None:
+        ''' copies published posts to the timelines of their authors' followers, in the caller's transaction '''
+        if not posts:
+            return
+
+        published = values(
+            column("post_id", Integer), column("created_at", DateTime), column("author_id", Integer),
+            name="published"
+        ).data([(post.id, post.created_at, post.owner_id) for post in posts])
+        entries = select(
+            Follow.follower_id, published.c.created_at, published.c.post_id, published.c.author_id
+        ).select_from(published).join(
+            Follow, Follow.followee_id == published.c.author_id
+        ).join(
+            User, User.id == published.c.author_id
+        ).where(self._fans_out())
+
+        # a post published again after being blocked may still be in the timelines
+        await self.db.execute(
+            insert(TimelineEntry).from_select(
+                ["user_id", "post_created_at", "post_id", "author_id"], entries
+            ).on_conflict_do_nothing()
+        )
+
+    async def get_feed(
+            self, user_id: int, limit: int, after: Optional[tuple] = None
+    ) -> list[Post]:
+        ''' newest first, keyset paginated on (created_at, id) like the post listing '''
+        timeline_filters = [TimelineEntry.user_id == user_id]
+        if after is not None:
+            timeline_filters.append(tuple_(TimelineEntry.post_created_at, TimelineEntry.post_id) < after)
+        timeline = select(TimelineEntry.post_id.label("id")).join(
+            Post, Post.id == TimelineEntry.post_id
+        ).where(
+            # posts blocked or sent back to moderation after the fan-out are skipped
+            and_(*timeline_filters, *self._is_published(Post))
+        ).order_by(
+            TimelineEntry.post_created_at.desc(), TimelineEntry.post_id.desc()
+        ).limit(limit)
+
+        # merge on read: the latest posts of every followed author who isn't fanned out, one index scan each
+        author_filters = [Post.owner_id == Follow.followee_id, *self._is_published(Post)]
+        if after is not None:
+            author_filters.append(tuple_(Post.created_at, Post.id) < after)
+        author_posts = select(Post.id).where(
+            and_(*author_filters)
+        ).order_by(Post.created_at.desc(), Post.id.desc()).limit(limit).lateral("author_posts")
+        merged = select(author_posts.c.id).select_from(Follow).join(
+            User, User.id == Follow.followee_id
+        ).join(
+            author_posts, true()
+        ).where(
+            and_(Follow.follower_id == user_id, ~self._fans_out())
+        )
+
+        # union: posts fanned out before their author outgrew FEED_FANOUT_MAX_FOLLOWERS are in both
+        feed_ids = union(timeline, merged).subquery()
+        query = select(Post).join(
+            feed_ids, feed_ids.c.id == Post.id
+        ).order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def trim(self, first_user_id: int, last_user_id: int) -> int:
+        ''' deletes the entries beyond FEED_TIMELINE_SIZE of the timelines of [first_user_id, last_user_id] '''
+        position = func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(TimelineEntry.post_created_at.desc(), TimelineEntry.post_id.desc())
+        ).label("position")
+        ranked = select(
+            TimelineEntry.user_id, TimelineEntry.post_created_at, TimelineEntry.post_id, position
+        ).where(
+            and_(TimelineEntry.user_id >= first_user_id, TimelineEntry.user_id <= last_user_id)
+        ).subquery()
+
+        result = await self.db.execute(
+            delete(TimelineEntry).where(
+                and_(
+                    TimelineEntry.user_id == ranked.c.user_id,
+                    TimelineEntry.post_created_at == ranked.c.post_created_at,
+                    TimelineEntry.post_id == ranked.c.post_id,
+                    ranked.c.position > config.FEED_TIMELINE_SIZE,
+                )
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
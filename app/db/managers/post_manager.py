@@ -1,13 +1,31 @@
 import datetime
+from collections import Counter
+from enum import Enum
 from typing import Type, Optional
 
-from sqlalchemy import select, and_, func, Select
+from sqlalchemy import select, and_, Select, or_, tuple_, func, true, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import aliased, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.api.schemas import post_schemas, user_schemas
+from app.core.config import config
+from app.db.database import Base
+from app.db.managers.activity_manager import ActivityManager
 from app.db.managers.base_manager import BaseManager, ModelType
+from app.db.managers.feed_manager import FeedManager
+from app.db.models.comment import Comment
 from app.db.models.post import Post
+from app.db.models.user_daily_activity import POST_COUNTERS
+
+
+class PostLoad(str, Enum):
+    # post columns only, `comments` must not be accessed
+    HEADER = "header"
+    # + visible_comment_count
+    COMMENT_COUNT = "comment_count"
+    # + visible_comment_count and the first POST_COMMENTS_PAGE_SIZE comments in `comments`
+    FIRST_COMMENTS = "first_comments"
 
 
 class PostManager(BaseManager[post_schemas.PostCreate, Post]):
@@ -18,49 +36,201 @@ class PostManager(BaseManager[post_schemas.PostCreate, Post]):
     def model_class(self) -> Type[ModelType]:
         return Post
 
-    async def get_one(self, id_: int, query: Optional[Select] = None) -> Post:
-        query = select(self.model_class).options(
-            joinedload(Post.comments)
-        ).where(
-            and_(
-                self.model_class.id == id_,
+    async def get_one(
+            self, id_: int, query: Optional[Select] = None, load: PostLoad = PostLoad.HEADER,
+            viewer_id: Optional[int] = None
+    ) -> Post:
+        '''
+        Loads as little as `load` asks for, comments visible for `viewer_id` are counted and embedded,
+        the rest of them are read page by page with CommentManager.get_many_by_entity_owner_id.
+        '''
+        if load == PostLoad.HEADER:
+            # the default query, served by the entity cache
+            return await super().get_one(id_)
+
+        if load == PostLoad.COMMENT_COUNT:
+            # populate_existing: the post may already be in the session, loaded by resolve_path
+            query = select(self.model_class).options(
+                with_expression(Post.visible_comment_count, self._visible_comment_count(viewer_id))
+            ).where(
+                and_(
+                    self.model_class.id == id_,
+                )
+            ).execution_options(populate_existing=True)
+            return await super().get_one(id_, query)
+
+        post = await super().get_one(id_)
+        if post is not None:
+            await self._load_first_comments([post], viewer_id)
+        return post
+
+    async def create(self, entity_create: post_schemas.PostCreate, owner_id: int, **kwargs) -> Post:
+        ''' the new post as PostLoad.FIRST_COMMENTS would load it, it has no comments yet '''
+        post = await super().create(entity_create, owner_id, **kwargs)
+        set_committed_value(post, "comments", [])
+        set_committed_value(post, "visible_comment_count", 0)
+        return post
+
+    async def update(
+            self, id_: int, entity_create: post_schemas.PostCreate, load: PostLoad = PostLoad.HEADER,
+            viewer_id: Optional[int] = None
+    ) -> Optional[Post]:
+        ''' the updated row from UPDATE ... RETURNING, with the comments `load` asks for '''
+        post = await super().update(id_, entity_create)
+        if post is not None and load != PostLoad.HEADER:
+            await self._load_first_comments(
+                [post], viewer_id, page_size=config.POST_COMMENTS_PAGE_SIZE if load == PostLoad.FIRST_COMMENTS else 0
             )
-        )
-        return await super().get_one(id_, query)
+        return post
+
+    async def _on_created(self, async_session: AsyncSession, entity_instance: Post) -> None:
+        await FeedManager(async_session).fan_out(self._published([entity_instance]))
+
+    async def _on_created_many(self, async_session: AsyncSession, entities: list[Post]) -> None:
+        await FeedManager(async_session).fan_out(self._published(entities))
+
+    async def _on_status_changed(
+            self, async_session: AsyncSession, entity: Post, old_status: str, new_status: str
+    ) -> None:
+        if new_status == "published" and old_status != "published":
+            await FeedManager(async_session).fan_out([entity])
+
+    async def _delete_dependents(self, async_session: AsyncSession, ids: list[int]) -> dict[Type[Base], list[int]]:
+        ''' the comments of the posts, with their share of the activity rollup '''
+        result = await async_session.execute(select(Comment.id).where(Comment.post_id.in_(ids)))
+        comment_ids = list(result.scalars())
+        if not comment_ids:
+            return {}
+
+        activity = ActivityManager(async_session)
+        activity_before = await activity.snapshot(Comment, comment_ids, lock=True)
+        await async_session.execute(delete(Comment).where(Comment.id.in_(comment_ids)))
+        await activity.apply_change(activity_before, Counter())
+        return {Comment: comment_ids}
+
+    def _visible_comment_count(self, viewer_id: Optional[int]):
+        return select(func.count(Comment.id)).where(
+            and_(Comment.post_id == Post.id, self._is_visible(Comment, viewer_id))
+        ).scalar_subquery()
+
+    async def _load_first_comments(
+            self, posts: list[Post], viewer_id: Optional[int], page_size: Optional[int] = None,
+            with_count: bool = True
+    ) -> None:
+        '''
+        Fills `comments` of every post with its first `page_size` visible comments, oldest first,
+        POST_COMMENTS_PAGE_SIZE by default, 0 loads no comments. `with_count` also sets `visible_comment_count`.
+        '''
+        if not posts:
+            return
+        page_size = config.POST_COMMENTS_PAGE_SIZE if page_size is None else page_size
+
+        # LATERAL: a bounded index scan per post instead of every comment of the posts
+        page_comment = aliased(Comment)
+        page = select(page_comment.id).where(
+            and_(page_comment.post_id == Post.id, self._is_visible(page_comment, viewer_id))
+        ).order_by(
+            page_comment.created_at, page_comment.id
+        ).limit(page_size).lateral("comment_page")
+
+        query = select(Post.id.label("post_id"), Comment).select_from(Post)
+        if with_count:
+            counted_comment = aliased(Comment)
+            count = select(func.count().label("visible_comment_count")).where(
+                and_(counted_comment.post_id == Post.id, self._is_visible(counted_comment, viewer_id))
+            ).lateral("visible_count")
+            query = query.add_columns(count.c.visible_comment_count).join(count, true())
+
+        # a post without visible comments still comes back once, with a NULL comment
+        query = query.outerjoin(
+            page, true()
+        ).outerjoin(
+            Comment, Comment.id == page.c.id
+        ).where(
+            Post.id.in_([post.id for post in posts])
+        ).order_by(Post.id, Comment.created_at, Comment.id)
+
+        result = await self.db.execute(query)
+        rows = result.all()
+
+        counts: dict[int, int] = {}
+        comments_by_post: dict[int, list[Comment]] = {post.id: [] for post in posts}
+        for row in rows:
+            if with_count:
+                counts[row.post_id] = row.visible_comment_count
+            if row.Comment is not None:
+                comments_by_post[row.post_id].append(row.Comment)
+        for post in posts:
+            if with_count:
+                set_committed_value(post, "visible_comment_count", counts.get(post.id, 0))
+            if page_size:
+                # a partial collection, not to be flushed as if the other comments were removed
+                set_committed_value(post, "comments", comments_by_post[post.id])
 
     async def get_many_by_entity_owner_id(
-            self,  entity_owner_id: int, from_: datetime, till_: datetime, visible_blocked=False
+            self,  entity_owner_id: int, from_: datetime, till_: datetime, visible_blocked=False,
+            viewer_id: Optional[int] = None, limit: Optional[int] = None,
+            after: Optional[tuple[datetime.datetime, int]] = None
     ) -> list[Post] | None:
         filters = [
             Post.owner_id == entity_owner_id,
             Post.created_at >= from_,
             Post.created_at <= till_,
-            Post.is_blocked == visible_blocked
+            Post.is_blocked == visible_blocked,
+            # pending posts are visible for their owner only
+            or_(Post.is_pending.is_(False), Post.owner_id == viewer_id)
         ]
+        if after is not None:
+            # keyset: continue right after the last (created_at, id) of the previous page
+            filters.append(tuple_(Post.created_at, Post.id) < after)
 
-        query = select(self.model_class).options(
-            selectinload(Post.comments)).where(
+        query = select(self.model_class).where(
                 and_(*filters,)
-            ).order_by(self.model_class.created_at.desc())
+            ).order_by(self.model_class.created_at.desc(), self.model_class.id.desc()).limit(limit)
 
         posts = await self._get_many_by_query(query)
+        if posts:
+            # comment totals come from the denormalized comment_count, nothing is counted per listing
+            await self._load_first_comments(posts, viewer_id, with_count=False)
         return posts
 
-    async def get_many(self, date_from: datetime.date, date_to: datetime.date, user_id: int) -> list[Post]:
-        filters = [
-            func.date(Post.created_at) >= date_from,
-            func.date(Post.created_at) <= date_to,
-        ]
+    async def get_daily_breakdown(
+            self, date_from: datetime.date, date_to: datetime.date, user_id: int, sample_size: int = 0
+    ) -> dict | None:
+        if sample_size or not config.BREAKDOWN_USE_ROLLUP:
+            rows = await self._get_breakdown_rows(date_from, date_to, user_id, sample_size)
+        else:
+            rows = await ActivityManager(self.db).get_daily_counts(user_id, date_from, date_to, POST_COUNTERS)
 
-        if user_id is not None:
-            filters.append(Post.owner_id == user_id)
+        if not rows:
+            return
 
-        query = select(self.model_class).where(
-                and_(*filters,)
-            ).order_by(self.model_class.created_at.desc())
+        breakdown = {**self._empty_status_breakdown(), "days": []}
+        days = {}
+        for row in rows:
+            ids = row.ids if sample_size else None
+            daily = days.setdefault(row.day, {"day": row.day, **self._empty_status_breakdown()})
+            self._add_to_bucket(daily[row.status], row.count, ids, sample_size)
+            self._add_to_bucket(breakdown[row.status], row.count, ids, sample_size)
 
-        posts = await self._get_many_by_query(query)
-        return posts
+        breakdown["days"] = list(days.values())
+        return breakdown
+
+    async def _get_breakdown_rows(
+            self, date_from: datetime.date, date_to: datetime.date, user_id: int, sample_size: int
+    ) -> list:
+        columns = self._breakdown_columns(sample_size)
+        day, status = columns[0], columns[1]
+
+        query = select(*columns).where(
+            and_(
+                Post.owner_id == user_id,
+                *self._created_between(date_from, date_to)
+            )
+        ).group_by(day, status).order_by(day)
+
+        result = await self.db.execute(query)
+        return list(result.all())
 
     async def check_access_to_content(
             self,
@@ -0,0 +1,69 @@
+from typing import Optional, Type
+
+from sqlalchemy import Select, String, select, and_, func, literal, union_all, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.db.database import Base
+from app.db.managers.base_manager import BaseManager
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.search import SEARCH_TEXT_CONFIG
+
+SEARCH_TYPES = {"post": Post, "comment": Comment}
+
+
+class SearchManager:
+    """
+    Full-text search over the generated `search_vector` columns of posts and comments.
+    Matches are found by the GIN indexes, only the newest SEARCH_MAX_CANDIDATES matches per type are ranked,
+    so a query for a common word doesn't rank every row containing it.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _candidates(model_class: Type[Base], ts_query, viewer_id: Optional[int]) -> Select:
+        filters = [model_class.search_vector.op("@@")(ts_query), BaseManager._is_visible(model_class, viewer_id)]
+        matches = select(model_class.id)
+        if model_class is Comment:
+            # comments of posts the viewer can't see aren't found either
+            matches = matches.join(Post, Comment.post_id == Post.id)
+            filters.append(BaseManager._is_visible(Post, viewer_id))
+        matches = matches.where(
+            and_(*filters)
+        ).order_by(model_class.id.desc()).limit(config.SEARCH_MAX_CANDIDATES).subquery()
+
+        return select(
+            literal(model_class.__tablename__, String).label("type"),
+            model_class.id,
+            (model_class.id if model_class is Post else model_class.post_id).label("post_id"),
+            model_class.owner_id,
+            model_class.content,
+            model_class.is_pending,
+            model_class.created_at,
+            func.ts_rank_cd(model_class.search_vector, ts_query).label("rank"),
+        ).join(matches, matches.c.id == model_class.id)
+
+    async def search(
+            self, text: str, viewer_id: Optional[int], types: tuple[str, ...] = tuple(SEARCH_TYPES),
+            limit: Optional[int] = None, after: Optional[tuple[float, str, int]] = None
+    ) -> list:
+        ''' best ranked first, rows of (type, id, post_id, owner_id, content, is_pending, created_at, rank) '''
+        # websearch syntax: quoted phrases, `or`, `-word`; never a syntax error
+        ts_query = func.websearch_to_tsquery(SEARCH_TEXT_CONFIG, text)
+        results = union_all(
+            *(self._candidates(SEARCH_TYPES[type_], ts_query, viewer_id) for type_ in types)
+        ).subquery()
+
+        query = select(results)
+        if after is not None:
+            # keyset: continue right after the last (rank, type, id) of the previous page
+            query = query.where(tuple_(results.c.rank, results.c.type, results.c.id) < after)
+        query = query.order_by(
+            results.c.rank.desc(), results.c.type.desc(), results.c.id.desc()
+        ).limit(limit)
+
+        result = await self.db.execute(query)
+        return list(result.all())
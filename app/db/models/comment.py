@@ -1,8 +1,9 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from app.db.database import Base
+from app.db.search import search_vector_column
 
-from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
 
@@ -14,22 +15,42 @@ if TYPE_CHECKING:
 
 class Comment(Base):
     __tablename__ = "comment"
+    __table_args__ = (
+        Index("ix_comment_pending", "id", postgresql_where=text("is_pending")),
+        # CommentManager.get_many_by_entity_owner_id
+        Index("ix_comment_post_id_is_blocked_created_at", "post_id", "is_blocked", "created_at"),
+        # CommentManager.get_daily_breakdown and the owner_id foreign key
+        Index("ix_comment_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_comment_comment_id_reply_to", "comment_id_reply_to"),
+        # time range scans across posts and owners, rows are appended in created_at order
+        Index("ix_comment_created_at_brin", "created_at", postgresql_using="brin"),
+        # SearchManager
+        Index("ix_comment_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     content: Mapped[str] = mapped_column(String(255))
     is_blocked: Mapped[bool] = mapped_column(Boolean, default=False)
+    is_pending: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    post_id: Mapped[int] = mapped_column(Integer, ForeignKey("post.id"))
-    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"))
-    comment_id_reply_to: Mapped[int] = mapped_column(Integer, ForeignKey("comment.id"), nullable=True)
+    post_id: Mapped[int] = mapped_column(Integer, ForeignKey("post.id", ondelete="CASCADE"))
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
+    comment_id_reply_to: Mapped[int] = mapped_column(
+        Integer, ForeignKey("comment.id", ondelete="CASCADE"), nullable=True
+    )
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # pending rows picked up by an app process at startup are leased to it until then, see ModerationWorkerPool
+    moderation_claimed_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # published direct replies, maintained by CounterManager
+    reply_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    search_vector: Mapped[str] = search_vector_column()
 
     post: Mapped["Post"] = relationship("Post", back_populates="comments")
     parent_comment: Mapped["Comment"] = relationship(
         "Comment", remote_side=[id], back_populates="replies")
 
     replies: Mapped[list["Comment"]] = relationship(
-        "Comment", back_populates="parent_comment", cascade="all, delete-orphan")
+        "Comment", back_populates="parent_comment", cascade="all, delete-orphan", passive_deletes=True)
 
     owner: Mapped["User"] = relationship("User", back_populates="comments")
 
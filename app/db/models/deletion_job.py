@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, Text, DateTime, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class DeletionJob(Base):
+    """ a post, comment thread or user too large to delete in one transaction, deleted in chunks by DeletionWorker """
+    __tablename__ = "deletion_job"
+    __table_args__ = (
+        Index("ix_deletion_job_runnable", "run_after", postgresql_where=text("status IN ('pending', 'running')")),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # "post", "comment" or "user", no foreign key: the row is gone when the job is done
+    kind: Mapped[str] = mapped_column(String(20))
+    entity_id: Mapped[int] = mapped_column(Integer)
+    # pending -> running -> done | failed, running jobs whose lease (run_after) expired are claimed again
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    run_after: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
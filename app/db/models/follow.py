@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class Follow(Base):
+    """ `follower_id` follows `followee_id` """
+    __tablename__ = "follow"
+    __table_args__ = (
+        # followers of an author, read by the fan-out on write
+        Index("ix_follow_followee_id", "followee_id"),
+    )
+
+    follower_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    followee_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
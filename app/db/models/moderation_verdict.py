@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import String, Boolean, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class ModerationVerdict(Base):
+    __tablename__ = "moderation_verdict"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    is_passed: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
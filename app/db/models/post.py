@@ -1,10 +1,11 @@
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import Integer, Text, ForeignKey, Boolean, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, Text, ForeignKey, Boolean, DateTime, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, query_expression
 
 from app.db.database import Base
+from app.db.search import search_vector_column
 
 if TYPE_CHECKING:
     from .user import User
@@ -13,15 +14,38 @@ if TYPE_CHECKING:
 
 class Post(Base):
     __tablename__ = "post"
+    __table_args__ = (
+        Index("ix_post_pending", "id", postgresql_where=text("is_pending")),
+        # PostManager.get_many_by_entity_owner_id
+        Index("ix_post_owner_id_is_blocked_created_at", "owner_id", "is_blocked", "created_at"),
+        # PostManager.get_daily_breakdown
+        Index("ix_post_owner_id_created_at", "owner_id", "created_at"),
+        # time range scans across owners, rows are appended in created_at order
+        Index("ix_post_created_at_brin", "created_at", postgresql_using="brin"),
+        # SearchManager
+        Index("ix_post_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     content: Mapped[str] = mapped_column(Text)
     is_blocked: Mapped[bool] = mapped_column(Boolean, default=False)
+    is_pending: Mapped[bool] = mapped_column(Boolean, default=False)
     auto_reply: Mapped[bool] = mapped_column(Boolean, default=False)
-    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id'))
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id', ondelete="CASCADE"))
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # pending rows picked up by an app process at startup are leased to it until then, see ModerationWorkerPool
+    moderation_claimed_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # published comments, maintained by CounterManager
+    comment_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"))
+    search_vector: Mapped[str] = search_vector_column()
 
     user: Mapped["User"] = relationship("User", back_populates="posts")
-    comments: Mapped[list["Comment"]] = relationship("Comment", back_populates="post")
+    # the foreign keys cascade, deleting a post never loads its comments
+    comments: Mapped[list["Comment"]] = relationship(
+        "Comment", back_populates="post", cascade="all, delete", passive_deletes=True
+    )
+
+    # not a column, set by PostManager load profiles
+    visible_comment_count: Mapped[Optional[int]] = query_expression()
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+
+
+class TimelineEntry(Base):
+    """
+    A post fanned out to the home timeline of `user_id`, maintained by FeedManager.
+    The primary key is the order of the feed, a page is one backward range scan of it.
+    """
+    __tablename__ = "timeline_entry"
+    __table_args__ = (
+        # the post foreign key, deleting a post deletes its entries
+        Index("ix_timeline_entry_post_id", "post_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    post_created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    post_id: Mapped[int] = mapped_column(Integer, ForeignKey("post.id", ondelete="CASCADE"), primary_key=True)
+    # removed from the timeline on unfollow
+    author_id: Mapped[int] = mapped_column(Integer)
@@ -2,7 +2,7 @@ from typing import TYPE_CHECKING
 
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Boolean
+from sqlalchemy import String, Integer, Boolean, text
 
 from app.db.database import Base
 
@@ -25,6 +25,13 @@ class User(SQLAlchemyBaseUserTable[int], Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-
-    posts: Mapped[list["Post"]] = relationship("Post", back_populates="user", cascade="all, delete")
-    comments: Mapped[list["Comment"]] = relationship("Comment", back_populates="owner", cascade="all, delete")
+    # maintained by FeedManager, decides between fan-out on write and merge on read
+    follower_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+
+    # the foreign keys cascade, deleting a user never loads their posts and comments
+    posts: Mapped[list["Post"]] = relationship(
+        "Post", back_populates="user", cascade="all, delete", passive_deletes=True
+    )
+    comments: Mapped[list["Comment"]] = relationship(
+        "Comment", back_populates="owner", cascade="all, delete", passive_deletes=True
+    )
@@ -0,0 +1,40 @@
+from datetime import date
+
+from sqlalchemy import Integer, Date, ForeignKey, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.database import Base
+from app.db.partitioning import MonthlyPartitions
+
+STATUSES = ("published", "blocked", "pending")
+POST_COUNTERS = tuple(f"posts_{status}" for status in STATUSES)
+SENT_COUNTERS = tuple(f"comments_sent_{status}" for status in STATUSES)
+RECEIVED_COUNTERS = tuple(f"comments_received_{status}" for status in STATUSES)
+COUNTERS = POST_COUNTERS + SENT_COUNTERS + RECEIVED_COUNTERS
+
+PARTITIONS = MonthlyPartitions("user_daily_activity", "day")
+
+
+def _counter() -> Mapped[int]:
+    return mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+
+
+class UserDailyActivity(Base):
+    """ per user and day counters of posts and comments by moderation status, maintained by ActivityManager """
+    __tablename__ = PARTITIONS.table
+    __table_args__ = {"postgresql_partition_by": PARTITIONS.partition_by}
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    posts_published: Mapped[int] = _counter()
+    posts_blocked: Mapped[int] = _counter()
+    posts_pending: Mapped[int] = _counter()
+
+    comments_sent_published: Mapped[int] = _counter()
+    comments_sent_blocked: Mapped[int] = _counter()
+    comments_sent_pending: Mapped[int] = _counter()
+
+    comments_received_published: Mapped[int] = _counter()
+    comments_received_blocked: Mapped[int] = _counter()
+    comments_received_pending: Mapped[int] = _counter()
@@ -0,0 +1,103 @@
+"""
+Monthly range partitioning. A model declares `postgresql_partition_by` in its __table_args__ and a
+MonthlyPartitions of its table, the partitions themselves are not models: the migrations create them and
+`python -m app.tools.maintain_partitions` keeps them ahead of time and detaches the expired ones.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+PARTITION_NAME = re.compile(r"^\w+_(p\d{4}_\d{2}|default)$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, month_index + 1, 1)
+
+
+def is_partition_name(name: str) -> bool:
+    ''' partitions, attached or detached, are left out of alembic autogenerate '''
+    return bool(PARTITION_NAME.match(name))
+
+
+@dataclass(frozen=True)
+class MonthlyPartitions:
+    """ `table` partitioned by month on the date or timestamp `column`, with a default partition for the rest """
+    table: str
+    column: str
+
+    @property
+    def partition_by(self) -> str:
+        return f"RANGE ({self.column})"
+
+    @property
+    def default_name(self) -> str:
+        return f"{self.table}_default"
+
+    def name(self, month: date) -> str:
+        return f"{self.table}_p{month:%Y_%m}"
+
+    def month_of(self, name: str) -> date | None:
+        match = re.fullmatch(rf"{self.table}_p(\d{{4}})_(\d{{2}})", name)
+        return date(int(match[1]), int(match[2]), 1) if match else None
+
+    async def attached(self, db: AsyncSession) -> list[str]:
+        result = await db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table ORDER BY child.relname"
+            ),
+            {"table": self.table}
+        )
+        return list(result.scalars())
+
+    def bounds(self, month: date) -> str:
+        return f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+
+    async def create(self, db: AsyncSession, first_month: date, last_month: date) -> list[str]:
+        ''' the missing partitions of [first_month, last_month], returns the created ones '''
+        attached = set(await self.attached(db))
+        created = []
+        month = month_start(first_month)
+        while month <= last_month:
+            name = self.name(month)
+            if name not in attached:
+                await self._create_partition(db, name, month)
+                created.append(name)
+            month = add_months(month, 1)
+        return created
+
+    async def _create_partition(self, db: AsyncSession, name: str, month: date) -> None:
+        in_month = f"{self.column} >= '{month}' AND {self.column} < '{add_months(month, 1)}'"
+        result = await db.execute(text(f"SELECT EXISTS (SELECT FROM {self.default_name} WHERE {in_month})"))
+        if not result.scalar_one():
+            await db.execute(text(f"CREATE TABLE {name} PARTITION OF {self.table} {self.bounds(month)}"))
+            return
+
+        # a partition can't be created while the default one holds rows of its month: they are moved
+        # to a plain table which is then attached, its keys and foreign keys are taken from the parent
+        await db.execute(text(f"CREATE TABLE {name} (LIKE {self.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        await db.execute(text(
+            f"WITH moved AS (DELETE FROM {self.default_name} WHERE {in_month} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ))
+        await db.execute(text(f"ALTER TABLE {self.table} ATTACH PARTITION {name} {self.bounds(month)}"))
+
+    async def detach_before(self, db: AsyncSession, month: date) -> list[str]:
+        ''' detaches the partitions of the months before `month`, they are kept as plain tables to archive or drop '''
+        detached = []
+        for name in await self.attached(db):
+            partition_month = self.month_of(name)
+            if partition_month is not None and partition_month < month:
+                await db.execute(text(f"ALTER TABLE {self.table} DETACH PARTITION {name}"))
+                detached.append(name)
+        return detached
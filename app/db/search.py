@@ -0,0 +1,13 @@
+from sqlalchemy import Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import mapped_column
+
+# fixed: the generated columns and the GIN indexes are built with it
+SEARCH_TEXT_CONFIG = "english"
+
+
+def search_vector_column():
+    ''' tsvector of `content` generated by postgres, deferred so the rows read by the managers don't carry it '''
+    return mapped_column(
+        TSVECTOR, Computed(f"to_tsvector('{SEARCH_TEXT_CONFIG}', content)", persisted=True), deferred=True
+    )
@@ -0,0 +1,87 @@
+"""
+One unit of work per request: the managers share the request's session and never commit, its single
+transaction is committed once the handler returns. Work which must only happen after the commit, like handing
+pending rows to the moderation workers, is registered with `after_commit`; the entity cache entries of rows
+marked with `mark_written` are dropped when the transaction ends and skipped by reads inside it.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, Type
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, ORMExecuteState
+
+from app.db.database import Base, async_session_maker
+from app.db.entity_cache import entity_cache
+
+AFTER_COMMIT = "after_commit"
+WRITTEN = "written"
+HAS_WRITES = "has_writes"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_writes(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[HAS_WRITES] = True
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    session.info.setdefault(AFTER_COMMIT, []).append(callback)
+
+
+def mark_written(session: AsyncSession, model_class: Type[Base], *ids: int) -> None:
+    written = session.info.setdefault(WRITTEN, set())
+    written.update((model_class, id_) for id_ in ids)
+
+
+def is_written(session: AsyncSession, model_class: Type[Base], id_: int) -> bool:
+    return (model_class, id_) in session.info.get(WRITTEN, ())
+
+
+def has_writes(session: AsyncSession) -> bool:
+    return bool(session.info.get(HAS_WRITES) or session.new or session.dirty or session.deleted)
+
+
+async def release_connection(session: AsyncSession) -> None:
+    '''
+    ends a transaction which hasn't written anything yet, so the connection goes back to the pool while the
+    request waits for something else, e.g. the moderation model; the next statement checks out a connection again
+    '''
+    if session.in_transaction() and not has_writes(session):
+        await session.commit()
+
+
+async def end_transaction(session: AsyncSession, commit: bool) -> None:
+    written = session.info.pop(WRITTEN, set())
+    callbacks = session.info.pop(AFTER_COMMIT, [])
+    session.info.pop(HAS_WRITES, None)
+    try:
+        if commit:
+            await session.commit()
+        else:
+            await session.rollback()
+    finally:
+        for model_class, id_ in written:
+            await entity_cache.invalidate(model_class, id_)
+
+    if commit:
+        for callback in callbacks:
+            await callback()
+
+
+@asynccontextmanager
+async def unit_of_work(session_maker: Optional[async_sessionmaker] = None) -> AsyncIterator[AsyncSession]:
+    ''' a session whose work is committed at the end, or rolled back if an error escapes '''
+    async with (session_maker or async_session_maker)() as session:
+        try:
+            yield session
+        except HTTPException as e:
+            # a client error may follow writes which stand, e.g. a stored comment rejected as blocked
+            await end_transaction(session, commit=e.status_code < 500)
+            raise
+        except BaseException:
+            await end_transaction(session, commit=False)
+            raise
+        else:
+            await end_transaction(session, commit=True)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import re
+from typing import Awaitable, Callable, Optional
+
+from app.google_api_ai.client import ModelUnavailableError
+
+BATCH_PROMPT = (
+    "Please check each of the following numbered items for the presence of obscene language, insults, "
+    "hate speech, etc. Answer only with a JSON array containing one object per item in the form "
+    '{{"id": <item id>, "inappropriate": <true or false>}}.\n'
+    "Items: {items}"
+)
+
+
+class ModerationBatcher:
+    """
+    Collects moderation requests for up to `window` seconds or `max_batch_size` items,
+    classifies them with a single model request and fans the verdicts back out to the waiting coroutines.
+    Items of a batch whose response can't be parsed are checked one by one, while an unavailable model
+    fails every item of the batch with its error instead of being called once per item.
+    """
+
+    def __init__(
+            self,
+            check_batch: Callable[[str], Awaitable[str]],
+            check_one: Callable[[str], Awaitable[bool]],
+            max_batch_size: int,
+            window: float
+    ):
+        self._check_batch = check_batch
+        self._check_one = check_one
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def check(self, content: str) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((content, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch))
+        # keep a reference until the batch is done, the loop only holds weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        contents = [content for content, _ in batch]
+
+        verdicts = None
+        if len(batch) > 1:
+            try:
+                verdicts = self.parse_verdicts(await self._check_batch(self.build_prompt(contents)), len(batch))
+            except ModelUnavailableError as e:
+                verdicts = [e] * len(batch)
+            except Exception as e:
+                # e.g. a response without text, blocked as a whole for one of the items
+                print(f"Batch moderation failed: {e}")
+            if verdicts is None:
+                print(f"Falling back to per-item moderation for {len(batch)} items")
+
+        if verdicts is None:
+            verdicts = await asyncio.gather(*(self._check_one(content) for content in contents), return_exceptions=True)
+
+        for (_, future), verdict in zip(batch, verdicts):
+            if future.done():
+                continue
+            if isinstance(verdict, BaseException):
+                future.set_exception(verdict)
+            else:
+                future.set_result(verdict)
+
+    @staticmethod
+    def build_prompt(contents: list[str]) -> str:
+        items = json.dumps([{"id": i, "text": content} for i, content in enumerate(contents)], ensure_ascii=False)
+        return BATCH_PROMPT.format(items=items)
+
+    @staticmethod
+    def parse_verdicts(response_txt: str, size: int) -> list[bool] | None:
+        ''' returns is_passed_validation per item or None if the response doesn't cover every item '''
+        match = re.search(r'\[.*\]', response_txt, re.DOTALL)
+        if not match:
+            return
+
+        try:
+            items = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            return
+
+        verdicts: dict[int, bool] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                return
+            id_, inappropriate = item.get("id"), item.get("inappropriate")
+            # bool is an int subclass, `true` is no item id
+            if type(id_) is not int or not isinstance(inappropriate, bool) or not 0 <= id_ < size:
+                return
+            verdicts[id_] = not inappropriate
+
+        if len(verdicts) != size:
+            return
+        return [verdicts[i] for i in range(size)]
@@ -1,14 +1,130 @@
+import asyncio
+import time
+
 import google.generativeai as genai
 
+from app.core.config import config
+
+
+class ModelUnavailableError(Exception):
+    pass
+
+
+class CircuitOpenError(ModelUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_timeout` seconds,
+    then lets a single trial call through (half-open) which either closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_in_flight or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        ''' for a call which ended without an outcome, e.g. cancelled: the next call may run the trial '''
+        self._trial_in_flight = False
+
 
 class Client:
-    def __init__(self, model_name, api_key):
+    def __init__(self, model_name, api_key, max_concurrency: int, timeout: float, breaker: CircuitBreaker):
         self.model_name = model_name
         self.api_key = api_key
+        self.timeout = timeout
+        self.breaker = breaker
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
         self.model = None
         if self.model is None:
             self.model = self.__get_model()
 
     def __get_model(self):
+        genai.configure(api_key=self.api_key)
         model = genai.GenerativeModel(self.model_name)
         return model
+
+    async def generate_content(self, prompt: str):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit breaker is {self.breaker.state}, model calls are rejected")
+
+        try:
+            # the deadline covers waiting for a free slot as well as the call itself
+            response = await asyncio.wait_for(self._generate_content(prompt), timeout=self.timeout)
+        except Exception as e:
+            self.breaker.record_failure()
+            raise ModelUnavailableError(f"Model call failed: {e!r}") from e
+        except BaseException:
+            # cancelled, says nothing about the model
+            self.breaker.release_trial()
+            raise
+
+        self.breaker.record_success()
+        return response
+
+    async def _generate_content(self, prompt: str):
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                return await self.model.generate_content_async(prompt)
+            finally:
+                self._in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "circuit_breaker": self.breaker.state,
+        }
+
+
+_client: Client | None = None
+
+
+def get_client() -> Client:
+    ''' process-wide model client, created on first use '''
+    global _client
+    if _client is None:
+        _client = Client(
+            model_name=config.GENERATIVE_MODEL_NAME,
+            api_key=config.API_KEY,
+            max_concurrency=config.AI_MAX_CONCURRENCY,
+            timeout=config.AI_TIMEOUT_SECONDS,
+            breaker=CircuitBreaker(
+                failure_threshold=config.AI_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=config.AI_BREAKER_RESET_SECONDS
+            )
+        )
+    return _client
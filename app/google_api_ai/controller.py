@@ -1,25 +1,63 @@
 import re
 
 from google._upb._message import RepeatedCompositeContainer
-from google.generativeai import GenerativeModel, configure
 
 from app.core.config import config
-from app.google_api_ai.client import Client
+from app.google_api_ai.batcher import ModerationBatcher
+from app.google_api_ai.client import Client, ModelUnavailableError, get_client
+from app.google_api_ai.prefilter import PrefilterVerdict, prefilter
+from app.google_api_ai.verdict_cache import verdict_cache
 
 
 class Controller:
-    def __init__(self, model: GenerativeModel | None = None):
-        self.model = model
-        if not self.model:
-            self.update_model()
-
-    def update_model(self) -> None:
-        configure(api_key=config.API_KEY)
-        client = Client(model_name=config.GENERATIVE_MODEL_NAME, api_key=config.API_KEY)
-        self.model = client.model
-
-    async def check_for_inappropriate_content(self, content: str) -> bool:
-        response = await self.model.generate_content_async(
+    _batcher: ModerationBatcher | None = None
+
+    def __init__(self, client: Client | None = None):
+        self._client = client
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    async def check_for_inappropriate_content(self, content: str, apply_failure_policy: bool = True) -> bool:
+        if config.MODERATION_PREFILTER_ENABLED:
+            verdict = prefilter.classify(content)
+            if verdict is not PrefilterVerdict.ESCALATE:
+                return verdict is PrefilterVerdict.ALLOW
+
+        try:
+            return await verdict_cache.get_or_check(content, self._check_with_model)
+        except ModelUnavailableError as e:
+            if not apply_failure_policy:
+                raise
+            # not cached: the verdict is a policy decision, not the model's
+            print(f"Moderation unavailable, failing {config.MODERATION_FAILURE_POLICY}: {e}")
+            return config.MODERATION_FAILURE_POLICY == "open"
+
+    async def _check_with_model(self, content: str) -> bool:
+        if config.MODERATION_BATCH_SIZE > 1:
+            return await self._get_batcher().check(content)
+        return await self._check_one_with_model(content)
+
+    def _get_batcher(self) -> ModerationBatcher:
+        # one batcher per process, so requests from every manager end up in the same batches
+        if Controller._batcher is None:
+            Controller._batcher = ModerationBatcher(
+                check_batch=self._generate_text,
+                check_one=self._check_one_with_model,
+                max_batch_size=config.MODERATION_BATCH_SIZE,
+                window=config.MODERATION_BATCH_WINDOW_MS / 1000
+            )
+        return Controller._batcher
+
+    async def _generate_text(self, prompt: str) -> str:
+        response = await self.client.generate_content(prompt)
+        return response.text
+
+    async def _check_one_with_model(self, content: str) -> bool:
+        response = await self.client.generate_content(
             f"Please check following content for the presence of obscene language, insults, hate speech, etc.: "
             f"{content}."
         )
@@ -39,10 +77,14 @@ class Controller:
             return False
 
     async def generate_auto_reply(self, comment: str) -> str | None:
-        response = await self.model.generate_content_async(
-            f"Please, generate auto-reply on this comment: {comment}. Print auto-reply in ***your reply***. "
-            f"Max length 200 characters Thanks"
-        )
+        try:
+            response = await self.client.generate_content(
+                f"Please, generate auto-reply on this comment: {comment}. Print auto-reply in ***your reply***. "
+                f"Max length 200 characters Thanks"
+            )
+        except ModelUnavailableError as e:
+            print(f"Auto-reply skipped: {e}")
+            return
         response_txt = response.text
         print(response_txt)
         pattern = re.compile(r'\*\*\*(.*?)\*\*\*')
@@ -54,3 +96,11 @@ class Controller:
             return auto_replies[0]
 
 
+_controller: Controller | None = None
+
+
+def get_controller() -> Controller:
+    global _controller
+    if _controller is None:
+        _controller = Controller()
+    return _controller
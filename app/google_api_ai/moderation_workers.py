@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Type
+
+from sqlalchemy import select, update, and_, or_
+
+from app.core.config import config
+from app.db.database import async_session_maker, Base
+from app.db.managers.activity_manager import ActivityManager
+from app.db.managers.counter_manager import CounterManager
+from app.db.managers.feed_manager import FeedManager
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.unit_of_work import mark_written, unit_of_work
+from app.google_api_ai.client import ModelUnavailableError
+from app.google_api_ai.controller import Controller, get_controller
+
+
+class ModerationWorkerPool:
+    """
+    asyncio workers living inside the app process which moderate posts and comments
+    stored in the `pending` state and move them to published or blocked.
+    """
+
+    models: tuple[Type[Base], ...] = (Post, Comment)
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.Queue[tuple[Type[Base], int]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._c: Controller | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._c = get_controller()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._enqueue_pending()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, model_class: Type[Base], id_: int) -> None:
+        self._queue.put_nowait((model_class, id_))
+
+    async def _enqueue_pending(self) -> None:
+        '''
+        pick up rows left pending by a previous run of the app. Every app process runs this at startup,
+        rows are claimed a page at a time and leased, so each one is resubmitted by a single process,
+        and the next page is claimed once the queue has been worked off.
+        '''
+        for model_class in self.models:
+            while ids := await self._claim_pending(model_class):
+                for id_ in ids:
+                    self.submit(model_class, id_)
+                await self._queue.join()
+
+    async def _claim_pending(self, model_class: Type[Base]) -> list[int]:
+        now = datetime.utcnow()
+        claimable = select(model_class.id).where(
+            and_(
+                model_class.is_pending,
+                or_(model_class.moderation_claimed_until.is_(None), model_class.moderation_claimed_until <= now)
+            )
+        ).order_by(model_class.id).limit(config.MODERATION_RECOVERY_PAGE_SIZE).with_for_update(skip_locked=True)
+
+        async with async_session_maker() as async_session:
+            result = await async_session.execute(
+                update(model_class).where(
+                    model_class.id.in_(claimable.scalar_subquery())
+                ).values(
+                    moderation_claimed_until=now + timedelta(seconds=config.MODERATION_RECOVERY_LEASE_SECONDS)
+                ).returning(model_class.id).execution_options(synchronize_session=False)
+            )
+            ids = sorted(result.scalars().all())
+            await async_session.commit()
+        return ids
+
+    async def _work(self) -> None:
+        while True:
+            model_class, id_ = await self._queue.get()
+            try:
+                await self.moderate(model_class, id_)
+            except ModelUnavailableError as e:
+                # keep the row pending instead of applying the failure policy, it is retried later
+                print(f"Moderation of {model_class.__tablename__} {id_} postponed: {e}")
+                asyncio.get_running_loop().call_later(config.MODERATION_RETRY_DELAY, self.submit, model_class, id_)
+            except Exception as e:
+                print(f"Moderation of {model_class.__tablename__} {id_} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def moderate(self, model_class: Type[Base], id_: int) -> None:
+        # the connection goes back to the pool before the model call, the verdict is written in a new transaction
+        async with async_session_maker() as async_session:
+            entity = await async_session.get(model_class, id_)
+        if entity is None or not entity.is_pending:
+            return
+
+        is_passed_validation = await self._c.check_for_inappropriate_content(
+            entity.content, apply_failure_policy=False
+        )
+
+        async with unit_of_work() as async_session:
+            # the owner may have edited the content while it was being checked,
+            # in that case the newer version is already queued and this verdict is stale
+            result = await async_session.execute(
+                update(model_class).where(
+                    and_(
+                        model_class.id == id_,
+                        model_class.is_pending,
+                        model_class.updated_at == entity.updated_at
+                    )
+                ).values(
+                    is_pending=False,
+                    is_blocked=not is_passed_validation
+                )
+            )
+            if result.rowcount:
+                mark_written(async_session, model_class, id_)
+                new_status = "published" if is_passed_validation else "blocked"
+                await ActivityManager(async_session).apply_status_change(model_class, id_, "pending", new_status)
+                if model_class is Comment:
+                    await CounterManager(async_session).apply_status_change(entity, "pending", new_status)
+                if model_class is Post and is_passed_validation:
+                    await FeedManager(async_session).fan_out([entity])
+
+        if result.rowcount and is_passed_validation and model_class is Comment:
+            await self._create_auto_reply(entity)
+
+    @staticmethod
+    async def _create_auto_reply(comment: Comment) -> None:
+        # imported here: the managers submit work to this pool
+        from app.api.schemas.comment_schemas import CommentCreate
+        from app.db.managers.comment_manager import CommentManager
+
+        async with unit_of_work() as async_session:
+            await CommentManager(async_session).create_auto_reply(
+                comment.post_id, comment.owner_id, comment.id, CommentCreate(content=comment.content)
+            )
+
+
+moderation_pool = ModerationWorkerPool(workers=config.MODERATION_WORKERS)
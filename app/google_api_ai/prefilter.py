@@ -0,0 +1,153 @@
+import os
+import re
+import unicodedata
+from collections import deque
+from enum import Enum
+from typing import Iterable, Optional
+
+from app.core.cache import HitCounter
+from app.core.config import config
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(__file__), "lexicon.txt")
+
+LEET_TABLE = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "@": "a", "$": "s"
+})
+REPEATED_CHARS = re.compile(r"(.)\1+")
+
+
+class PrefilterVerdict(str, Enum):
+    ALLOW = "allow"
+    BLOCK = "block"
+    ESCALATE = "escalate"
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over lexicon terms. A term matches as a whole word,
+    a trailing `*` makes it match as a word prefix too (`fuck*` matches "fucking").
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # per node: (term length, is_prefix) of every term ending there
+        self._output: list[list[tuple[int, bool]]] = [[]]
+
+        for term in terms:
+            self._add(term)
+        self._build()
+
+    def _add(self, term: str) -> None:
+        is_prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not term:
+            return
+
+        node = 0
+        for char in term:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(term), is_prefix))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(char, 0)
+                self._output[next_node] = self._output[next_node] + self._output[self._fail[next_node]]
+
+    def search(self, text: str) -> Optional[bool]:
+        ''' True if a term matches a whole word, False if terms only match word prefixes, None without a match '''
+        found = None
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, is_prefix in self._output[node]:
+                start = end - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end + 1 == len(text) or not text[end + 1].isalnum():
+                    return True
+                if is_prefix:
+                    found = False
+        return found
+
+
+class Prefilter:
+    """
+    In-process pre-classifier in front of the model: whole words of the lexicon are blocked, words which only
+    start with a lexicon term ("shiitake", "retardant") are escalated, text which can't carry words
+    or is short and plain is allowed, everything else is escalated.
+    """
+
+    def __init__(self, terms: Iterable[str], allow_max_length: int):
+        self.allow_max_length = allow_max_length
+        self._automaton = AhoCorasick(self.normalize(term) for term in terms)
+        self.counter = HitCounter(*(verdict.value for verdict in PrefilterVerdict))
+
+    @staticmethod
+    def normalize(content: str) -> str:
+        ''' folds case, look-alike characters and digits for letters ("1d10t"), and repeated letters ("fuuuck") '''
+        content = unicodedata.normalize("NFKC", content).casefold().translate(LEET_TABLE)
+        return REPEATED_CHARS.sub(r"\1", content)
+
+    @staticmethod
+    def is_plain(content: str) -> bool:
+        ''' printable ascii only: no emoji, look-alike letters or invisible characters '''
+        return all(" " <= char <= "~" for char in content)
+
+    def classify(self, content: str) -> PrefilterVerdict:
+        verdict = self._classify(content)
+        self.counter.incr(verdict.value)
+        return verdict
+
+    def _classify(self, content: str) -> PrefilterVerdict:
+        match = self._automaton.search(self.normalize(content))
+        if match:
+            return PrefilterVerdict.BLOCK
+        if match is not None:
+            # a prefix hit may be an innocent word, the model decides
+            return PrefilterVerdict.ESCALATE
+
+        if self.is_plain(content):
+            if not any(char.isalpha() for char in content):
+                # numbers, punctuation, "+1"
+                return PrefilterVerdict.ALLOW
+            if len(content.strip()) <= self.allow_max_length:
+                return PrefilterVerdict.ALLOW
+
+        return PrefilterVerdict.ESCALATE
+
+    def stats(self) -> dict:
+        return {
+            **self.counter.snapshot(),
+            "resolved_locally": self.counter.ratio(PrefilterVerdict.ALLOW.value, PrefilterVerdict.BLOCK.value),
+        }
+
+
+def load_lexicon(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as lexicon:
+        return [
+            line.strip() for line in lexicon
+            if line.strip() and not line.startswith("#")
+        ]
+
+
+prefilter = Prefilter(
+    terms=load_lexicon(config.MODERATION_LEXICON_PATH or DEFAULT_LEXICON_PATH),
+    allow_max_length=config.MODERATION_PREFILTER_ALLOW_MAX_LENGTH,
+)
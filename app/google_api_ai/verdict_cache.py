@@ -0,0 +1,102 @@
+import hashlib
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.cache import LRUTTLCache, SingleFlight, HitCounter
+from app.core.config import config
+from app.db.database import async_session_maker
+from app.db.models.moderation_verdict import ModerationVerdict
+
+
+class VerdictCache:
+    """
+    Two-tier cache of moderation verdicts keyed by a hash of the normalized content:
+    a bounded in-process LRU+TTL tier in front of the persistent `moderation_verdict` table.
+    Concurrent checks of the same content share one model call.
+    """
+
+    def __init__(self, max_size: int, ttl: float, max_age: timedelta):
+        self.max_age = max_age
+        self._local = LRUTTLCache(max_size=max_size, ttl=ttl)
+        self._single_flight = SingleFlight()
+        self.counter = HitCounter("local_hits", "db_hits", "coalesced", "misses")
+
+    @staticmethod
+    def make_key(content: str) -> str:
+        normalized = " ".join(unicodedata.normalize("NFKC", content).casefold().split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    async def get_or_check(self, content: str, check: Callable[[str], Awaitable[bool]]) -> bool:
+        key = self.make_key(content)
+
+        verdict = self._local.get(key)
+        if verdict is not None:
+            self.counter.incr("local_hits")
+            return verdict
+
+        verdict, shared = await self._single_flight.do(key, lambda: self._load_or_check(key, content, check))
+        if shared:
+            self.counter.incr("coalesced")
+        return verdict
+
+    async def _load_or_check(self, key: str, content: str, check: Callable[[str], Awaitable[bool]]) -> bool:
+        verdict = await self._load(key)
+        if verdict is not None:
+            self.counter.incr("db_hits")
+        else:
+            self.counter.incr("misses")
+            verdict = await check(content)
+            await self._store(key, verdict)
+
+        self._local.set(key, verdict)
+        return verdict
+
+    async def _load(self, key: str) -> Optional[bool]:
+        query = select(ModerationVerdict.is_passed).where(
+            and_(
+                ModerationVerdict.content_hash == key,
+                ModerationVerdict.created_at >= datetime.utcnow() - self.max_age
+            )
+        )
+        try:
+            async with async_session_maker() as async_session:
+                result = await async_session.execute(query)
+                return result.scalar()
+        except Exception as e:
+            # the persistent tier is an optimisation, moderation must keep working without it
+            print(f"Verdict cache lookup failed: {e}")
+            return None
+
+    async def _store(self, key: str, verdict: bool) -> None:
+        query = insert(ModerationVerdict).values(
+            content_hash=key, is_passed=verdict, created_at=datetime.utcnow()
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[ModerationVerdict.content_hash],
+            set_={"is_passed": query.excluded.is_passed, "created_at": query.excluded.created_at}
+        )
+        try:
+            async with async_session_maker() as async_session:
+                await async_session.execute(query)
+                await async_session.commit()
+        except Exception as e:
+            print(f"Verdict cache store failed: {e}")
+
+    def stats(self) -> dict:
+        counts = self.counter.snapshot()
+        return {
+            **counts,
+            "hit_ratio": self.counter.ratio("local_hits", "db_hits", "coalesced"),
+            "model_calls_saved": counts["local_hits"] + counts["db_hits"] + counts["coalesced"],
+        }
+
+
+verdict_cache = VerdictCache(
+    max_size=config.MODERATION_CACHE_SIZE,
+    ttl=config.MODERATION_CACHE_TTL,
+    max_age=timedelta(days=config.MODERATION_VERDICT_MAX_AGE_DAYS),
+)
@@ -1,20 +1,51 @@
 import asyncio
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from app.api.endpoints.auth import auth_router
 from app.api.endpoints.breakdowns import breakdown
 from app.api.endpoints.comments import comments_router
+from app.api.endpoints.export import export_router
+from app.api.endpoints.feed import feed_router
 from app.api.endpoints.posts import users_router
+from app.api.endpoints.search import search_router
+from app.api.endpoints.stats import stats_router
 from app.core.config import config
+from app.db.database import replica_session_maker, READ_PRIMARY_COOKIE, SAFE_METHODS
+from app.google_api_ai.moderation_workers import moderation_pool
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.MODERATION_MODE == "deferred":
+        await moderation_pool.start()
+    yield
+    await moderation_pool.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(comments_router)
 app.include_router(breakdown)
+app.include_router(stats_router)
+app.include_router(search_router)
+app.include_router(feed_router)
+app.include_router(export_router)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if replica_session_maker is not None and request.method not in SAFE_METHODS:
+        # the replica may lag behind, the writer's next reads go to the primary for a while
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, "1", max_age=config.DB_READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax"
+        )
+    return response
 
 
 if __name__ == '__main__':
@@ -0,0 +1,54 @@
+"""
+COPY the user, post and comment tables to and from files, run with
+`python -m app.tools.bulk export|import <directory> [--format csv|ndjson] [--tables ...]`.
+Files are named <table>.<format>; an import appends to the tables in one transaction.
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.db.database import async_session_maker
+from app.db.managers.bulk_manager import BULK_TABLES, BulkManager, bulk_path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.bulk")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--format", dest="format_", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--tables", nargs="+", choices=tuple(BULK_TABLES), default=list(BULK_TABLES))
+    moderation = parser.add_mutually_exclusive_group()
+    moderation.add_argument(
+        "--skip-moderation", dest="moderation", action="store_const", const="skip", default="keep",
+        help="import posts and comments as moderated, blocked ones stay blocked"
+    )
+    moderation.add_argument(
+        "--moderate-later", dest="moderation", action="store_const", const="later",
+        help="import posts and comments as pending, moderated by the workers of MODERATION_MODE=deferred"
+    )
+    return parser.parse_args()
+
+
+async def bulk(command: str, directory: Path, format_: str, tables: list[str], moderation: str) -> None:
+    # parents before children whatever the order on the command line
+    tables = [table_name for table_name in BULK_TABLES if table_name in tables]
+    async with async_session_maker() as async_session:
+        bulk_manager = BulkManager(async_session)
+        if command == "export":
+            directory.mkdir(parents=True, exist_ok=True)
+            for table_name in tables:
+                status = await bulk_manager.export_table(table_name, bulk_path(directory, table_name, format_), format_)
+                print(f"{table_name}: {status}")
+        else:
+            for table_name in tables:
+                status = await bulk_manager.import_table(
+                    table_name, bulk_path(directory, table_name, format_), format_, moderation
+                )
+                print(f"{table_name}: {status}")
+            await bulk_manager.finish_import(tables)
+        await async_session.commit()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    asyncio.run(bulk(args.command, args.directory, args.format_, args.tables, args.moderation))
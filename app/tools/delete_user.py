@@ -0,0 +1,17 @@
+""" queue the deletion of a user with all their posts and comments, run with `python -m app.tools.delete_user <id>` """
+import asyncio
+import sys
+
+from app.db.managers.deletion_manager import DeletionManager
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+from app.db.unit_of_work import unit_of_work
+
+
+async def delete_user(user_id: int) -> None:
+    async with unit_of_work() as async_session:
+        await DeletionManager(async_session).enqueue("user", user_id)
+    print(f"user {user_id}: deletion queued, run by `python -m app.workers`")
+
+
+if __name__ == '__main__':
+    asyncio.run(delete_user(int(sys.argv[1])))
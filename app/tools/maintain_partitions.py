@@ -0,0 +1,30 @@
+""" create upcoming monthly partitions and detach expired ones, run with `python -m app.tools.maintain_partitions` """
+import asyncio
+from datetime import date
+
+from app.core.config import config
+from app.db.database import async_session_maker
+from app.db.models.user_daily_activity import PARTITIONS as USER_DAILY_ACTIVITY_PARTITIONS
+from app.db.partitioning import add_months, month_start
+
+PARTITIONED_TABLES = (USER_DAILY_ACTIVITY_PARTITIONS,)
+
+
+async def maintain_partitions() -> None:
+    this_month = month_start(date.today())
+    async with async_session_maker() as async_session:
+        for partitions in PARTITIONED_TABLES:
+            created = await partitions.create(
+                async_session, this_month, add_months(this_month, config.PARTITION_MONTHS_AHEAD)
+            )
+            detached = []
+            if config.PARTITION_RETENTION_MONTHS:
+                detached = await partitions.detach_before(
+                    async_session, add_months(this_month, -config.PARTITION_RETENTION_MONTHS)
+                )
+            print(f"{partitions.table}: created {created or 'none'}, detached {detached or 'none'}")
+        await async_session.commit()
+
+
+if __name__ == '__main__':
+    asyncio.run(maintain_partitions())
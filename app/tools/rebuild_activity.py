@@ -0,0 +1,17 @@
+""" recount the user_daily_activity rollup from posts and comments, run with `python -m app.tools.rebuild_activity` """
+import asyncio
+
+from app.db.database import async_session_maker
+from app.db.managers.activity_manager import ActivityManager
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+
+
+async def rebuild_activity() -> None:
+    async with async_session_maker() as async_session:
+        rows = await ActivityManager(async_session).rebuild()
+        await async_session.commit()
+    print(f"user_daily_activity rebuilt: {rows} rows")
+
+
+if __name__ == '__main__':
+    asyncio.run(rebuild_activity())
@@ -0,0 +1,17 @@
+""" repair drifted post comment_count and comment reply_count, run with `python -m app.tools.reconcile_counters` """
+import asyncio
+
+from app.db.database import async_session_maker
+from app.db.managers.counter_manager import CounterManager
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+
+
+async def reconcile_counters() -> None:
+    async with async_session_maker() as async_session:
+        rows = await CounterManager(async_session).reconcile()
+        await async_session.commit()
+    print(f"comment counters reconciled: {rows} rows repaired")
+
+
+if __name__ == '__main__':
+    asyncio.run(reconcile_counters())
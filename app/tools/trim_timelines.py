@@ -0,0 +1,28 @@
+""" trim home timelines to FEED_TIMELINE_SIZE entries, run with `python -m app.tools.trim_timelines` """
+import asyncio
+
+from sqlalchemy import select, func
+
+from app.db.database import async_session_maker
+from app.db.managers.feed_manager import FeedManager
+from app.db.models.timeline_entry import TimelineEntry
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+
+# timelines trimmed per transaction
+USERS_PER_BATCH = 1000
+
+
+async def trim_timelines() -> None:
+    async with async_session_maker() as async_session:
+        result = await async_session.execute(select(func.max(TimelineEntry.user_id)))
+        last_user_id = result.scalar() or 0
+
+        trimmed = 0
+        for first_user_id in range(1, last_user_id + 1, USERS_PER_BATCH):
+            trimmed += await FeedManager(async_session).trim(first_user_id, first_user_id + USERS_PER_BATCH - 1)
+            await async_session.commit()
+    print(f"timelines trimmed: {trimmed} entries deleted")
+
+
+if __name__ == '__main__':
+    asyncio.run(trim_timelines())
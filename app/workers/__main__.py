@@ -0,0 +1,14 @@
+""" background workers, run with `python -m app.workers` """
+import asyncio
+
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+from app.workers.auto_reply import AutoReplyWorker
+from app.workers.deletion import DeletionWorker
+
+
+async def run_workers() -> None:
+    await asyncio.gather(AutoReplyWorker.from_config().run(), DeletionWorker.from_config().run())
+
+
+if __name__ == '__main__':
+    asyncio.run(run_workers())
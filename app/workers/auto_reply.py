@@ -0,0 +1,45 @@
+from app.core.config import config
+from app.db.database import async_session_maker
+from app.db.managers.comment_manager import CommentManager
+from app.db.models.auto_reply_job import AutoReplyJob
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.unit_of_work import unit_of_work
+from app.workers.job_worker import JobWorker
+
+
+class AutoReplyWorker(JobWorker):
+    """ Generates auto-replies stored in the `auto_reply_job` table. """
+    job_model = AutoReplyJob
+    name = "Auto-reply"
+
+    @classmethod
+    def from_config(cls) -> "AutoReplyWorker":
+        return cls(
+            batch_size=config.AUTO_REPLY_WORKER_BATCH_SIZE,
+            poll_interval=config.AUTO_REPLY_WORKER_POLL_SECONDS,
+            max_attempts=config.AUTO_REPLY_MAX_ATTEMPTS,
+            backoff=config.AUTO_REPLY_BACKOFF_SECONDS,
+            lease=config.AUTO_REPLY_LEASE_SECONDS,
+        )
+
+    async def _run_job(self, job: AutoReplyJob) -> None:
+        async with async_session_maker() as async_session:
+            comment = await async_session.get(Comment, job.comment_id)
+            post = await async_session.get(Post, comment.post_id) if comment else None
+
+        if comment is None or post is None or not CommentManager.needs_auto_reply(post, comment):
+            # deleted, blocked or edited since the job was queued
+            return
+
+        async with unit_of_work() as async_session:
+            comment_manager = CommentManager(async_session)
+            # generated and moderated before the transaction starts, no connection or job lock is held meanwhile
+            auto_reply = await comment_manager.generate_auto_reply(comment.content)
+            if auto_reply is None:
+                raise RuntimeError("Model returned no auto-reply")
+
+            # the reply and the job's completion are committed together, a job claimed again after a crash
+            # or an expired lease finds itself done instead of posting a second reply
+            if await self._mark_done(async_session, job):
+                await comment_manager.create_reply_from_post_owner(post, comment, *auto_reply)
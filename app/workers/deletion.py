@@ -0,0 +1,30 @@
+from app.core.config import config
+from app.db.managers.deletion_manager import DeletionManager
+from app.db.models.deletion_job import DeletionJob
+from app.db.unit_of_work import unit_of_work
+from app.workers.job_worker import JobWorker
+
+
+class DeletionWorker(JobWorker):
+    """ Deletes the posts, comment threads and users of the `deletion_job` table, a chunk per transaction. """
+    job_model = DeletionJob
+    name = "Deletion"
+
+    @classmethod
+    def from_config(cls) -> "DeletionWorker":
+        return cls(
+            batch_size=config.DELETION_WORKER_BATCH_SIZE,
+            poll_interval=config.DELETION_WORKER_POLL_SECONDS,
+            max_attempts=config.DELETION_MAX_ATTEMPTS,
+            backoff=config.DELETION_BACKOFF_SECONDS,
+            lease=config.DELETION_LEASE_SECONDS,
+        )
+
+    async def _run_job(self, job: DeletionJob) -> None:
+        # a retried or reclaimed job continues where the last committed chunk left off
+        done = False
+        while not done:
+            async with unit_of_work() as async_session:
+                done = await DeletionManager(async_session).delete_chunk(job.kind, job.entity_id)
+            if not done:
+                await self._renew_lease(job)
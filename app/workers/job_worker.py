@@ -0,0 +1,122 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Type
+
+from sqlalchemy import select, and_, update
+
+from app.db.database import async_session_maker, Base
+
+
+class JobWorker(ABC):
+    """
+    Runs the jobs stored in a job table, `job_model`, with `status`, `attempts`, `run_after` and `last_error` columns.
+    Any number of worker processes can run side by side, jobs are claimed with FOR UPDATE SKIP LOCKED
+    and leased for `lease` seconds, a job whose worker died is claimed again once its lease expires.
+    Failed jobs are retried with exponential backoff up to `max_attempts` times.
+    Subclasses set `job_model` and `name` and implement `_run_job`.
+    """
+    job_model: Type[Base]
+    name: str
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [attribute for attribute in ("job_model", "name") if not hasattr(cls, attribute)]
+        if missing:
+            raise TypeError(f"{cls.__name__} must set {', '.join(missing)}")
+
+    def __init__(self, batch_size: int, poll_interval: float, max_attempts: int, backoff: float, lease: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+
+    async def run(self) -> None:
+        print(f"{self.name} worker started")
+        while True:
+            if not await self.run_once():
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> int:
+        jobs = await self._claim()
+        await asyncio.gather(*(self._process(job) for job in jobs))
+        return len(jobs)
+
+    async def _claim(self) -> list:
+        now = datetime.utcnow()
+        query = select(self.job_model).where(
+            and_(
+                self.job_model.status.in_(("pending", "running")),
+                self.job_model.run_after <= now
+            )
+        ).order_by(self.job_model.run_after).limit(self.batch_size).with_for_update(skip_locked=True)
+
+        async with async_session_maker() as async_session:
+            result = await async_session.execute(query)
+            jobs = list(result.scalars().all())
+            for job in jobs:
+                job.status = "running"
+                job.attempts += 1
+                job.run_after = now + timedelta(seconds=self.lease)
+                job.updated_at = now
+            await async_session.commit()
+
+        # detached, the session expires nothing on commit
+        return jobs
+
+    async def _process(self, job) -> None:
+        try:
+            await self._run_job(job)
+        except Exception as e:
+            print(f"{self.name} job {job.id} failed (attempt {job.attempts}): {e}")
+            await self._fail(job, e)
+        else:
+            await self._finish(job, status="done")
+
+    @abstractmethod
+    async def _run_job(self, job) -> None:
+        ''' raises to have the job retried '''
+        pass
+
+    async def _mark_done(self, async_session, job) -> bool:
+        '''
+        marks the job done in the caller's transaction, for jobs whose effect must not be applied twice;
+        False if another run of the job got there first, the row lock makes a concurrent run wait for the outcome
+        '''
+        result = await async_session.execute(
+            update(self.job_model).where(
+                and_(self.job_model.id == job.id, self.job_model.status != "done")
+            ).values(
+                status="done",
+                updated_at=datetime.utcnow()
+            ).returning(self.job_model.id)
+        )
+        return result.first() is not None
+
+    async def _renew_lease(self, job) -> None:
+        ''' for jobs running longer than one lease, called between steps '''
+        await self._finish(job, run_after=datetime.utcnow() + timedelta(seconds=self.lease))
+
+    async def _fail(self, job, error: Exception) -> None:
+        if job.attempts >= self.max_attempts:
+            await self._finish(job, status="failed", last_error=repr(error))
+            return
+
+        delay = self.backoff * 2 ** (job.attempts - 1)
+        await self._finish(
+            job, status="pending", last_error=repr(error),
+            run_after=datetime.utcnow() + timedelta(seconds=delay)
+        )
+
+    async def _finish(self, job, **values) -> None:
+        async with async_session_maker() as async_session:
+            await async_session.execute(
+                update(self.job_model).where(
+                    self.job_model.id == job.id
+                ).values(
+                    **values,
+                    updated_at=datetime.utcnow()
+                )
+            )
+            await async_session.commit()
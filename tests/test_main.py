@@ -1,9 +1,16 @@
+import json
 import pytest
 import http.cookies
 
 from httpx import AsyncClient
+from sqlalchemy import select
 
+from app.core.config import config
+from app.db.database import async_session_maker
+from app.db.models.auto_reply_job import AutoReplyJob
 from app.main import app
+from app.workers.auto_reply import AutoReplyWorker
+from app.workers.deletion import DeletionWorker
 from .conftest import setup_db, fake, event_loop, user_json
 
 
@@ -71,6 +78,38 @@ class TestUsersFlow:
         assert response.status_code == expected_status
         return response
 
+    async def search(self, client, params, expected_status=200):
+        response = await client.get(
+            "/search", params=params,
+            headers=self.headers, follow_redirects=True, cookies=client.cookies.jar
+        )
+        assert response.status_code == expected_status
+        return response
+
+    async def follow_user(self, client, user_id, expected_status=204):
+        response = await client.post(
+            f"/users/{user_id}/follow",
+            headers=self.headers, follow_redirects=True, cookies=client.cookies.jar
+        )
+        assert response.status_code == expected_status
+        return response
+
+    async def get_feed(self, client, expected_status=200):
+        response = await client.get(
+            "/feed",
+            headers=self.headers, follow_redirects=True, cookies=client.cookies.jar
+        )
+        assert response.status_code == expected_status
+        return response
+
+    async def export_user(self, client, user_id, expected_status=200):
+        response = await client.get(
+            f"/users/{user_id}/export",
+            headers=self.headers, follow_redirects=True, cookies=client.cookies.jar
+        )
+        assert response.status_code == expected_status
+        return response
+
     async def create_comment(
             self, client, user_id, post_id, comment_json, comment_id_reply_to=None, expected_status=201):
         url = f"/users/{user_id}/posts/{post_id}/comments/"
@@ -91,16 +130,22 @@ class TestUsersFlow:
         return response
 
     @staticmethod
-    async def get_reply_from_user(response, comment_id):
-        received_comments = response.json().get("received").get("published")
-        reply_from_user1 = next(
-            (
-                received_comment for received_comment in received_comments
-                if received_comment["parent_comment"] and received_comment["parent_comment"]["id"] == comment_id
-            ),
-            None
-        )
-        return reply_from_user1
+    def strip_ids(breakdown):
+        if isinstance(breakdown, dict):
+            return {key: TestUsersFlow.strip_ids(value) for key, value in breakdown.items() if key != "ids"}
+        if isinstance(breakdown, list):
+            return [TestUsersFlow.strip_ids(value) for value in breakdown]
+        return breakdown
+
+    async def check_rollup(self, client, breakdown_url):
+        # the rollup kept by the writes' deltas (no sample_size) counts what the rows themselves count
+        rollup = await self.get_breakdown(client, breakdown_url)
+        counted = await self.get_breakdown(client, f"{breakdown_url}?sample_size=1")
+        assert self.strip_ids(rollup.json()) == self.strip_ids(counted.json())
+
+    @staticmethod
+    async def get_received_published(response):
+        return response.json().get("received").get("published")
 
     async def update_post(self, client, user_id, post_id, post_json, expected_status=202):
         response = await client.put(
@@ -131,6 +176,14 @@ class TestUsersFlow:
         assert response.status_code == expected_status
         return response
 
+    async def get_comment(self, client, user_id, post_id, comment_id, expected_status=200, params=None):
+        response = await client.get(
+            f"/users/{user_id}/posts/{post_id}/comments/{comment_id}", params=params,
+            headers=self.headers, follow_redirects=True, cookies=client.cookies.jar
+        )
+        assert response.status_code == expected_status
+        return response
+
     async def delete_comment(self, client, user_id, post_id, comment_id, expected_status):
         response = await client.delete(
             f"/users/{user_id}/posts/{post_id}/comments/{comment_id}",
@@ -167,12 +220,25 @@ class TestUsersFlow:
         # Get blocked current user's post
         response = await self.get_post(client, user1_id, blocked_post_id, expected_status=200)
         assert response.json()["is_blocked"] is True
+        assert response.json()["comments"] == []
+        assert response.json()["visible_comment_count"] == 0
 
         # Get all user's posts by user_id
         response = await self.get_posts(client, user1_id, expected_status=200)
         assert len(response.json()) == 1
+
+        # Search finds the published post by its words, never the blocked one
+        response = await self.search(client, {"q": post_json["content"], "type": "post"})
+        assert post_id in [result["id"] for result in response.json()]
+        await self.search(client, {"q": blocked_post_json["content"], "type": "post"}, expected_status=204)
         assert isinstance(response.json(), list)
 
+        # Export streams both posts, blocked ones included, one JSON object per line
+        response = await self.export_user(client, user1_id)
+        exported = [json.loads(line) for line in response.text.splitlines()]
+        assert {(row["type"], row["id"]) for row in exported} == {("post", post_id), ("post", int(blocked_post_id))}
+        await self.export_user(client, user1_id + 1, expected_status=403)
+
         # Check posts breakdown
         await self.get_breakdown(client, f"/api/breakdowns/posts-daily-breakdown/user/me/")
 
@@ -181,8 +247,9 @@ class TestUsersFlow:
         assert response.json()["is_blocked"] is False
 
         response = await self.get_breakdown(client, f"/api/breakdowns/posts-daily-breakdown/user/me/")
-        assert len(response.json().get("published")) == 2
-        assert len(response.json().get("blocked")) == 0
+        assert response.json().get("published")["count"] == 2
+        assert response.json().get("blocked")["count"] == 0
+        await self.check_rollup(client, "/api/breakdowns/posts-daily-breakdown/user/me")
 
         # Delete not existing post with not existing user-id
         response = await self.delete_post(client, user1_id + 1, blocked_post_id, expected_status=404)
@@ -206,8 +273,17 @@ class TestUsersFlow:
 
         # Check creation and not getting auto-reply
         response = await self.get_breakdown(client, f"/api/breakdowns/comments-daily-breakdown/user/me/")
-        assert len(response.json().get("sent").get("published")) == 1
-        assert len(response.json().get("received").get("published")) == 0
+        assert response.json().get("sent").get("published")["count"] == 1
+        assert response.json().get("received").get("published")["count"] == 0
+
+        # Create posts in a batch
+        response = await client.post(
+            f"/users/{user1_id}/posts:batch", json={"items": [post_json, blocked_post_json]},
+            headers=self.headers, cookies=client.cookies.jar
+        )
+        assert response.status_code == 201
+        assert [item["status"] for item in response.json()] == ["published", "blocked"]
+        assert all(item["id"] is not None for item in response.json())
 
         # Log out user1
         response = await client.post("/auth/auth/jwt/logout")
@@ -217,7 +293,7 @@ class TestUsersFlow:
         assert not client.cookies.jar
 
     @pytest.mark.run(order=2)
-    async def test_user2_flow(self, client, user_json):
+    async def test_user2_flow(self, client, user_json, monkeypatch):
         user2_json = user_json
 
         # Register and login user2
@@ -234,6 +310,20 @@ class TestUsersFlow:
         await self.login_user(client, user2_json)
         await self.check_user(client, user2_json)
 
+        # Following user1 fills the feed with their published posts
+        await self.get_feed(client, expected_status=204)
+        await self.follow_user(client, user2_id, expected_status=400)
+        await self.follow_user(client, TestUsersFlow.user_1_json["id"])
+        response = await self.get_feed(client)
+        assert TestUsersFlow.user_1_json["posts_ids"][0] in [post["id"] for post in response.json()]
+        fanned_out_ids = [post["id"] for post in response.json()]
+
+        # The same feed is merged on read once user1 has more followers than are fanned out to
+        with monkeypatch.context() as patch:
+            patch.setattr(config, "FEED_FANOUT_MAX_FOLLOWERS", 0)
+            response = await self.get_feed(client)
+        assert [post["id"] for post in response.json()] == fanned_out_ids
+
         # Create comment from user2 under user1's post
         comment_json = {"content": fake.text(max_nb_chars=40)}
         response = await self.create_comment(
@@ -242,14 +332,32 @@ class TestUsersFlow:
 
         assert response.json()["id"] is not None
         assert response.json()["comment_id_reply_to"] is None
+        first_comment_id = response.json()["id"]
 
         # Check comment auto-reply from user1
-        comment_id = response.json()["id"]
-        breakdown_url = f"/api/breakdowns/comments-daily-breakdown/user/me"
+        breakdown_url = f"/api/breakdowns/comments-daily-breakdown/user/me?sample_size=10"
 
         response = await self.get_breakdown(client, breakdown_url)
-        reply_from_user1 = await self.get_reply_from_user(response, comment_id)
-        assert reply_from_user1 is not None
+        received_published = await self.get_received_published(response)
+        assert received_published["count"] == 1
+        reply_from_user1_id = received_published["ids"][0]
+
+        # The auto-reply is nested in the comment thread
+        response = await self.get_comment(
+            client, TestUsersFlow.user_1_json["id"], TestUsersFlow.user_1_json["posts_ids"][0], first_comment_id
+        )
+        assert [reply["id"] for reply in response.json()["replies"]] == [reply_from_user1_id]
+        assert response.json()["replies"][0]["depth"] == 1
+        assert response.json()["reply_count"] == 1
+
+        # max_nodes counts replies only, the comment itself is always returned
+        response = await self.get_comment(
+            client, TestUsersFlow.user_1_json["id"], TestUsersFlow.user_1_json["posts_ids"][0], first_comment_id,
+            params={"max_nodes": 0}
+        )
+        assert response.json()["id"] == first_comment_id
+        assert response.json()["replies"] == []
+        assert response.json()["has_more_replies"] is True
 
         # Create blocked comment from user2 under user1's post
         blocked_comment_json = {"content": "You're an idiot!"}
@@ -257,7 +365,7 @@ class TestUsersFlow:
             client, TestUsersFlow.user_1_json["id"],
             TestUsersFlow.user_1_json["posts_ids"][0],
             blocked_comment_json, expected_status=403,
-            comment_id_reply_to=reply_from_user1['id']
+            comment_id_reply_to=reply_from_user1_id
         )
 
         blocked_comment_id = response.headers.get("content-id")
@@ -265,9 +373,16 @@ class TestUsersFlow:
 
         # NOT to get auto-reply from user1 -- check by comments breakdown
         response = await self.get_breakdown(client, breakdown_url)
-        reply_from_user1 = await self.get_reply_from_user(response, blocked_comment_id)
+        received_published = await self.get_received_published(response)
 
-        assert reply_from_user1 is None
+        assert received_published["count"] == 1
+
+        # Blocked comments aren't counted in the post's comment_count or the parent's reply_count
+        user1_id, user1_post_id = TestUsersFlow.user_1_json["id"], TestUsersFlow.user_1_json["posts_ids"][0]
+        response = await self.get_post(client, user1_id, user1_post_id)
+        comment_count = response.json()["comment_count"]
+        response = await self.get_comment(client, user1_id, user1_post_id, reply_from_user1_id)
+        assert response.json()["reply_count"] == 0
 
         # Update blocked comment from user2
         response = await self.update_comment(
@@ -279,8 +394,15 @@ class TestUsersFlow:
         comment_id = response.json()["id"]
         response = await self.get_breakdown(client, breakdown_url)
 
-        reply_from_user1 = await self.get_reply_from_user(response, comment_id)
-        assert reply_from_user1 is not None
+        received_published = await self.get_received_published(response)
+        assert received_published["count"] == 2
+        await self.check_rollup(client, "/api/breakdowns/comments-daily-breakdown/user/me")
+
+        # The published comment and its auto-reply are counted
+        response = await self.get_post(client, user1_id, user1_post_id)
+        assert response.json()["comment_count"] == comment_count + 2
+        response = await self.get_comment(client, user1_id, user1_post_id, reply_from_user1_id)
+        assert response.json()["reply_count"] == 1
 
         # Delete comment from user2
         response = await self.delete_comment(
@@ -288,6 +410,61 @@ class TestUsersFlow:
             TestUsersFlow.user_1_json["posts_ids"][0], blocked_comment_id, expected_status=202
         )
         assert f"{comment_id} deleted successfully" in response.json()["msg"]
+        await self.check_rollup(client, "/api/breakdowns/comments-daily-breakdown/user/me")
+
+        # The deleted comment is uncounted together with its auto-reply
+        response = await self.get_post(client, user1_id, user1_post_id)
+        assert response.json()["comment_count"] == comment_count
+        response = await self.get_comment(client, user1_id, user1_post_id, reply_from_user1_id)
+        assert response.json()["reply_count"] == 0
+
+        # A post is deleted with its comments
+        own_post_json = {"content": fake.text(max_nb_chars=40), "auto_reply": False}
+        response = await self.create_post(client, user2_id, own_post_json)
+        own_post_id = response.json()["id"]
+        await self.create_comment(client, user2_id, own_post_id, {"content": fake.text(max_nb_chars=40)})
+        response = await self.delete_post(client, user2_id, own_post_id, expected_status=202)
+        assert "deleted successfully" in response.json()["message"]
+        await self.get_post(client, user2_id, own_post_id, expected_status=404)
+
+        # A post with more comments than are deleted inline is queued and deleted a chunk at a time
+        response = await self.create_post(client, user2_id, own_post_json)
+        own_post_id = response.json()["id"]
+        for _ in range(3):
+            await self.create_comment(client, user2_id, own_post_id, {"content": fake.text(max_nb_chars=40)})
+        with monkeypatch.context() as patch:
+            patch.setattr(config, "DELETION_INLINE_MAX_ROWS", 1)
+            patch.setattr(config, "DELETION_CHUNK_SIZE", 1)
+            response = await self.delete_post(client, user2_id, own_post_id, expected_status=202)
+            assert "is being deleted" in response.json()["message"]
+            await self.get_post(client, user2_id, own_post_id)
+
+            assert await DeletionWorker.from_config().run_once() >= 1
+        await self.get_post(client, user2_id, own_post_id, expected_status=404)
+
+        # A queued auto-reply is posted once, however often its job runs
+        with monkeypatch.context() as patch:
+            patch.setattr(config, "AUTO_REPLY_MODE", "queue")
+            response = await self.create_comment(client, user1_id, user1_post_id, comment_json)
+        queued_comment_id = response.json()["id"]
+        response = await self.get_comment(client, user1_id, user1_post_id, queued_comment_id)
+        assert response.json()["replies"] == []
+
+        async with async_session_maker() as async_session:
+            result = await async_session.execute(
+                select(AutoReplyJob).where(AutoReplyJob.comment_id == queued_comment_id)
+            )
+            job = result.scalar_one()
+        worker = AutoReplyWorker.from_config()
+        assert await worker.run_once() >= 1
+        # the same job run again, as after its lease expired while it was running
+        await worker._run_job(job)
+
+        response = await self.get_comment(client, user1_id, user1_post_id, queued_comment_id)
+        assert len(response.json()["replies"]) == 1
+        async with async_session_maker() as async_session:
+            job = await async_session.get(AutoReplyJob, job.id)
+        assert (job.status, job.attempts) == ("done", 1)
 
         # Log out user2
         response = await client.post("/auth/auth/jwt/logout")
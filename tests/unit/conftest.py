@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def setup_db():
+    ''' unit tests don't touch the database, the migrations of the integration tests are skipped '''
+    yield
@@ -0,0 +1,87 @@
+import asyncio
+import re
+from collections import Counter
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+
+from app.db.managers.activity_manager import ActivityManager
+from app.db.models.comment import Comment
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+
+DAY_1, DAY_2 = date(2026, 10, 16), date(2026, 10, 17)
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+def upserted_rows(session: FakeSession) -> list[dict]:
+    ''' the non-zero deltas of every (user_id, day) row of the one upsert, in statement order '''
+    assert len(session.statements) == 1
+    params = session.statements[0].compile(dialect=postgresql.dialect()).params
+    rows: dict[int, dict] = {}
+    for name, value in params.items():
+        match = re.fullmatch(r"(.+)_m(\d+)", name)
+        if match and (value or match.group(1) in ("user_id", "day")):
+            rows.setdefault(int(match.group(2)), {})[match.group(1)] = value
+    return [rows[i] for i in sorted(rows)]
+
+
+def test_deltas_move_counts_between_counters():
+    session = FakeSession()
+    before = Counter({(1, DAY_1, "comments_sent_blocked"): 1, (2, DAY_1, "comments_received_blocked"): 1})
+    after = Counter({(1, DAY_1, "comments_sent_published"): 1, (2, DAY_1, "comments_received_published"): 1})
+
+    asyncio.run(ActivityManager(session).apply_change(before, after))
+
+    assert upserted_rows(session) == [
+        {"user_id": 1, "day": DAY_1, "comments_sent_published": 1, "comments_sent_blocked": -1},
+        {"user_id": 2, "day": DAY_1, "comments_received_published": 1, "comments_received_blocked": -1},
+    ]
+
+
+def test_deleted_rows_are_subtracted_per_day():
+    session = FakeSession()
+    before = Counter({(1, DAY_2, "posts_published"): 2, (1, DAY_1, "posts_blocked"): 1})
+
+    asyncio.run(ActivityManager(session).apply_change(before, Counter()))
+
+    # sorted by (user_id, day), concurrent writers lock the rollup rows in the same order
+    assert upserted_rows(session) == [
+        {"user_id": 1, "day": DAY_1, "posts_blocked": -1},
+        {"user_id": 1, "day": DAY_2, "posts_published": -2},
+    ]
+
+
+def test_unchanged_counters_write_nothing():
+    session = FakeSession()
+    snapshot = Counter({(1, DAY_1, "posts_published"): 1})
+
+    asyncio.run(ActivityManager(session).apply_change(snapshot, Counter(snapshot)))
+
+    assert session.statements == []
+
+
+def test_status_change_moves_every_counter_of_the_row():
+    session = FakeSession()
+    manager = ActivityManager(session)
+
+    async def snapshot(model_class, ids, lock=False):
+        return Counter({(1, DAY_1, "comments_sent_published"): 1, (2, DAY_1, "comments_received_published"): 1})
+
+    manager.snapshot = snapshot
+    asyncio.run(manager.apply_status_change(Comment, 5, "pending", "published"))
+
+    assert upserted_rows(session) == [
+        {"user_id": 1, "day": DAY_1, "comments_sent_published": 1, "comments_sent_pending": -1},
+        {"user_id": 2, "day": DAY_1, "comments_received_published": 1, "comments_received_pending": -1},
+    ]
+
+    session.statements.clear()
+    asyncio.run(manager.apply_status_change(Comment, 5, "published", "published"))
+    assert session.statements == []
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.google_api_ai.batcher import ModerationBatcher
+from app.google_api_ai.client import CircuitOpenError, ModelUnavailableError
+
+parse_verdicts = ModerationBatcher.parse_verdicts
+
+
+def test_parse_verdicts_in_item_order():
+    response = '[{"id": 1, "inappropriate": true}, {"id": 0, "inappropriate": false}]'
+    assert parse_verdicts(response, 2) == [True, False]
+
+
+def test_parse_verdicts_inside_surrounding_text():
+    response = 'Sure:\n```json\n[{"id": 0, "inappropriate": false}]\n```'
+    assert parse_verdicts(response, 1) == [True]
+
+
+def test_parse_verdicts_rejects_incomplete_responses():
+    assert parse_verdicts("no verdicts", 1) is None
+    assert parse_verdicts('[{"id": 0, "inappropriate": false}', 1) is None
+    # an item is missing
+    assert parse_verdicts('[{"id": 0, "inappropriate": false}]', 2) is None
+    # an id out of range
+    assert parse_verdicts('[{"id": 0, "inappropriate": false}, {"id": 2, "inappropriate": false}]', 2) is None
+
+
+def test_parse_verdicts_rejects_malformed_items():
+    assert parse_verdicts('[0, 1]', 2) is None
+    assert parse_verdicts('[{"id": "0", "inappropriate": false}]', 1) is None
+    assert parse_verdicts('[{"id": 0, "inappropriate": "no"}]', 1) is None
+    assert parse_verdicts('[{"id": true, "inappropriate": false}, {"id": 0, "inappropriate": false}]', 2) is None
+
+
+def run_batch(contents: list[str], batch_response, max_batch_size: int = 10) -> tuple[list, list[str]]:
+    ''' `batch_response` is the model answer for the batch, or the exception the model call raises '''
+    checked_one = []
+
+    async def check_batch(prompt: str) -> str:
+        if isinstance(batch_response, Exception):
+            raise batch_response
+        return batch_response
+
+    async def check_one(content: str) -> bool:
+        checked_one.append(content)
+        return content != "bad"
+
+    async def main():
+        batcher = ModerationBatcher(check_batch, check_one, max_batch_size=max_batch_size, window=0.01)
+        return await asyncio.gather(*(batcher.check(content) for content in contents), return_exceptions=True)
+
+    return asyncio.run(main()), checked_one
+
+
+def test_batch_verdicts_are_fanned_out():
+    verdicts, checked_one = run_batch(
+        ["good", "bad"], '[{"id": 0, "inappropriate": false}, {"id": 1, "inappropriate": true}]'
+    )
+    assert verdicts == [True, False]
+    assert checked_one == []
+
+
+def test_unparsable_batch_falls_back_to_single_checks():
+    verdicts, checked_one = run_batch(["good", "bad"], "I can't help with that")
+    assert verdicts == [True, False]
+    assert sorted(checked_one) == ["bad", "good"]
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    verdicts, checked_one = run_batch(["good"], "", max_batch_size=1)
+    # a batch of one is checked as a single item
+    assert verdicts == [True]
+    assert checked_one == ["good"]
+
+
+def test_response_without_text_falls_back_to_single_checks():
+    verdicts, checked_one = run_batch(["good", "bad"], ValueError("The response was blocked"))
+    assert verdicts == [True, False]
+    assert sorted(checked_one) == ["bad", "good"]
+
+
+@pytest.mark.parametrize("error", [ModelUnavailableError("timeout"), CircuitOpenError("open")])
+def test_unavailable_model_fails_every_item_without_single_checks(error):
+    verdicts, checked_one = run_batch(["good", "bad"], error)
+    assert verdicts == [error, error]
+    assert checked_one == []
@@ -0,0 +1,40 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+from app.db.managers.comment_manager import CommentManager
+from app.db.managers.post_manager import PostManager
+from app.db.models.comment import Comment  # noqa: F401, Post relationships resolve it by name
+from app.db.models.user import User  # noqa: F401
+
+DAY_1, DAY_2 = date(2026, 10, 16), date(2026, 10, 17)
+
+
+def make_rows(**extra) -> list[SimpleNamespace]:
+    # rows come ordered by day, each carrying its newest ids first
+    return [
+        SimpleNamespace(day=DAY_1, status="published", count=3, ids=[3, 2, 1], **extra),
+        SimpleNamespace(day=DAY_2, status="published", count=2, ids=[5, 4], **extra),
+    ]
+
+
+def get_breakdown(manager, rows: list, sample_size: int) -> dict:
+    async def get_rows(*args):
+        return rows
+
+    manager._get_breakdown_rows = get_rows
+    return asyncio.run(manager.get_daily_breakdown(DAY_1, DAY_2, user_id=1, sample_size=sample_size))
+
+
+def test_post_breakdown_totals_sample_the_newest_ids_across_days():
+    breakdown = get_breakdown(PostManager(None), make_rows(), sample_size=3)
+
+    assert breakdown["published"] == {"count": 5, "ids": [5, 4, 3]}
+    assert [day["published"]["ids"] for day in breakdown["days"]] == [[3, 2, 1], [5, 4]]
+
+
+def test_comment_breakdown_totals_sample_the_newest_ids_across_days():
+    breakdown = get_breakdown(CommentManager(None), make_rows(sent=True, received=False), sample_size=2)
+
+    assert breakdown["sent"]["published"] == {"count": 5, "ids": [5, 4]}
+    assert breakdown["received"]["published"] == {"count": 0, "ids": []}
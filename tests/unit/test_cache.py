@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.core import cache
+from app.core.cache import LRUTTLCache, SingleFlight
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used(clock):
+    lru = LRUTTLCache(max_size=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+
+    assert "b" not in lru
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUTTLCache(max_size=2, ttl=60)
+    lru.set("a", 1)
+    clock[0] += 59
+    assert lru.get("a") == 1
+    clock[0] += 2
+    assert lru.get("a", "missing") == "missing"
+    assert len(lru) == 0
+
+
+def test_lru_with_no_size_stores_nothing(clock):
+    lru = LRUTTLCache(max_size=0, ttl=60)
+    lru.set("a", 1)
+    assert "a" not in lru
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        single_flight = SingleFlight()
+        return await asyncio.gather(single_flight.do("key", load), single_flight.do("key", load))
+
+    assert asyncio.run(main()) == [("value", False), ("value", True)]
+    assert len(calls) == 1
+
+
+def test_single_flight_shares_failure():
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def main():
+        single_flight = SingleFlight()
+        return await asyncio.gather(
+            single_flight.do("key", load), single_flight.do("key", load), return_exceptions=True
+        )
+
+    outcomes = asyncio.run(main())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+
+def test_single_flight_leader_cancellation_does_not_cancel_waiters():
+    async def load():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        single_flight = SingleFlight()
+        leader = asyncio.create_task(single_flight.do("key", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(single_flight.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == ("value", True)
+
+
+def test_single_flight_starts_a_new_call_once_done():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        single_flight = SingleFlight()
+        return [await single_flight.do("key", load), await single_flight.do("key", load)]
+
+    assert asyncio.run(main()) == [(1, False), (2, False)]
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.google_api_ai import client as client_module
+from app.google_api_ai.client import CircuitBreaker, CircuitOpenError, Client, ModelUnavailableError
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(client_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_breaker(breaker)
+    clock[0] += 30
+
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_trial_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] += 30
+    assert breaker.allow()
+
+
+class FakeModel:
+    def __init__(self, delay: float = 0, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+
+    async def generate_content_async(self, prompt: str) -> str:
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return "response"
+
+
+def make_client(model: FakeModel, breaker: CircuitBreaker) -> Client:
+    client = Client("model", "key", max_concurrency=1, timeout=1, breaker=breaker)
+    client.model = model
+    return client
+
+
+def test_cancelled_trial_releases_the_half_open_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    client = make_client(FakeModel(delay=10), breaker)
+
+    async def main():
+        trial = asyncio.create_task(client.generate_content("prompt"))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        client.model = FakeModel()
+        return await client.generate_content("prompt")
+
+    assert asyncio.run(main()) == "response"
+    assert breaker.state == "closed"
+
+
+def test_failed_calls_open_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    client = make_client(FakeModel(error=RuntimeError("quota")), breaker)
+
+    with pytest.raises(ModelUnavailableError):
+        asyncio.run(client.generate_content("prompt"))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate_content("prompt"))
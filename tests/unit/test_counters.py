@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.managers.counter_manager import CounterManager
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+from app.db.unit_of_work import is_written
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+class RecordingCounterManager(CounterManager):
+    """ records the deltas instead of writing them """
+
+    def __init__(self):
+        super().__init__(FakeSession())
+        self.added = []
+
+    async def _add(self, model_class, counter, deltas):
+        self.added.append((counter.key, dict(deltas)))
+
+
+def make_comment(post_id: int, comment_id_reply_to: int | None = None) -> SimpleNamespace:
+    return SimpleNamespace(post_id=post_id, comment_id_reply_to=comment_id_reply_to)
+
+
+def test_deltas_are_summed_per_post_and_parent_comment():
+    manager = RecordingCounterManager()
+    asyncio.run(manager.apply([make_comment(1), make_comment(1, 10), make_comment(2, 10)], -1))
+
+    # posts first, concurrent writers lock the counter rows in the same order
+    assert manager.added == [("comment_count", {1: -2, 2: -1}), ("reply_count", {10: -2})]
+
+
+@pytest.mark.parametrize("old_status, new_status, delta", [
+    ("pending", "published", 1),
+    ("blocked", "published", 1),
+    ("published", "blocked", -1),
+    ("published", "pending", -1),
+])
+def test_publishing_and_unpublishing_move_the_counters(old_status, new_status, delta):
+    manager = RecordingCounterManager()
+    asyncio.run(manager.apply_status_change(make_comment(1, 10), old_status, new_status))
+
+    assert manager.added == [("comment_count", {1: delta}), ("reply_count", {10: delta})]
+
+
+@pytest.mark.parametrize("old_status, new_status", [
+    ("pending", "blocked"), ("blocked", "pending"), ("published", "published"),
+])
+def test_changes_between_uncounted_statuses_write_nothing(old_status, new_status):
+    manager = RecordingCounterManager()
+    asyncio.run(manager.apply_status_change(make_comment(1, 10), old_status, new_status))
+
+    assert manager.added == []
+
+
+def test_zero_deltas_are_skipped():
+    session = FakeSession()
+    asyncio.run(CounterManager(session)._add(Post, Post.comment_count, {1: 0}))
+
+    assert session.statements == []
+    assert not is_written(session, Post, 1)
+
+
+def test_one_row_is_updated_without_a_separate_lock():
+    session = FakeSession()
+    asyncio.run(CounterManager(session)._add(Comment, Comment.reply_count, {10: 1}))
+
+    assert len(session.statements) == 1
+    assert is_written(session, Comment, 10)
+
+
+def test_several_rows_are_locked_in_id_order_first():
+    session = FakeSession()
+    asyncio.run(CounterManager(session)._add(Post, Post.comment_count, {2: 1, 1: -1, 3: 0}))
+
+    lock, counter_update = session.statements
+    assert lock._for_update_arg is not None
+    assert "ORDER BY post.id" in str(lock)
+    assert is_written(session, Post, 1) and is_written(session, Post, 2)
+    assert not is_written(session, Post, 3)
@@ -0,0 +1,131 @@
+import asyncio
+
+from app.core.config import config
+from app.db.managers import deletion_manager
+from app.db.managers.deletion_manager import DeletionManager
+from app.db.models.deletion_job import DeletionJob
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+from app.workers import deletion
+from app.workers.deletion import DeletionWorker
+
+
+class FakeResult:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def scalars(self):
+        return iter(self.rows)
+
+    def scalar_one(self):
+        return self.rows[0]
+
+
+class FakeSession:
+    """ answers the queries with `results`, in order """
+
+    def __init__(self, *results: list):
+        self.results = list(results)
+        self.statements = []
+        self.added = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.results.pop(0) if self.results else [])
+
+    def add(self, instance):
+        self.added.append(instance)
+
+
+def recording_manager(deleted: list):
+    class RecordingManager:
+        def __init__(self, db):
+            pass
+
+        async def delete(self, id_):
+            deleted.append(("delete", id_))
+
+        async def delete_many(self, ids):
+            deleted.append(("delete_many", ids))
+
+    return RecordingManager
+
+
+def patch_managers(monkeypatch) -> list:
+    deleted = []
+    monkeypatch.setattr(deletion_manager, "CommentManager", recording_manager(deleted))
+    monkeypatch.setattr(deletion_manager, "PostManager", recording_manager(deleted))
+    return deleted
+
+
+def test_small_cascades_are_deleted_inline(monkeypatch):
+    deleted = patch_managers(monkeypatch)
+    monkeypatch.setattr(config, "DELETION_INLINE_MAX_ROWS", 2)
+    session = FakeSession([2])
+
+    assert asyncio.run(DeletionManager(session).delete("post", 1)) is True
+    assert deleted == [("delete", 1)]
+    assert session.added == []
+
+
+def test_large_cascades_are_queued(monkeypatch):
+    deleted = patch_managers(monkeypatch)
+    monkeypatch.setattr(config, "DELETION_INLINE_MAX_ROWS", 2)
+    session = FakeSession([3])
+
+    assert asyncio.run(DeletionManager(session).delete("post", 1)) is False
+    assert deleted == []
+    [job] = session.added
+    assert (job.kind, job.entity_id) == ("post", 1)
+
+
+def test_a_chunk_deletes_comments_before_the_entity(monkeypatch):
+    deleted = patch_managers(monkeypatch)
+
+    assert asyncio.run(DeletionManager(FakeSession([9, 8])).delete_chunk("post", 1)) is False
+    assert asyncio.run(DeletionManager(FakeSession([])).delete_chunk("post", 1)) is True
+    assert deleted == [("delete_many", [9, 8]), ("delete", 1)]
+
+
+def test_a_user_is_deleted_after_the_chunks_of_their_posts(monkeypatch):
+    deleted = patch_managers(monkeypatch)
+
+    # no comments left, one chunk of posts
+    assert asyncio.run(DeletionManager(FakeSession([], [5, 4])).delete_chunk("user", 1)) is False
+    assert deleted == [("delete_many", [5, 4])]
+
+    # no comments and no posts left: the follower counts and the user row
+    session = FakeSession([], [])
+    assert asyncio.run(DeletionManager(session).delete_chunk("user", 1)) is True
+    assert [str(statement).split()[0] for statement in session.statements[2:]] == ["UPDATE", "DELETE"]
+
+
+def test_the_worker_runs_a_chunk_per_transaction_and_renews_the_lease(monkeypatch):
+    chunks = iter([False, False, True])
+    transactions = []
+
+    class ChunkedDeletionManager:
+        def __init__(self, db):
+            pass
+
+        async def delete_chunk(self, kind, id_):
+            return next(chunks)
+
+    class UnitOfWork:
+        async def __aenter__(self):
+            transactions.append("begin")
+
+        async def __aexit__(self, *exc):
+            transactions.append("commit")
+
+    class RecordingWorker(DeletionWorker):
+        async def _renew_lease(self, job):
+            transactions.append("renew_lease")
+
+    monkeypatch.setattr(deletion, "DeletionManager", ChunkedDeletionManager)
+    monkeypatch.setattr(deletion, "unit_of_work", UnitOfWork)
+
+    asyncio.run(RecordingWorker.from_config()._run_job(DeletionJob(id=1, kind="post", entity_id=1)))
+
+    assert transactions == [
+        "begin", "commit", "renew_lease", "begin", "commit", "renew_lease", "begin", "commit"
+    ]
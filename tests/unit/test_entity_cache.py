@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.entity_cache import EntityCache, LocalCacheBackend
+from app.db.managers import base_manager
+from app.db.managers.post_manager import PostManager
+from app.db.models.comment import Comment  # noqa: F401, Post relationships resolve it by name
+from app.db.models.post import Post
+from app.db.models.user import User  # noqa: F401
+from app.db.unit_of_work import mark_written
+
+
+def make_post(content: str) -> Post:
+    return Post(
+        id=1, content=content, is_blocked=False, is_pending=False, auto_reply=False, owner_id=1,
+        created_at=datetime(2026, 10, 17), updated_at=datetime(2026, 10, 17), comment_count=0
+    )
+
+
+class FakeResult:
+    def __init__(self, entity):
+        self.entity = entity
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.entity
+
+
+class FakeSession:
+    """ a session bound to `database`, which holds the current post row of that database """
+
+    def __init__(self, database: dict):
+        self.database = database
+        self.info = {}
+        self.executed = 0
+
+    def in_transaction(self) -> bool:
+        return False
+
+    async def execute(self, query):
+        self.executed += 1
+        return FakeResult(make_post(self.database["content"]))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+@pytest.fixture()
+def cache(monkeypatch):
+    cache = EntityCache(LocalCacheBackend(max_size=100, ttl=60))
+    monkeypatch.setattr(base_manager, "entity_cache", cache)
+    return cache
+
+
+@pytest.fixture()
+def primary(monkeypatch):
+    database = {"content": "new"}
+    sessions = []
+
+    def session_maker():
+        sessions.append(FakeSession(database))
+        return sessions[-1]
+
+    monkeypatch.setattr(base_manager, "async_session_maker", session_maker)
+    return SimpleNamespace(database=database, sessions=sessions)
+
+
+def test_misses_are_loaded_from_the_primary_not_the_request_replica(cache, primary):
+    replica = FakeSession({"content": "old"})
+
+    async def main():
+        await cache.invalidate(Post, 1)
+        from_replica_request = await PostManager(replica).get_one(1)
+        from_primary_request = await PostManager(FakeSession(primary.database)).get_one(1)
+        return from_replica_request, from_primary_request
+
+    from_replica_request, from_primary_request = asyncio.run(main())
+    assert replica.executed == 0
+    assert from_replica_request.content == "new"
+    assert from_primary_request.content == "new"
+    # the second read is a hit
+    assert len(primary.sessions) == 1
+
+
+def test_invalidated_rows_are_loaded_again(cache, primary):
+    request = FakeSession(primary.database)
+
+    async def main():
+        first = await PostManager(request).get_one(1)
+        primary.database["content"] = "edited"
+        cached = await PostManager(request).get_one(1)
+        await cache.invalidate(Post, 1)
+        return first, cached, await PostManager(request).get_one(1)
+
+    first, cached, reloaded = asyncio.run(main())
+    assert (first.content, cached.content, reloaded.content) == ("new", "new", "edited")
+
+
+def test_rows_written_by_the_unit_of_work_skip_the_cache(cache, primary):
+    request = FakeSession(primary.database)
+
+    async def main():
+        await PostManager(request).get_one(1)
+        mark_written(request, Post, 1)
+        primary.database["content"] = "uncommitted"
+        return await PostManager(request).get_one(1)
+
+    assert asyncio.run(main()).content == "uncommitted"
+    assert request.executed == 1
+
+
+def test_load_started_before_an_invalidation_is_not_served():
+    cache = EntityCache(LocalCacheBackend(max_size=100, ttl=60))
+
+    async def main():
+        loaded = asyncio.Event()
+        invalidated = asyncio.Event()
+
+        async def slow_load():
+            loaded.set()
+            await invalidated.wait()
+            return make_post("stale")
+
+        load = asyncio.create_task(cache.get_or_load(Post, 1, slow_load))
+        await loaded.wait()
+        await cache.invalidate(Post, 1)
+        invalidated.set()
+        await load
+
+        async def fresh_load():
+            return make_post("fresh")
+
+        return await cache.get_or_load(Post, 1, fresh_load)
+
+    assert asyncio.run(main()).content == "fresh"
+
+
+def test_cached_instances_are_not_shared():
+    cache = EntityCache(LocalCacheBackend(max_size=100, ttl=60))
+
+    async def load():
+        return make_post("content")
+
+    async def main():
+        return await cache.get_or_load(Post, 1, load), await cache.get_or_load(Post, 1, load)
+
+    first, second = asyncio.run(main())
+    assert first is not second
+    assert first.content == second.content
+    assert cache.stats()["post"]["hits"] == 1
+
+
+def test_entries_stamped_with_another_version_are_reloaded():
+    cache = EntityCache(LocalCacheBackend(max_size=100, ttl=60))
+    key = cache.make_key(Post, 1)
+
+    async def load():
+        return make_post("fresh")
+
+    async def main():
+        await cache.invalidate(Post, 1)
+        await cache.invalidate(Post, 2)
+        # versions are unique across keys, a stamp of another key, or one whose version was evicted, never matches
+        assert await cache.backend.version(key) != await cache.backend.version(cache.make_key(Post, 2))
+        await cache.backend.set(key, await cache.backend.version(cache.make_key(Post, 2)), {"content": "stale"})
+        return await cache.get_or_load(Post, 1, load)
+
+    assert asyncio.run(main()).content == "fresh"
+    assert cache.stats()["post"]["misses"] == 1
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.models.auto_reply_job import AutoReplyJob
+from app.workers.job_worker import JobWorker
+
+
+class RecordingWorker(JobWorker):
+    """ runs `outcome` as the job, records what would be written to the job row """
+    job_model = AutoReplyJob
+    name = "Test"
+
+    def __init__(self, outcome=None, **kwargs):
+        super().__init__(
+            **{"batch_size": 1, "poll_interval": 1, "max_attempts": 3, "backoff": 10, "lease": 60, **kwargs}
+        )
+        self.outcome = outcome
+        self.finished: list[dict] = []
+
+    async def _run_job(self, job) -> None:
+        if self.outcome is not None:
+            raise self.outcome
+
+    async def _finish(self, job, **values) -> None:
+        self.finished.append(values)
+
+
+def job(attempts: int = 1):
+    return SimpleNamespace(id=1, attempts=attempts)
+
+
+def test_subclasses_must_set_the_job_model_and_name():
+    with pytest.raises(TypeError):
+        class Unnamed(JobWorker):
+            job_model = AutoReplyJob
+
+            async def _run_job(self, job) -> None:
+                pass
+
+
+def test_subclasses_must_implement_run_job():
+    class NoRun(JobWorker):
+        job_model = AutoReplyJob
+        name = "No run"
+
+    with pytest.raises(TypeError):
+        NoRun(batch_size=1, poll_interval=1, max_attempts=1, backoff=1, lease=1)
+
+
+def test_successful_job_is_done():
+    worker = RecordingWorker()
+    asyncio.run(worker._process(job()))
+    assert worker.finished == [{"status": "done"}]
+
+
+@pytest.mark.parametrize("attempts, delay", [(1, 10), (2, 20)])
+def test_failed_job_is_retried_with_exponential_backoff(attempts, delay):
+    worker = RecordingWorker(outcome=RuntimeError("model down"))
+    before = datetime.utcnow()
+    asyncio.run(worker._process(job(attempts)))
+
+    [values] = worker.finished
+    assert values["status"] == "pending"
+    assert "model down" in values["last_error"]
+    assert before + timedelta(seconds=delay) <= values["run_after"] <= datetime.utcnow() + timedelta(seconds=delay)
+
+
+def test_job_fails_for_good_after_max_attempts():
+    worker = RecordingWorker(outcome=RuntimeError("model down"))
+    asyncio.run(worker._process(job(attempts=3)))
+
+    [values] = worker.finished
+    assert values["status"] == "failed"
+    assert "run_after" not in values
+
+
+def test_renewed_lease_runs_from_now():
+    worker = RecordingWorker()
+    before = datetime.utcnow()
+    asyncio.run(worker._renew_lease(job()))
+
+    [values] = worker.finished
+    assert values.keys() == {"run_after"}
+    assert values["run_after"] >= before + timedelta(seconds=60)
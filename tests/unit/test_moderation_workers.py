@@ -0,0 +1,46 @@
+import asyncio
+
+from app.db.models.comment import Comment
+from app.db.models.post import Post
+from app.db.models.user import User  # noqa: F401
+from app.google_api_ai.moderation_workers import ModerationWorkerPool
+
+
+class RecordingPool(ModerationWorkerPool):
+    """ hands out the claimable pages of `pages` and records what is moderated while each page is claimed """
+
+    def __init__(self, pages: dict):
+        super().__init__(workers=2)
+        self.pages = pages
+        self.moderated = []
+        self.claims = []
+
+    async def _claim_pending(self, model_class):
+        self.claims.append((model_class, list(self.moderated)))
+        pages = self.pages.get(model_class, [])
+        return pages.pop(0) if pages else []
+
+    async def moderate(self, model_class, id_):
+        await asyncio.sleep(0)
+        self.moderated.append((model_class, id_))
+
+
+def test_pending_rows_are_claimed_page_by_page_once_the_queue_is_worked_off():
+    async def recover():
+        pool = RecordingPool({Post: [[1, 2], [3]], Comment: [[7]]})
+        pool._tasks = [asyncio.create_task(pool._work()) for _ in range(pool.workers)]
+        await pool._enqueue_pending()
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(recover())
+
+    assert pool.moderated == [(Post, 1), (Post, 2), (Post, 3), (Comment, 7)]
+    # the next page is claimed only after the previous one was moderated
+    assert pool.claims == [
+        (Post, []),
+        (Post, [(Post, 1), (Post, 2)]),
+        (Post, [(Post, 1), (Post, 2), (Post, 3)]),
+        (Comment, [(Post, 1), (Post, 2), (Post, 3)]),
+        (Comment, [(Post, 1), (Post, 2), (Post, 3), (Comment, 7)]),
+    ]
@@ -0,0 +1,67 @@
+import base64
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.api.pagination import (
+    NEXT_CURSOR_HEADER, decode_cursor, decode_search_cursor, encode_cursor, encode_search_cursor, paginate
+)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 17, 13, 30, 5, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_search_cursor_round_trip():
+    assert decode_search_cursor(encode_search_cursor(0.25, "post", 7)) == (0.25, "post", 7)
+
+
+def test_missing_cursor_is_the_first_page():
+    assert decode_cursor(None) is None
+    assert decode_search_cursor(None) is None
+
+
+def raw_cursor(payload: str) -> str:
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor("not json"),
+    raw_cursor("42"),
+    raw_cursor('["2026-10-17T13:30:00"]'),
+    raw_cursor('["yesterday", 1]'),
+    raw_cursor('["2026-10-17T13:30:00", "one"]'),
+    raw_cursor('["2026-10-17T13:30:00", 1, 2]'),
+])
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_invalid_search_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as error:
+        decode_search_cursor(encode_cursor(datetime(2026, 10, 17), 1))
+    assert error.value.status_code == 400
+
+
+def entities(count: int) -> list:
+    return [SimpleNamespace(id=id_, created_at=datetime(2026, 10, id_)) for id_ in range(1, count + 1)]
+
+
+def test_paginate_sets_the_next_cursor_from_the_extra_row():
+    response = Response()
+    page = paginate(response, entities(3), limit=2)
+
+    assert [entity.id for entity in page] == [1, 2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == (datetime(2026, 10, 2), 2)
+
+
+def test_paginate_last_page_has_no_cursor():
+    response = Response()
+    assert len(paginate(response, entities(2), limit=2)) == 2
+    assert NEXT_CURSOR_HEADER not in response.headers
@@ -0,0 +1,41 @@
+from datetime import date
+
+import pytest
+
+from app.db.partitioning import MonthlyPartitions, add_months, is_partition_name, month_start
+
+partitions = MonthlyPartitions("user_daily_activity", "day")
+
+
+@pytest.mark.parametrize("month, months, expected", [
+    (date(2026, 10, 1), 0, date(2026, 10, 1)),
+    (date(2026, 10, 1), 2, date(2026, 12, 1)),
+    (date(2026, 10, 1), 3, date(2027, 1, 1)),
+    (date(2026, 1, 1), -1, date(2025, 12, 1)),
+    (date(2026, 3, 1), -15, date(2024, 12, 1)),
+    (date(2026, 12, 1), 25, date(2029, 1, 1)),
+])
+def test_add_months(month, months, expected):
+    assert add_months(month, months) == expected
+
+
+def test_month_start():
+    assert month_start(date(2024, 2, 29)) == date(2024, 2, 1)
+
+
+def test_partition_names_round_trip():
+    name = partitions.name(date(2026, 1, 1))
+    assert name == "user_daily_activity_p2026_01"
+    assert partitions.month_of(name) == date(2026, 1, 1)
+    assert partitions.month_of(partitions.default_name) is None
+    assert partitions.month_of("user_daily_activity_p2026_01_old") is None
+
+
+def test_bounds_cover_one_month():
+    assert partitions.bounds(date(2026, 12, 1)) == "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+
+
+def test_partition_names_are_recognized():
+    assert is_partition_name("user_daily_activity_p2026_01")
+    assert is_partition_name("user_daily_activity_default")
+    assert not is_partition_name("user_daily_activity")
@@ -0,0 +1,58 @@
+import pytest
+
+from app.google_api_ai.prefilter import AhoCorasick, Prefilter, PrefilterVerdict, DEFAULT_LEXICON_PATH, load_lexicon
+
+
+@pytest.fixture()
+def prefilter():
+    return Prefilter(load_lexicon(DEFAULT_LEXICON_PATH), allow_max_length=10)
+
+
+def test_search_tells_whole_words_from_prefixes():
+    automaton = AhoCorasick(["he", "she*", "hers"])
+    assert automaton.search("she") is True
+    assert automaton.search("ushers") is None
+    assert automaton.search("shells") is False
+    assert automaton.search("her hers") is True
+    assert automaton.search("other") is None
+
+
+@pytest.mark.parametrize("content", [
+    "you idiot",
+    "what a MORON.",
+    "1d10t",
+    "I1d10t",
+    "sh1t happens",
+    "fuuuuck",
+    "fuck1ng",
+    "you are such an idiooot",
+])
+def test_whole_words_are_blocked(prefilter, content):
+    assert prefilter.classify(content) == PrefilterVerdict.BLOCK
+
+
+@pytest.mark.parametrize("content", [
+    "fire retardant foam",
+    "shitake mushrooms",
+    "idiotic",
+])
+def test_prefix_hits_are_escalated(prefilter, content):
+    assert prefilter.classify(content) == PrefilterVerdict.ESCALATE
+
+
+@pytest.mark.parametrize("content, verdict", [
+    ("+1", PrefilterVerdict.ALLOW),
+    ("12:30", PrefilterVerdict.ALLOW),
+    ("nice post", PrefilterVerdict.ALLOW),
+    ("a much longer comment than that", PrefilterVerdict.ESCALATE),
+    ("nice 👍", PrefilterVerdict.ESCALATE),
+    ("Scunthorpe", PrefilterVerdict.ALLOW),
+])
+def test_other_content(prefilter, content, verdict):
+    assert prefilter.classify(content) == verdict
+
+
+def test_normalize_folds_look_alikes_and_repeats():
+    assert Prefilter.normalize("ＩＤＩＯＴ") == "idiot"
+    assert Prefilter.normalize("5h17") == "shit"
+    assert Prefilter.normalize("Fuuuck") == "fuck"
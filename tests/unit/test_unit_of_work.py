@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.db.entity_cache import EntityCache, LocalCacheBackend
+from app.db import unit_of_work as uow
+from app.db.models.comment import Comment  # noqa: F401, Post relationships resolve it by name
+from app.db.models.post import Post
+from app.db.models.user import User  # noqa: F401
+
+
+class FakeSession:
+    """ records how its transaction ended """
+
+    def __init__(self):
+        self.info = {}
+        self.outcome = None
+
+    async def commit(self):
+        self.outcome = "commit"
+
+    async def rollback(self):
+        self.outcome = "rollback"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+@pytest.fixture()
+def cache(monkeypatch):
+    cache = EntityCache(LocalCacheBackend(max_size=100, ttl=60))
+    monkeypatch.setattr(uow, "entity_cache", cache)
+    return cache
+
+
+def run_unit_of_work(error: BaseException | None) -> tuple[FakeSession, list[str]]:
+    ''' writes post 1 and registers an after commit callback, then raises `error` '''
+    session = FakeSession()
+    called = []
+
+    async def callback():
+        called.append("after_commit")
+
+    async def main():
+        async with uow.unit_of_work(lambda: session) as async_session:
+            uow.mark_written(async_session, Post, 1)
+            uow.after_commit(async_session, callback)
+            if error is not None:
+                raise error
+
+    try:
+        asyncio.run(main())
+    except BaseException as e:
+        assert e is error
+    return session, called
+
+
+def test_success_commits_and_runs_the_callbacks(cache):
+    session, called = run_unit_of_work(None)
+    assert session.outcome == "commit"
+    assert called == ["after_commit"]
+    assert session.info == {}
+
+
+@pytest.mark.parametrize("status_code", [400, 403, 404, 422])
+def test_client_errors_commit_what_was_written(cache, status_code):
+    session, called = run_unit_of_work(HTTPException(status_code=status_code))
+    assert session.outcome == "commit"
+    assert called == ["after_commit"]
+
+
+@pytest.mark.parametrize("error", [HTTPException(status_code=500), HTTPException(status_code=503), RuntimeError()])
+def test_server_errors_roll_back_without_the_callbacks(cache, error):
+    session, called = run_unit_of_work(error)
+    assert session.outcome == "rollback"
+    assert called == []
+
+
+@pytest.mark.parametrize("error", [None, HTTPException(status_code=403), RuntimeError()])
+def test_written_rows_are_invalidated_however_the_transaction_ends(cache, error):
+    key = cache.make_key(Post, 1)
+    asyncio.run(cache.backend.set(key, 0, {"id": 1}))
+
+    run_unit_of_work(error)
+
+    assert asyncio.run(cache.backend.get(key)) is None
+    assert asyncio.run(cache.backend.version(key)) != 0
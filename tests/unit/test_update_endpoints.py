@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints import comments, posts
+from app.api.schemas.comment_schemas import CommentUpdate
+from app.api.schemas.post_schemas import PostUpdate
+from app.db.models.user import User  # noqa: F401, Post and Comment relationships resolve it by name
+
+USER = SimpleNamespace(id=1)
+
+
+class DeletedMeanwhileManager:
+    """ passes the access check, the row is gone by the time it is updated """
+
+    def __init__(self, db):
+        pass
+
+    async def check_access_to_content(self, **kwargs) -> bool:
+        return True
+
+    async def update(self, *args, **kwargs):
+        return None
+
+
+def test_updating_a_comment_deleted_meanwhile_is_not_found(monkeypatch):
+    async def resolve_path(*args, **kwargs):
+        return SimpleNamespace(post=None, comment=SimpleNamespace(id=3))
+
+    monkeypatch.setattr(comments, "resolve_path", resolve_path)
+    monkeypatch.setattr(comments, "CommentManager", DeletedMeanwhileManager)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(comments.update_comment(
+            post_id=2, user_id=1, comment_id=3, comment_update=CommentUpdate(content="edited"), user=USER, db=None
+        ))
+    assert error.value.status_code == 404
+
+
+def test_updating_a_post_deleted_meanwhile_is_not_found(monkeypatch):
+    async def post_validation(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(posts, "post_validation", post_validation)
+    monkeypatch.setattr(posts, "PostManager", DeletedMeanwhileManager)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(posts.update_post(
+            post_id=2, user_id=1, post_update=PostUpdate(content="edited", auto_reply=False), user=USER, db=None
+        ))
+    assert error.value.status_code == 404